@@ -1,12 +1,9 @@
 import streamlit as st
-from experta import *
-import pandas as pd
-import google.generativeai as genai
 import os
-import json
 
-from KeyWords import ALL_KEYWORDS_MAPPING
-from engine import ConductEvaluationEngine, ConductDescription, ContextFact, HistoryFact, FrequencyFact, ImpactFact, NonVerbalFact, IntentionFact, HierarchicalRelationFact, ConductSeverity, Explanation, Recommendation, GeminiAnalysis
+import evaluation
+from tracing import TRACER
+from factor_options import CONTEXT_OPTIONS, HISTORY_OPTIONS, FREQUENCY_OPTIONS, IMPACT_OPTIONS, NON_VERBAL_OPTIONS, INTENTION_OPTIONS, HIERARCHICAL_RELATION_OPTIONS
 
 st.set_page_config(layout="wide", page_title="Sistema Especialista de Avaliação de Condutas UFAPE")
 
@@ -16,91 +13,113 @@ if not API_KEY:
     st.error("Erro: A chave da API do Gemini (GEMINI_API_KEY) não foi encontrada nas variáveis de ambiente.")
     st.info("Por favor, defina a variável de ambiente no PowerShell/CMD com: `$env:GEMINI_API_KEY=\"SUA_CHAVE_AQUI\"` (temporário) ou adicione-a nas variáveis de ambiente do sistema (permanente).")
     st.stop()
-genai.configure(api_key=API_KEY)
-
-# --- Função de chamada do Gemini ---
-def extract_keywords_with_gemini(user_description: str) -> dict:
-    try:
-        model = genai.GenerativeModel('gemini-1.5-pro')
-        keywords_prompt_parts = []
-        for level_name, keywords_list in ALL_KEYWORDS_MAPPING.items():
-            keywords_prompt_parts.append(f"{level_name}: {', '.join(keywords_list)}")
-        keywords_string = "\n".join(keywords_prompt_parts)
-        prompt = f"""
-        Analise a seguinte descrição de conduta: "{user_description}"
-        Com base nas palavras-chave fornecidas abaixo, identifique o nível de gravidade mais apropriado.
-        Palavras-chave:
-        {keywords_string}
-        Formato da resposta (apenas JSON, sem texto explicativo adicional):
-        ```json
-        {{
-            "nivel_sugerido": "Nível X" ou "Nenhum Nível Sugerido",
-            "palavras_chave_encontradas": ["palavra1", "palavra2"]
-        }}
-        ```
-        """
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        if response_text.startswith("```json") and response_text.endswith("```"):
-            json_str = response_text[len("```json"): -len("```")].strip()
-        else:
-            json_str = response_text
-        return json.loads(json_str)
-    except Exception as e:
-        st.error(f"Erro ao chamar a API do Gemini: {e}")
-        return {"nivel_sugerido": "Nenhum Nível Sugerido", "palavras_chave_encontradas": []}
+
+# --- Recursos compartilhados entre sessões ---
+# O cliente do Gemini (gemini_client.get_client) e a base de regras (rule_catalog.get_rule_base) já são
+# instâncias únicas por processo: as reexecuções do script não os recriam. O cliente, e com ele o SDK,
+# só é criado na primeira consulta ao modelo.
+
+# --- Mensagens de progresso ---
+def notify_streamlit(kind, message):
+    """Encaminha as mensagens de progresso da avaliação para os componentes do Streamlit."""
+    {"info": st.info, "success": st.success, "warning": st.warning, "error": st.error}[kind](message)
 
 # --- Função de execução do Sistema Especialista ---
 def run_expert_system(description, context, history, frequency, impact, non_verbal, intention, hierarchical_relation):
-    engine = ConductEvaluationEngine()
-    engine.reset()
-
-    st.info("Realizando análise de texto com IA (Gemini)...")
-    gemini_result = extract_keywords_with_gemini(description)
-    suggested_level = gemini_result.get("nivel_sugerido")
-    detected_keywords = gemini_result.get("palavras_chave_encontradas", [])
-
-    if suggested_level and suggested_level.startswith("Nível "):
-        try:
-            level_num = int(suggested_level.split(" ")[1])
-            engine.declare(GeminiAnalysis(suggested_level=level_num, detected_keywords=detected_keywords, analysis_successful=True))
-            st.success(f"Análise do Gemini concluída. Nível base sugerido: {suggested_level}.")
-        except (ValueError, IndexError):
-            engine.declare(GeminiAnalysis(analysis_successful=False))
+    return evaluation.run_expert_system(description, context, history, frequency, impact, non_verbal, intention, hierarchical_relation, notify=notify_streamlit)
+
+def result_to_dict(evaluation_result):
+    """Converte a tupla devolvida pela avaliação em dados simples, próprios para cache e sessão."""
+    final_severity, ia_explanation, additional_explanations, recommendations, logged_facts = evaluation_result
+    return {
+        "final_severity": final_severity.as_dict() if final_severity else None,
+        "ia_explanation": ia_explanation,
+        "additional_explanations": additional_explanations,
+        "recommendations": recommendations,
+        "logged_facts": list(logged_facts),
+    }
+
+def reevaluate_factors(last_evaluation, inputs):
+    """
+    Reavaliação incremental quando a descrição não mudou: reaproveita a análise da IA já obtida
+    e o motor vivo da sessão, alterando somente os fatores modificados.
+    """
+    session = st.session_state.get("incremental_session")
+    # Após uma recarga do catálogo de regras, a sessão é recriada com as regras novas.
+    if session is None or session.description != inputs[0] or session.rules_digest != evaluation.refresh_rules():
+        previous = last_evaluation["inputs"]
+        session = evaluation.IncrementalEvaluation.from_log_facts(previous[0], last_evaluation["result"]["logged_facts"], *previous[1:])
+        st.session_state["incremental_session"] = session
+    if session is None:
+        return None
+    return result_to_dict(session.update(*inputs[1:]))
+
+class UncachedEvaluation(Exception):
+    """Carrega o resultado de uma avaliação que não deve ir para o cache (falha ou atraso do Gemini)."""
+    def __init__(self, result):
+        super().__init__("Avaliação com falha na análise de IA")
+        self.result = result
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def evaluate_cached(description, context, history, frequency, impact, non_verbal, intention, hierarchical_relation, rules_digest):
+    """
+    Avaliação em cache, indexada pelas oito entradas e pela versão do catálogo de regras (uma recarga
+    invalida os resultados anteriores); falhas e contingências locais não são armazenadas.
+    """
+    errors = []
+    def notify(kind, message):
+        if kind in ("error", "warning"):
+            errors.append(message)
+        notify_streamlit(kind, message)
+    result = result_to_dict(evaluation.run_expert_system(
+        description, context, history, frequency, impact, non_verbal, intention, hierarchical_relation, notify=notify
+    ))
+    if errors:
+        raise UncachedEvaluation(result)
+    return result
+
+def render_result(result):
+    """Desenha o diagnóstico a partir de um resultado armazenado."""
+    final_severity = result["final_severity"]
+    ia_explanation = result["ia_explanation"]
+    additional_explanations = result["additional_explanations"]
+    recommendations = result["recommendations"]
+    logged_facts = result["logged_facts"]
+
+    if final_severity:
+        st.subheader("Diagnóstico do Sistema Especialista")
+        if final_severity['level'] > 0:
+            st.markdown(f"### Nível de Gravidade Base: **{final_severity['level']} - {final_severity['description']}**")
+        else:
+             st.markdown("### Nível de Gravidade Base: **Indeterminado a partir da descrição**")
+        
+        if ia_explanation:
+            st.info(f"**Justificativa da IA:** {ia_explanation}")
+
+        if additional_explanations:
+            st.subheader("Análise dos Fatores Adicionais Considerados")
+            st.markdown("Os seguintes fatores contextuais foram identificados e contribuem para a análise da gravidade:")
+            for exp in additional_explanations:
+                st.markdown(f"- {exp}")
+        else:
+            st.subheader("Análise dos Fatores Adicionais")
+            st.markdown("Nenhum fator adicional com potencial agravante foi selecionado para análise.")
+
+        if recommendations:
+            st.subheader("Recomendações e Próximos Passos")
+            st.warning("As seguintes ações são recomendadas com base na gravidade da conduta avaliada:")
+            for rec in recommendations:
+                st.markdown(f"➡️ {rec}")
+
+        with st.expander("Ver Rastreabilidade da Inferência (Todos os Fatos Utilizados)"):
+            if logged_facts:
+                # Lista de registros simples: dispensa a montagem de um DataFrame do pandas.
+                facts_data = [{"Tipo de Fato": f_type, "Valor": str(f_val)} for f_type, f_val in logged_facts]
+                st.dataframe(facts_data, use_container_width=True)
+            else:
+                st.info("Nenhum fato foi logado.")
     else:
-        engine.declare(GeminiAnalysis(analysis_successful=False))
-
-    engine.declare(ConductDescription(text=description))
-    if context != "na": engine.declare(ContextFact(context=context))
-    if history != "na": engine.declare(HistoryFact(history=history))
-    if frequency != "na": engine.declare(FrequencyFact(frequency=frequency))
-    if impact != "na": engine.declare(ImpactFact(impact=impact))
-    if non_verbal != "na": engine.declare(NonVerbalFact(non_verbal=non_verbal))
-    if intention != "na": engine.declare(IntentionFact(intention=intention))
-    if hierarchical_relation != "na": engine.declare(HierarchicalRelationFact(relation=hierarchical_relation))
-
-    engine.run()
-
-    final_severity, ia_explanation, additional_explanations, recommendations = None, None, [], []
-    all_severity_facts = []
-
-    for fact_name, fact_dict in engine.log_facts:
-        if fact_name == 'ConductSeverity':
-            all_severity_facts.append(ConductSeverity(**fact_dict))
-        elif fact_name == 'Explanation':
-            exp = Explanation(**fact_dict)
-            if exp['source'] == "Análise IA" or exp['source'] == "Sistema":
-                ia_explanation = exp['text']
-            elif exp['source'] == "Fator Adicional":
-                additional_explanations.append(exp['text'])
-        elif fact_name == 'Recommendation':
-            rec = Recommendation(**fact_dict)
-            recommendations.append(rec['text'])
-
-    if all_severity_facts:
-        final_severity = all_severity_facts[-1]
-
-    return final_severity, ia_explanation, additional_explanations, recommendations, engine.log_facts
+        st.error("Não foi possível determinar o nível de gravidade. Verifique a descrição e as configurações.")
 
 # --- Interface Streamlit ---
 st.title("Sistema Especialista para Avaliação de Condutas Inapropriadas - UFAPE")
@@ -116,107 +135,91 @@ col1, col2 = st.columns(2)
 
 # --- coluna dos fatos ---
 with col1:
-    context_options = {
-        "na": "Não se aplica / Não informado",
-        "Formal/Público": "Formal (reunião, apresentação) e Público (afetando mais pessoas)",
-        "Formal/Privado": "Formal (reunião, apresentação) e Privado (apenas indivíduos específicos)",
-        "Informal/Público": "Informal (evento social, conversa casual) e Público (afetando mais pessoas)",
-        "Informal/Privado": "Informal (evento social, conversa casual) e Privado (apenas indivíduos específicos)",
-        "Local Isolado com Conotação Sexual": "Local fechado ou isolado, com conotação sexual (aumenta vulnerabilidade)"
-    }
-    selected_context = st.selectbox("Contexto da conduta:", options=list(context_options.keys()), format_func=lambda x: context_options[x], index=0)
+    selected_context = st.selectbox("Contexto da conduta:", options=list(CONTEXT_OPTIONS.keys()), format_func=lambda x: CONTEXT_OPTIONS[x], index=0)
 
-    history_options = {
-        "na": "Não se aplica / Não informado",
-        "Primário": "Sem histórico anterior de condutas inapropriadas",
-        "Reincidente": "Histórico de condutas similares ou relacionadas",
-        "Frequente": "Múltiplas reincidências que indicam um padrão comportamental"
-    }
-    selected_history = st.selectbox("Histórico do agressor:", options=list(history_options.keys()), format_func=lambda x: history_options[x], index=0)
+    selected_history = st.selectbox("Histórico do agressor:", options=list(HISTORY_OPTIONS.keys()), format_func=lambda x: HISTORY_OPTIONS[x], index=0)
     
-    frequency_options = {
-        "na": "Não se aplica / Não informado",
-        "Isolado": "Incidente único sem repetições conhecidas",
-        "Ocasional": "Ocorre esporadicamente, mas mais de uma vez",
-        "Repetitivo e/ou Insistente": "Acontece frequentemente"
-    }
-    selected_frequency = st.selectbox("Frequência das condutas:", options=list(frequency_options.keys()), format_func=lambda x: frequency_options[x], index=0)
+    selected_frequency = st.selectbox("Frequência das condutas:", options=list(FREQUENCY_OPTIONS.keys()), format_func=lambda x: FREQUENCY_OPTIONS[x], index=0)
 
-    impact_options = {
-        "na": "Não se aplica / Não informado",
-        "Não-significativo": "Não teve maiores repercussões para a vítima",
-        "Negativo considerável": "Gerou consequências de curto prazo e não muito graves à vítima",
-        "Negativo intenso": "Gerou consequências de médio e longo prazo, causando sofrimento"
-    }
-    selected_impact = st.selectbox("Impacto na vítima:", options=list(impact_options.keys()), format_func=lambda x: impact_options[x], index=0)
+    selected_impact = st.selectbox("Impacto na vítima:", options=list(IMPACT_OPTIONS.keys()), format_func=lambda x: IMPACT_OPTIONS[x], index=0)
 
 with col2:
-    non_verbal_options = {
-        "na": "Não se aplica / Não informado",
-        "Neutro": "Sem sinais não-verbais significativos",
-        "Agravado": "Sinais não-verbais que intensificam a negatividade (ameaça, desprezo)"
-    }
-    selected_non_verbal = st.selectbox("Sinais não-verbais:", options=list(non_verbal_options.keys()), format_func=lambda x: non_verbal_options[x], index=0)
+    selected_non_verbal = st.selectbox("Sinais não-verbais:", options=list(NON_VERBAL_OPTIONS.keys()), format_func=lambda x: NON_VERBAL_OPTIONS[x], index=0)
     
-    intention_options = {
-        "na": "Não se aplica / Não informado",
-        "Acidental": "Sem intenção clara de causar dano",
-        "Negligente": "Falta de consideração pelas consequências",
-        "Intencional": "Evidente objetivo de causar dano ou desconforto"
-    }
-    selected_intention = st.selectbox("Intenção percebida:", options=list(intention_options.keys()), format_func=lambda x: intention_options[x], index=0)
+    selected_intention = st.selectbox("Intenção percebida:", options=list(INTENTION_OPTIONS.keys()), format_func=lambda x: INTENTION_OPTIONS[x], index=0)
 
-    hierarchical_relation_options = {
-        "na": "Não se aplica / Não informado",
-        "Mesmo nível hierárquico ou não relevante": "Colegas ou sem relação de subordinação direta",
-        "Superior subordinado direto": "O agressor é superior direto da vítima",
-        "Superior subordinado indireto": "O agressor tem posição superior, mas não direta"
-    }
-    selected_hierarchical_relation = st.selectbox("Relação hierárquica:", options=list(hierarchical_relation_options.keys()), format_func=lambda x: hierarchical_relation_options[x], index=0)
+    selected_hierarchical_relation = st.selectbox("Relação hierárquica:", options=list(HIERARCHICAL_RELATION_OPTIONS.keys()), format_func=lambda x: HIERARCHICAL_RELATION_OPTIONS[x], index=0)
+
+current_inputs = (
+    user_description, selected_context, selected_history, selected_frequency,
+    selected_impact, selected_non_verbal, selected_intention, selected_hierarchical_relation
+)
 
 if st.button("Avaliar Conduta", type="primary"):
     if not user_description:
         st.warning("Por favor, descreva a situação para realizar a avaliação.")
     else:
         with st.spinner("Avaliando a conduta..."):
-            final_severity, ia_explanation, additional_explanations, recommendations, logged_facts = run_expert_system(
-                user_description, selected_context, selected_history, selected_frequency,
-                selected_impact, selected_non_verbal, selected_intention, selected_hierarchical_relation
-            )
+            previous_evaluation = st.session_state.get("last_evaluation")
+            result, reusable = None, True
+            if previous_evaluation and previous_evaluation["reusable"] and previous_evaluation["inputs"][0] == user_description:
+                result = reevaluate_factors(previous_evaluation, current_inputs)
+            if result is None:
+                try:
+                    result = evaluate_cached(*current_inputs, evaluation.refresh_rules())
+                except UncachedEvaluation as uncached:
+                    result, reusable = uncached.result, False
+                st.session_state.pop("incremental_session", None)
+            similar = [
+                case for case in evaluation.similar_cases(user_description, k=6)
+                if (case["description"], case["factors"]) != (user_description, current_inputs[1:])
+            ][:5]
+            st.session_state["last_evaluation"] = {"inputs": current_inputs, "result": result, "reusable": reusable, "similar": similar}
             st.success("Avaliação Concluída!")
 
-            if final_severity:
-                st.subheader("Diagnóstico do Sistema Especialista")
-                if final_severity['level'] > 0:
-                    st.markdown(f"### Nível de Gravidade Base: **{final_severity['level']} - {final_severity['description']}**")
-                else:
-                     st.markdown("### Nível de Gravidade Base: **Indeterminado a partir da descrição**")
-                
-                if ia_explanation:
-                    st.info(f"**Justificativa da IA:** {ia_explanation}")
-
-                if additional_explanations:
-                    st.subheader("Análise dos Fatores Adicionais Considerados")
-                    st.markdown("Os seguintes fatores contextuais foram identificados e contribuem para a análise da gravidade:")
-                    for exp in additional_explanations:
-                        st.markdown(f"- {exp}")
-                else:
-                    st.subheader("Análise dos Fatores Adicionais")
-                    st.markdown("Nenhum fator adicional com potencial agravante foi selecionado para análise.")
-
-                if recommendations:
-                    st.subheader("Recomendações e Próximos Passos")
-                    st.warning("As seguintes ações são recomendadas com base na gravidade da conduta avaliada:")
-                    for rec in recommendations:
-                        st.markdown(f"➡️ {rec}")
-
-                with st.expander("Ver Rastreabilidade da Inferência (Todos os Fatos Utilizados)"):
-                    if logged_facts:
-                        facts_data = [{"Tipo de Fato": f_type, "Valor": f_val} for f_type, f_val in logged_facts]
-                        df_facts = pd.DataFrame(facts_data)
-                        st.dataframe(df_facts, use_container_width=True)
-                    else:
-                        st.info("Nenhum fato foi logado.")
-            else:
-                st.error("Não foi possível determinar o nível de gravidade. Verifique a descrição e as configurações.")
-        st.markdown("---")
\ No newline at end of file
+# O último resultado fica na sessão e é redesenhado a cada nova execução do script,
+# sem recalcular nem chamar o Gemini (ex.: ao abrir o expander de rastreabilidade).
+last_evaluation = st.session_state.get("last_evaluation")
+if last_evaluation:
+    if last_evaluation["inputs"] != current_inputs:
+        st.caption("Resultado da última avaliação realizada. A descrição ou os fatores foram alterados desde então; clique em \"Avaliar Conduta\" para atualizar.")
+    render_result(last_evaluation["result"])
+    if last_evaluation.get("similar"):
+        with st.expander("Casos semelhantes já avaliados"):
+            st.dataframe([
+                {"Similaridade": f"{case['similarity']:.0%}", "Nível": case["severity_level"], "Descrição": case["description"]}
+                for case in last_evaluation["similar"]
+            ], use_container_width=True)
+    st.markdown("---")
+
+# --- Painel de depuração (CONDUCT_DEBUG_PANEL=1) ---
+if os.getenv("CONDUCT_DEBUG_PANEL") == "1":
+    with st.sidebar.expander("Depuração: métricas de desempenho"):
+        metrics = TRACER.snapshot()
+        if metrics:
+            st.markdown(f"**Avaliações instrumentadas:** {metrics['evaluations']}")
+            st.markdown("**Etapas**")
+            st.table([{"Etapa": name, "Execuções": stat["count"], "Média (ms)": round(stat["total_s"] / stat["count"] * 1000, 3), "Máx. (ms)": round(stat["max_s"] * 1000, 3)} for name, stat in metrics["stages"].items()])
+            st.markdown("**Regras disparadas**")
+            st.table([{"Regra": name, "Disparos": stat["count"], "Média (ms)": round(stat["total_s"] / stat["count"] * 1000, 3)} for name, stat in metrics["rules"].items()])
+            st.markdown(f"**Agenda:** máximo {metrics['agenda']['max']}, média {metrics['agenda']['mean']:.2f}")
+            flights = evaluation.gemini_flights.stats()
+            st.markdown(f"**Chamadas ao Gemini agrupadas:** {flights['coalesced']} de {flights['leaders'] + flights['coalesced']} (esperas esgotadas: {flights['timeouts']})")
+            hedging = evaluation.gemini_hedging.stats()
+            st.markdown(f"**Orçamento de latência:** {hedging['budget_s']:g}s, contingência após {hedging['hedge_delay_s']:.2f}s ({hedging['hedges_sent']} enviadas, {hedging['hedges_skipped']} dispensadas com o pool ocupado)")
+            rules = evaluation.get_rule_base().stats()
+            st.markdown(f"**Catálogo de regras:** versão {rules['digest']}, {rules['rules']} regras, compilado em {rules['compile_ms']:.1f} ms{' (cache)' if rules['from_cache'] else ''}")
+            audit = evaluation.get_audit_log()
+            if audit is not None:
+                audit_stats = audit.stats()
+                st.markdown(f"**Registro de auditoria:** {audit_stats['written']} gravados, {audit_stats['queued']} na fila, {audit_stats['dropped']} descartados")
+            paths = metrics["counters"].get("analysis_path", {})
+            if paths:
+                st.table([{"Caminho da análise": path, "Avaliações": count} for path, count in sorted(paths.items())])
+            recent = TRACER.recent_traces(1)
+            if recent:
+                st.json(recent[-1], expanded=False)
+            st.download_button("Exportar métricas (Prometheus)", TRACER.to_prometheus(), file_name="metrics.prom")
+            st.download_button("Exportar rastreamentos (JSON lines)", TRACER.to_jsonl(), file_name="traces.jsonl")
+        else:
+            st.info("Instrumentação desativada (CONDUCT_TRACING=0).")
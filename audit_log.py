@@ -0,0 +1,284 @@
+"""
+Registro de auditoria, somente de acréscimo, das inferências do motor.
+
+Cada avaliação gera um registro compacto com os fatos declarados (id, tipo e valores) e as
+regras disparadas (ordem, nome, ids dos fatos que ativaram a regra e ids dos fatos que ela
+declarou). Os registros entram em uma fila e uma thread em segundo plano os grava em lotes,
+fora do caminho da requisição, em JSON lines ou SQLite (pela extensão do arquivo), com rotação
+por tamanho. Variáveis de ambiente:
+    CONDUCT_AUDIT_LOG=arq      destino (padrão: conduct_audit.jsonl; vazio desativa)
+    CONDUCT_AUDIT_MAX_BYTES    tamanho a partir do qual o arquivo é rotacionado
+    CONDUCT_AUDIT_BACKUPS      quantidade de arquivos rotacionados mantidos
+
+Uso:
+    python audit_log.py query [--rule NOME] [--level N] [--since 2024-01-31] [--trace ID] [--limit 20]
+    python audit_log.py stats
+"""
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+AUDIT_LOG_PATH = os.getenv("CONDUCT_AUDIT_LOG", "conduct_audit.jsonl")
+AUDIT_MAX_BYTES = int(os.getenv("CONDUCT_AUDIT_MAX_BYTES", str(50 * 1024 * 1024)))
+AUDIT_BACKUPS = int(os.getenv("CONDUCT_AUDIT_BACKUPS", "5"))
+AUDIT_BATCH_SIZE = 256
+AUDIT_FLUSH_SECONDS = 1.0
+AUDIT_QUEUE_SIZE = 100_000
+RECORD_VERSION = 1
+
+_SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+
+
+def build_audit_record(entrypoint, log_facts, fact_ids, firings, trace_id=None):
+    """
+    Registro compacto de uma avaliação. `fact_ids` acompanha `log_facts` (None para fatos repetidos,
+    que o motor não chegou a declarar); `firings` contém [ordem, regra, ids de entrada, ids declarados].
+    """
+    severity = None
+    for name, values in log_facts:
+        if name == "ConductSeverity":
+            severity = values.get("level")
+    return {
+        "v": RECORD_VERSION,
+        "ts": time.time(),
+        "id": trace_id or uuid.uuid4().hex,
+        "entrypoint": entrypoint,
+        "severity": severity,
+        "facts": [[fact_id, name, values] for fact_id, (name, values) in zip(fact_ids, log_facts)],
+        "rules": [list(firing) for firing in firings],
+    }
+
+
+def _is_sqlite(path):
+    return path.endswith(_SQLITE_SUFFIXES)
+
+
+def rotated_paths(path, backups=AUDIT_BACKUPS):
+    """Arquivos do registro, do mais antigo ao atual."""
+    candidates = [f"{path}.{n}" for n in range(backups, 0, -1)] + [path]
+    return [candidate for candidate in candidates if os.path.exists(candidate)]
+
+
+class AuditLog:
+    """Fila de registros com gravação em lotes por uma thread em segundo plano."""
+    def __init__(self, path=AUDIT_LOG_PATH, max_bytes=AUDIT_MAX_BYTES, backups=AUDIT_BACKUPS,
+                 batch_size=AUDIT_BATCH_SIZE, flush_seconds=AUDIT_FLUSH_SECONDS, queue_size=AUDIT_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.sqlite = _is_sqlite(path)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._conn = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record):
+        """Enfileira um registro sem bloquear; com a fila cheia, o registro é descartado e contado."""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            stop = item is None
+            if not stop:
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_seconds
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except (OSError, sqlite3.Error) as e:
+                    self.dropped += len(batch)
+                    print(f"Falha ao gravar o registro de auditoria: {e}", file=sys.stderr)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                if self._conn is not None:
+                    self._conn.close()
+                return
+
+    def _write(self, batch):
+        self._rotate_if_needed()
+        if self.sqlite:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS audit ("
+                    "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, ts REAL NOT NULL, "
+                    "entrypoint TEXT, severity INTEGER, record TEXT NOT NULL)"
+                )
+            self._conn.executemany(
+                "INSERT INTO audit (id, ts, entrypoint, severity, record) VALUES (?, ?, ?, ?, ?)",
+                [(r["id"], r["ts"], r["entrypoint"], r["severity"], json.dumps(r, ensure_ascii=False, separators=(",", ":")))
+                 for r in batch],
+            )
+            self._conn.commit()
+        else:
+            payload = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch)
+            with open(self.path, "a", encoding="utf-8") as output_file:
+                output_file.write(payload)
+        self.written += len(batch)
+        self.batches += 1
+
+    def _rotate_if_needed(self):
+        if self.max_bytes <= 0 or not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def flush(self, timeout=5.0):
+        """Aguarda a gravação dos registros já enfileirados (usado pelos benchmarks e pela ferramenta de consulta)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline and self._thread.is_alive():
+            time.sleep(0.01)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped, "batches": self.batches,
+                "rotations": self.rotations, "queued": self._queue.qsize()}
+
+
+_audit_log = None
+_audit_lock = threading.Lock()
+
+
+def get_audit_log():
+    """Instância única por processo, criada no primeiro registro; None quando a auditoria está desativada."""
+    global _audit_log
+    if not AUDIT_LOG_PATH:
+        return None
+    if _audit_log is None:
+        with _audit_lock:
+            if _audit_log is None:
+                _audit_log = AuditLog(AUDIT_LOG_PATH)
+    return _audit_log
+
+
+# --- Consulta ---
+def read_records(path=AUDIT_LOG_PATH, backups=AUDIT_BACKUPS):
+    """Gera os registros de todos os arquivos (rotacionados inclusive), do mais antigo ao mais recente."""
+    for file_path in rotated_paths(path, backups):
+        if _is_sqlite(path):
+            conn = sqlite3.connect(f"file:{file_path}?mode=ro", uri=True)
+            try:
+                for (record,) in conn.execute("SELECT record FROM audit ORDER BY seq"):
+                    yield json.loads(record)
+            finally:
+                conn.close()
+        else:
+            with open(file_path, encoding="utf-8") as input_file:
+                for line in input_file:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+
+
+def matches(record, rule=None, level=None, since=None, trace_id=None):
+    if rule is not None and not any(firing[1] == rule for firing in record["rules"]):
+        return False
+    if level is not None and record["severity"] != level:
+        return False
+    if since is not None and record["ts"] < since:
+        return False
+    if trace_id is not None and record["id"] != trace_id:
+        return False
+    return True
+
+
+def format_record(record):
+    """Resumo legível: data, id, gravidade e a sequência de regras com os fatos envolvidos."""
+    facts = {fact_id: name for fact_id, name, _ in record["facts"] if fact_id is not None}
+    lines = [f"{datetime.fromtimestamp(record['ts']).isoformat(timespec='seconds')}  {record['id']}  "
+             f"{record['entrypoint']}  gravidade={record['severity']}"]
+    for order, rule, inputs, outputs in record["rules"]:
+        used = ", ".join(f"{i}:{facts.get(i, '?')}" for i in inputs)
+        declared = ", ".join(f"{i}:{facts.get(i, '?')}" for i in outputs) or "-"
+        lines.append(f"  {order:>2}. {rule}  [{used}] -> [{declared}]")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta ao registro de auditoria das inferências.")
+    parser.add_argument("--path", default=AUDIT_LOG_PATH or "conduct_audit.jsonl")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    query = subparsers.add_parser("query", help="Lista as avaliações que atendem aos filtros.")
+    query.add_argument("--rule", help="Avaliações em que a regra disparou.")
+    query.add_argument("--level", type=int, help="Nível de gravidade final.")
+    query.add_argument("--since", help="Data/hora ISO mínima (ex.: 2024-01-31 ou 2024-01-31T14:00).")
+    query.add_argument("--trace", help="Id da avaliação (igual ao trace_id da instrumentação).")
+    query.add_argument("--limit", type=int, default=20, help="Mostra as N mais recentes (0: todas).")
+    query.add_argument("--json", action="store_true", help="Imprime os registros completos em JSON lines.")
+    subparsers.add_parser("stats", help="Contagens por regra e por nível de gravidade.")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        total, by_level, by_rule = 0, {}, {}
+        for record in read_records(args.path):
+            total += 1
+            by_level[record["severity"]] = by_level.get(record["severity"], 0) + 1
+            for firing in record["rules"]:
+                by_rule[firing[1]] = by_rule.get(firing[1], 0) + 1
+        print(json.dumps({"evaluations": total, "severity": {str(k): v for k, v in sorted(by_level.items(), key=str)},
+                          "rules": dict(sorted(by_rule.items(), key=lambda item: -item[1]))}, ensure_ascii=False, indent=2))
+        return
+
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    found = [record for record in read_records(args.path) if matches(record, args.rule, args.level, since, args.trace)]
+    if args.limit:
+        found = found[-args.limit:]
+    for record in found:
+        print(json.dumps(record, ensure_ascii=False) if args.json else format_record(record))
+    print(f"{len(found)} avaliações.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
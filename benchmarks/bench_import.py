@@ -0,0 +1,94 @@
+"""
+Benchmark do tempo de inicialização a frio: importa cada alvo em um processo Python novo
+e mede o tempo total, além dos módulos mais custosos segundo `python -X importtime`.
+
+Uso:
+    python -m benchmarks.bench_import [--repeat 5] [--output rel.json]
+
+Alvos: o módulo do motor (uso sem interface), o fluxo de avaliação e o app Streamlit
+(executado em modo "bare", com uma GEMINI_API_KEY fictícia).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.stats import run_metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = {
+    "engine": "import engine",
+    "evaluation": "import evaluation",
+    "app": "import app",
+}
+# Dependências pesadas que não devem ser carregadas na inicialização.
+HEAVY_MODULES = ["pandas", "google.generativeai", "numpy"]
+
+
+def _run(code, extra_args=()):
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "benchmark"), PYTHONDONTWRITEBYTECODE="1")
+    return subprocess.run([sys.executable, *extra_args, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def measure(statement, repeat):
+    """Tempo de importação medido dentro do processo novo, excluindo a inicialização do interpretador."""
+    code = (
+        "import time, sys, json; t = time.perf_counter(); " + statement + "; "
+        "elapsed = time.perf_counter() - t; "
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))"
+    )
+    samples, loaded = [], []
+    for _ in range(repeat):
+        result = _run(code)
+        if result.returncode != 0:
+            raise RuntimeError(f"Falha ao importar ({statement}):\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(data["seconds"])
+        loaded = data["loaded"]
+    return samples, loaded
+
+
+def top_imports(statement, limit=10):
+    """Módulos com maior tempo acumulado de importação (saída de -X importtime)."""
+    result = _run(statement, ("-X", "importtime"))
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": cumulative / 1000} for cumulative, name in rows[:limit]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de importação a frio.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.targets:
+        samples, loaded = measure(TARGETS[name], args.repeat)
+        results[name] = {
+            "median_ms": statistics.median(samples) * 1000,
+            "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000,
+            "heavy_modules_loaded": loaded,
+            "top_imports": top_imports(TARGETS[name]),
+        }
+        print(f"{name}: {results[name]['median_ms']:.0f} ms (pesados carregados: {', '.join(loaded) or 'nenhum'})", file=sys.stderr)
+
+    text = json.dumps({"meta": run_metadata(), "repeat": args.repeat, "targets": results}, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de latência ponta a ponta da avaliação de condutas, com o Gemini substituído
+por um modelo local (benchmarks/fake_gemini.py).
+
+Uso:
+    python -m benchmarks.bench_latency [--cases 200] [--latency 0.05] [--jitter 0.02]
+                                       [--error-rate 0.0] [--force-llm] [--case-memory] [--audit]
+                                       [--output rel.json]
+
+O relatório JSON pode ser comparado entre commits (o campo "meta" identifica o commit).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_cases
+from benchmarks.fake_gemini import install_fake_gemini
+from benchmarks.stats import summarize, run_metadata
+
+
+def bench_end_to_end(cases, evaluation):
+    """Tempo total de run_expert_system por caso."""
+    samples = []
+    start = time.perf_counter()
+    for description, factors in cases:
+        t0 = time.perf_counter()
+        evaluation.run_expert_system(description, *factors)
+        samples.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+    return {"latency": summarize(samples), "throughput_per_s": len(cases) / wall if wall else None}
+
+
+def bench_stages(cases, evaluation):
+    """Os mesmos passos de run_expert_system, cronometrados etapa por etapa no motor real."""
+    from engine import ConductEvaluationEngine, build_input_facts
+
+    stages = {"llm": [], "engine_reset": [], "engine_declare": [], "engine_run": [], "result_extraction": []}
+    engine = ConductEvaluationEngine()
+    for description, factors in cases:
+        t0 = time.perf_counter()
+        gemini_result = evaluation.analyze_description(description)
+        analysis = evaluation.parse_analysis(gemini_result)
+        t1 = time.perf_counter()
+        engine.reset()
+        engine.log_facts = []
+        t2 = time.perf_counter()
+        for fact in build_input_facts(description, analysis, *factors):
+            engine.declare(fact)
+        t3 = time.perf_counter()
+        engine.run()
+        t4 = time.perf_counter()
+        evaluation.summarize_log_facts(engine.log_facts)
+        t5 = time.perf_counter()
+        stages["llm"].append(t1 - t0)
+        stages["engine_reset"].append(t2 - t1)
+        stages["engine_declare"].append(t3 - t2)
+        stages["engine_run"].append(t4 - t3)
+        stages["result_extraction"].append(t5 - t4)
+    return {name: summarize(samples) for name, samples in stages.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de latência da avaliação de condutas.")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada do Gemini, em segundos.")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--force-llm", action="store_true", help="Desativa o classificador local para sempre chamar o modelo.")
+    parser.add_argument("--case-memory", action="store_true", help="Ativa a memória de casos (em um arquivo temporário).")
+    parser.add_argument("--audit", action="store_true", help="Ativa o registro de auditoria (em um arquivo temporário).")
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    fake = install_fake_gemini(args.latency, args.jitter, args.error_rate, args.seed)
+    import audit_log
+    import case_store
+    import evaluation
+    from response_cache import ResponseCache
+
+    # Sem cache em disco nem em memória: cada caso paga o caminho completo.
+    evaluation.response_cache = ResponseCache(path=None, memory_size=0)
+    if args.force_llm:
+        evaluation.LOCAL_CONFIDENCE_THRESHOLD = float("inf")
+    # A memória de casos reaproveitaria diagnósticos entre as passadas; só é usada quando pedida, em arquivo descartável.
+    case_store.CASE_STORE_PATH = os.path.join(tempfile.mkdtemp(), "cases.sqlite3") if args.case_memory else ""
+    audit_log.AUDIT_LOG_PATH = os.path.join(tempfile.mkdtemp(), "audit.jsonl") if args.audit else ""
+
+    cases = generate_cases(args.cases, args.seed)
+
+    end_to_end = bench_end_to_end(cases, evaluation)
+    stages = bench_stages(cases, evaluation)
+
+    # Passada separada para memória: o tracemalloc distorce as medidas de tempo.
+    tracemalloc.start()
+    bench_end_to_end(cases, evaluation)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "meta": run_metadata(),
+        "config": {
+            "cases": args.cases, "seed": args.seed, "latency_s": args.latency, "jitter_s": args.jitter,
+            "error_rate": args.error_rate, "force_llm": args.force_llm, "case_memory": args.case_memory,
+            "audit": args.audit,
+            "decision_table": evaluation.decision_table is not None,
+        },
+        "llm_calls": fake.calls,
+        "end_to_end": end_to_end,
+        "stages": stages,
+        "peak_memory_kb": peak / 1024,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    print(f"p50 {end_to_end['latency']['p50_ms']:.1f} ms, p99 {end_to_end['latency']['p99_ms']:.1f} ms, "
+          f"{end_to_end['throughput_per_s']:.1f} avaliações/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
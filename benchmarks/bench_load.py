@@ -0,0 +1,358 @@
+"""
+Teste de carga com sessões simultâneas de avaliação, com o Gemini substituído por um modelo
+local (benchmarks/fake_gemini.py).
+
+Cada sessão simulada repete o fluxo "Avaliar Conduta" de um avaliador: descreve um caso novo e
+o avalia; em parte das vezes, altera apenas os fatores adicionais e avalia de novo (reavaliação
+incremental, como no app). A concorrência sobe em degraus (--levels); em cada degrau, todas as
+sessões rodam em threads do mesmo processo, como as sessões de um único app.py, durante
+--duration segundos. Por degrau, o relatório traz a vazão, os percentis de latência, as falhas e
+a memória residente; ao final, a memória retida por sessão e o ponto de saturação: o primeiro
+degrau em que a vazão deixa de crescer (ganho abaixo de --min-gain) ou o p95 passa do limite
+(--slo-ms). Com --target-sessions, estima quantos processos atendem a essa quantidade.
+
+Drivers:
+    function  chama evaluation.run_expert_system / IncrementalEvaluation, como o app (padrão)
+    apptest   executa o próprio app.py com o streamlit.testing.v1.AppTest, uma instância por sessão
+
+Uso:
+    python -m benchmarks.bench_load [--driver function|apptest] [--levels 1 2 4 8 16 32]
+                                    [--duration 10] [--latency 0.8] [--jitter 0.2] [--think-time 0]
+                                    [--force-llm] [--slo-ms 3000] [--target-sessions 100]
+                                    [--compare rel_anterior.json] [--output rel.json]
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_descriptions, generate_factors
+from benchmarks.fake_gemini import install_fake_gemini
+from benchmarks.stats import summarize, run_metadata
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+# Fração das ações que só alteram os fatores da avaliação anterior.
+FACTOR_CHANGE_SHARE = 0.3
+
+
+def rss_kb():
+    """Memória residente atual do processo, em KB (None fora do Linux)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class FunctionSession:
+    """Sessão que segue o fluxo do app chamando diretamente o módulo de avaliação."""
+    def __init__(self, evaluation, session_id):
+        self.evaluation = evaluation
+        self.session_id = session_id
+        self.last_evaluation = None
+        self.incremental = None
+
+    def evaluate(self, description, factors):
+        self.incremental = None
+        result = self.evaluation.run_expert_system(description, *factors)
+        self.last_evaluation = {"inputs": (description,) + tuple(factors), "result": result}
+
+    def change_factors(self, factors):
+        if self.last_evaluation is None:
+            return False
+        previous = self.last_evaluation["inputs"]
+        if self.incremental is None:
+            self.incremental = self.evaluation.IncrementalEvaluation.from_log_facts(previous[0], self.last_evaluation["result"][4], *previous[1:])
+            if self.incremental is None:
+                return False
+        result = self.incremental.update(*factors)
+        self.last_evaluation = {"inputs": (previous[0],) + tuple(factors), "result": result}
+        return True
+
+
+class AppTestSession:
+    """Sessão que executa o app.py: preenche a descrição e os fatores e clica em "Avaliar Conduta"."""
+    # A primeira execução do AppTest não é segura entre threads (estado dos widgets se mistura).
+    _start_lock = threading.Lock()
+
+    def __init__(self, evaluation, session_id, timeout=120):
+        from streamlit.testing.v1 import AppTest
+
+        with self._start_lock:
+            self.app = AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+        self.description = None
+        self.check()
+
+    def check(self):
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].message)
+
+    def _submit(self, description, factors):
+        self.app.text_area[0].input(description)
+        for selectbox, value in zip(self.app.selectbox, factors):
+            selectbox.select(value)
+        self.app.button[0].click().run()
+        self.check()
+
+    def evaluate(self, description, factors):
+        self.description = description
+        self._submit(description, factors)
+
+    def change_factors(self, factors):
+        if self.description is None:
+            return False
+        self._submit(self.description, factors)
+        return True
+
+
+class Workload:
+    """Descrições que não se repetem entre ações (nenhuma resposta vem de cache) e fatores sorteados."""
+    def __init__(self, seed):
+        self._descriptions = generate_descriptions(2000, seed, unique=False)
+        self._factors = generate_factors(1000, seed)
+        self._counter = itertools.count()
+
+    def description(self):
+        n = next(self._counter)
+        return f"{self._descriptions[n % len(self._descriptions)][:-1]} (ação {n})."
+
+    def factors(self, rng):
+        return rng.choice(self._factors)
+
+
+def run_level(make_session, concurrency, duration, think_time, workload, seed):
+    """Executa `concurrency` sessões por `duration` segundos e resume o degrau."""
+    samples = {"evaluate": [], "change_factors": []}
+    errors = []
+    stop = threading.Event()
+    ready = threading.Barrier(concurrency + 1)
+    # Motores do experta têm referências cíclicas: recolhe as sessões do degrau anterior antes de medir.
+    gc.collect()
+    peak_rss = [rss_kb()]
+    start_rss = rss_kb()
+
+    def monitor():
+        while not stop.wait(0.1):
+            current = rss_kb()
+            if current is not None and current > (peak_rss[0] or 0):
+                peak_rss[0] = current
+
+    def worker(index):
+        # Cada thread é dona da sua sessão: ela é liberada quando a thread termina.
+        rng = random.Random(seed * 1000 + index)
+        session = None
+        try:
+            session = make_session(index)
+        except Exception as e:
+            errors.append(f"criação da sessão: {e!r}")
+        ready.wait()
+        while session is not None and not stop.is_set():
+            action = "change_factors" if rng.random() < FACTOR_CHANGE_SHARE else "evaluate"
+            factors = workload.factors(rng)
+            t0 = time.perf_counter()
+            try:
+                if action == "evaluate" or not session.change_factors(factors):
+                    action = "evaluate"
+                    session.evaluate(workload.description(), factors)
+            except Exception as e:
+                errors.append(repr(e))
+                # Como um avaliador que recarrega a página: a sessão é recriada (ou encerrada, se não for possível).
+                try:
+                    session = make_session(index)
+                except Exception as e:
+                    errors.append(f"criação da sessão: {e!r}")
+                    break
+            else:
+                samples[action].append(time.perf_counter() - t0)
+            if think_time > 0:
+                stop.wait(rng.expovariate(1.0 / think_time))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    watcher = threading.Thread(target=monitor, daemon=True)
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    watcher.start()
+    began = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+    watcher.join()
+
+    completed = samples["evaluate"] + samples["change_factors"]
+    level = {
+        "concurrency": concurrency,
+        "completed": len(completed),
+        "throughput_per_s": len(completed) / wall if wall else None,
+        "latency": summarize(completed),
+        "evaluate": summarize(samples["evaluate"]),
+        "change_factors": summarize(samples["change_factors"]),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "rss_start_kb": start_rss,
+        "rss_peak_kb": peak_rss[0],
+        "rss_per_session_kb": (peak_rss[0] - start_rss) / concurrency if start_rss and peak_rss[0] else None,
+    }
+    return level
+
+
+def retained_memory_per_session(make_session, workload, sessions, seed):
+    """Memória Python retida por sessão após uma avaliação e uma alteração de fatores (tracemalloc)."""
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    held = []
+    for index in range(sessions):
+        session = make_session(index)
+        session.evaluate(workload.description(), workload.factors(rng))
+        session.change_factors(workload.factors(rng))
+        held.append(session)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / sessions / 1024
+
+
+def find_saturation(levels, min_gain, slo_ms):
+    """
+    Primeiro degrau saturado: p95 acima do limite, falhas, ou vazão que cresce menos que `min_gain`
+    (proporcionalmente ao aumento de sessões) em relação ao degrau anterior.
+    """
+    previous = None
+    for level in levels:
+        p95 = level["latency"]["p95_ms"]
+        if level["errors"]:
+            return level["concurrency"], "falhas nas avaliações", previous
+        if p95 is not None and p95 > slo_ms:
+            return level["concurrency"], f"p95 {p95:.0f} ms acima de {slo_ms:g} ms", previous
+        if previous is not None and previous["throughput_per_s"]:
+            expected = level["concurrency"] / previous["concurrency"] - 1
+            gain = level["throughput_per_s"] / previous["throughput_per_s"] - 1
+            if expected > 0 and gain < min_gain * expected:
+                return level["concurrency"], f"vazão cresceu {gain:.0%} para {expected:.0%} mais sessões", previous
+        previous = level
+    return None, None, previous
+
+
+def compare_reports(current, path):
+    """Diferenças de vazão e p95 por degrau em relação a um relatório anterior."""
+    with open(path, encoding="utf-8") as report_file:
+        previous = json.load(report_file)
+    previous_levels = {level["concurrency"]: level for level in previous["levels"]}
+    rows = []
+    for level in current["levels"]:
+        old = previous_levels.get(level["concurrency"])
+        if old is None or not old["throughput_per_s"] or not old["latency"]["p95_ms"]:
+            continue
+        rows.append({
+            "concurrency": level["concurrency"],
+            "throughput_change": level["throughput_per_s"] / old["throughput_per_s"] - 1,
+            "p95_change": level["latency"]["p95_ms"] / old["latency"]["p95_ms"] - 1,
+        })
+    return {"baseline_commit": previous["meta"].get("commit"), "levels": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas de avaliação.")
+    parser.add_argument("--driver", choices=("function", "apptest"), default="function")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por degrau de concorrência.")
+    parser.add_argument("--latency", type=float, default=0.8, help="Latência simulada do Gemini, em segundos.")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa média entre ações de uma sessão (0: carga máxima).")
+    parser.add_argument("--force-llm", action="store_true", help="Desativa o classificador local para sempre chamar o modelo.")
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="p95 máximo aceitável por avaliação.")
+    parser.add_argument("--min-gain", type=float, default=0.25, help="Fração mínima do ganho de vazão proporcional às sessões adicionadas.")
+    parser.add_argument("--memory-sessions", type=int, default=20, help="Sessões usadas para medir a memória retida por sessão.")
+    parser.add_argument("--target-sessions", type=int, help="Avaliadores simultâneos esperados, para estimar o número de processos.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="Relatório anterior para comparar vazão e p95 por degrau.")
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    fake = install_fake_gemini(args.latency, args.jitter, args.error_rate, args.seed)
+    import audit_log
+    import case_store
+    import evaluation
+    from response_cache import ResponseCache
+
+    # Sem cache em disco, memória de casos nem auditoria: cada ação paga o caminho completo.
+    evaluation.response_cache = ResponseCache(path=None, memory_size=0)
+    case_store.CASE_STORE_PATH = ""
+    audit_log.AUDIT_LOG_PATH = ""
+    if args.force_llm:
+        evaluation.LOCAL_CONFIDENCE_THRESHOLD = float("inf")
+    if args.driver == "apptest":
+        os.environ.setdefault("GEMINI_API_KEY", "teste-de-carga")
+        session_class = AppTestSession
+    else:
+        session_class = FunctionSession
+
+    def make_session(index):
+        return session_class(evaluation, index)
+
+    workload = Workload(args.seed)
+    # Aquecimento: importações tardias e estruturas construídas no primeiro uso ficam fora dos degraus.
+    warmup = make_session(-1)
+    warmup.evaluate(workload.description(), workload.factors(random.Random(args.seed)))
+    del warmup
+    levels = []
+    for concurrency in args.levels:
+        level = run_level(make_session, concurrency, args.duration, args.think_time, workload, args.seed)
+        levels.append(level)
+        print(f"{concurrency:>4} sessões: {level['throughput_per_s']:.1f} avaliações/s, p50 {level['latency']['p50_ms'] or 0:.0f} ms, "
+              f"p95 {level['latency']['p95_ms'] or 0:.0f} ms, {level['errors']} falhas", file=sys.stderr)
+
+    saturated_at, reason, last_healthy = find_saturation(levels, args.min_gain, args.slo_ms)
+    sessions_per_process = last_healthy["concurrency"] if last_healthy else None
+    report = {
+        "meta": run_metadata(),
+        "config": {
+            "driver": args.driver, "levels": args.levels, "duration_s": args.duration, "latency_s": args.latency,
+            "jitter_s": args.jitter, "error_rate": args.error_rate, "think_time_s": args.think_time,
+            "force_llm": args.force_llm, "slo_ms": args.slo_ms, "min_gain": args.min_gain, "seed": args.seed,
+            "decision_table": evaluation.decision_table is not None, "cpus": os.cpu_count(),
+        },
+        "levels": levels,
+        "retained_kb_per_session": retained_memory_per_session(make_session, workload, args.memory_sessions, args.seed),
+        "saturation": {
+            "concurrency": saturated_at,
+            "reason": reason,
+            "sessions_per_process": sessions_per_process,
+            "throughput_per_s": last_healthy["throughput_per_s"] if last_healthy else None,
+        },
+        "llm_calls": fake.calls,
+    }
+    if args.target_sessions and sessions_per_process:
+        report["saturation"]["processes_for_target"] = math.ceil(args.target_sessions / sessions_per_process)
+    if args.compare:
+        report["comparison"] = compare_reports(report, args.compare)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    if saturated_at is None:
+        print(f"Sem saturação até {args.levels[-1]} sessões.", file=sys.stderr)
+    else:
+        print(f"Saturação com {saturated_at} sessões ({reason}); até {sessions_per_process} sessões por processo.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
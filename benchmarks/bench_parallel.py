@@ -0,0 +1,92 @@
+"""
+Benchmark da pontuação paralela (parallel_scoring.py) contra a execução serial de
+run_expert_system, com o Gemini substituído pelo modelo local sem latência. O cache de respostas
+é um arquivo SQLite temporário real: a execução serial o preenche e os processos o consultam.
+
+Uso:
+    python -m benchmarks.bench_parallel [--cases 2000] [--workers 1 2 4] [--output rel.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_cases
+from benchmarks.fake_gemini import install_fake_gemini
+from benchmarks.stats import run_metadata
+from factor_options import FACTOR_OPTIONS
+
+
+def write_corpus(path, cases):
+    with open(path, "w", encoding="utf-8") as output_file:
+        for i, (description, factors) in enumerate(cases):
+            record = {"id": i, "description": description, **dict(zip(FACTOR_OPTIONS, factors))}
+            output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da pontuação paralela.")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Quantidades de processos a medir.")
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    install_fake_gemini(latency=0.0, jitter=0.0)
+    import audit_log
+    import case_store
+    import evaluation
+    import parallel_scoring
+    from response_cache import ResponseCache
+
+    # A execução serial não deve reaproveitar casos de execuções anteriores nem gravar auditoria.
+    case_store.CASE_STORE_PATH = ""
+    audit_log.AUDIT_LOG_PATH = ""
+
+    cases = generate_cases(args.cases, args.seed)
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, max(1, cores // 2), cores})
+
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        # Sem LRU em memória: todas as consultas vão ao arquivo, como nos processos recém-criados.
+        evaluation.response_cache = ResponseCache(path=os.path.join(directory, "cache.sqlite3"), memory_size=0)
+        start = time.perf_counter()
+        for description, factors in cases:
+            evaluation.run_expert_system(description, *factors)
+        serial = time.perf_counter() - start
+        serial_cache = evaluation.response_cache.stats()
+
+        input_path = os.path.join(directory, "casos.jsonl")
+        write_corpus(input_path, cases)
+        for workers in worker_counts:
+            output_path = os.path.join(directory, f"saida-{workers}.jsonl")
+            start = time.perf_counter()
+            parallel_scoring.score_file(input_path, output_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            runs.append({
+                "workers": workers,
+                "seconds": elapsed,
+                "records_per_s": args.cases / elapsed,
+                "speedup_vs_serial": serial / elapsed,
+            })
+            print(f"{workers} processos: {elapsed:.2f}s ({serial / elapsed:.2f}x)", file=sys.stderr)
+
+    report = {
+        "meta": {**run_metadata(), "cpu_count": cores},
+        "config": {"cases": args.cases, "seed": args.seed},
+        "serial": {"seconds": serial, "records_per_s": args.cases / serial, "cache": serial_cache},
+        "parallel": runs,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
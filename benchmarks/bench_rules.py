@@ -0,0 +1,151 @@
+"""
+Benchmark do catálogo de regras: compilação a frio, carga do código compilado em cache,
+criação de motores, custo da verificação de mudanças e recarga com avaliações em andamento.
+
+Durante a fase de recarga, threads avaliam condutas sem parar (motor real, sem tabela de
+decisão) enquanto o catálogo, copiado para um diretório temporário, é alterado e recarregado
+repetidas vezes; o relatório traz o tempo de cada recarga, a latência das avaliações com e sem
+recargas e quantas avaliações falharam.
+
+Uso:
+    python -m benchmarks.bench_rules [--repeat 50] [--reloads 20] [--threads 4] [--output rel.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.corpus import generate_factors
+from benchmarks.stats import summarize, run_metadata
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def evaluate_under_load(evaluation, factors, seconds, threads, during=None):
+    """Latência das avaliações em `threads` threads por `seconds` segundos; `during` roda em paralelo."""
+    samples, errors = [], []
+    stop = threading.Event()
+    analysis = {"nivel_sugerido": "Nível 3", "palavras_chave_encontradas": ["exemplo"]}
+
+    def worker(offset):
+        i = offset
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                evaluation.evaluate_conduct("descrição", dict(analysis), *factors[i % len(factors)])
+            except Exception as e:
+                errors.append(repr(e))
+            samples.append(time.perf_counter() - start)
+            i += threads
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    result = None
+    if during is None:
+        time.sleep(seconds)
+    else:
+        result = during()
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return {"latency": summarize(samples), "errors": len(errors), "first_error": errors[0] if errors else None}, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da compilação e recarga do catálogo de regras.")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--reloads", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duração da medição de referência, sem recargas.")
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    import audit_log
+    import case_store
+    import rule_catalog
+
+    # Cópia descartável do catálogo: as recargas alteram o arquivo e gravam caches ao lado dele.
+    workdir = tempfile.mkdtemp()
+    catalog_path = os.path.join(workdir, "conduct_rules.json")
+    shutil.copyfile(rule_catalog.RULES_PATH, catalog_path)
+    rule_catalog.RULES_PATH = catalog_path
+    rule_catalog.RULES_RELOAD_SECONDS = 0
+    audit_log.AUDIT_LOG_PATH = ""
+    case_store.CASE_STORE_PATH = ""
+
+    cold = timed(lambda: rule_catalog.compile_catalog(catalog_path, use_cache=False), args.repeat)
+    rule_catalog.compile_catalog(catalog_path)
+    cached = timed(lambda: rule_catalog.compile_catalog(catalog_path), args.repeat)
+
+    import evaluation
+    from engine import ConductEvaluationEngine
+
+    evaluation.decision_table = None
+    engine_creation = timed(ConductEvaluationEngine, args.repeat)
+    rule_catalog.RULES_RELOAD_SECONDS = 1e-9
+    check = timed(rule_catalog.get_rule_base, args.repeat * 20)
+    # Daqui em diante as recargas são disparadas explicitamente, logo após cada alteração.
+    rule_catalog.RULES_RELOAD_SECONDS = 0
+
+    factors = generate_factors(500)
+    baseline, _ = evaluate_under_load(evaluation, factors, args.seconds, args.threads)
+
+    with open(catalog_path, encoding="utf-8") as catalog_file:
+        catalog = json.load(catalog_file)
+    original_text = catalog["no_suggestion"]["text"]
+
+    def reload_repeatedly():
+        samples = []
+        for n in range(args.reloads):
+            catalog["no_suggestion"]["text"] = f"{original_text} (revisão {n})"
+            with open(f"{catalog_path}.tmp", "w", encoding="utf-8") as catalog_file:
+                json.dump(catalog, catalog_file, ensure_ascii=False)
+            os.replace(f"{catalog_path}.tmp", catalog_path)
+            start = time.perf_counter()
+            rule_base = rule_catalog.reload_rules()
+            evaluation.refresh_rules()
+            samples.append(time.perf_counter() - start)
+            assert rule_base.engine_class.catalog["no_suggestion"]["text"].endswith(f"(revisão {n})")
+            time.sleep(args.seconds / max(1, args.reloads))
+        return samples
+
+    during_reload, reload_samples = evaluate_under_load(evaluation, factors, args.seconds, args.threads, reload_repeatedly)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": run_metadata(),
+        "config": {"repeat": args.repeat, "reloads": args.reloads, "threads": args.threads,
+                   "rules": len(rule_catalog.get_rule_base().engine_class.catalog_rules)},
+        "compile_cold": cold,
+        "compile_cached": cached,
+        "engine_creation": engine_creation,
+        "change_check": check,
+        "reload": summarize(reload_samples),
+        "evaluation_baseline": baseline,
+        "evaluation_during_reloads": during_reload,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    print(f"compilação {cold['p50_ms']:.2f} ms (cache {cached['p50_ms']:.2f} ms), recarga p50 {report['reload']['p50_ms']:.2f} ms; "
+          f"avaliações p99 {baseline['latency']['p99_ms']:.1f} -> {during_reload['latency']['p99_ms']:.1f} ms, "
+          f"{during_reload['errors']} falhas", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark do classificador semântico: vazão da API em lote contra chamadas individuais e
+acerto do nível em descrições com variações (erros de digitação, flexões) das frases do
+catálogo, comparado ao classificador por palavras-chave.
+
+Uso:
+    python -m benchmarks.bench_semantic [--cases 5000] [--output rel.json]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.corpus import FILLER, SUBJECTS
+from benchmarks.stats import run_metadata
+from KeyWords import ALL_KEYWORDS_MAPPING
+from keyword_matcher import classify_locally, LOCAL_CONFIDENCE_THRESHOLD
+from semantic_classifier import get_semantic_classifier
+
+
+def perturb(phrase, rng):
+    """Varia uma palavra da frase: remove uma letra, troca o plural ou remove os acentos."""
+    words = phrase.split()
+    i = rng.randrange(len(words))
+    word = words[i]
+    kind = rng.random()
+    if kind < 0.4 and len(word) > 4:
+        position = rng.randrange(1, len(word) - 1)
+        word = word[:position] + word[position + 1:]
+    elif kind < 0.7:
+        word = word[:-1] if word.endswith("s") else word + "s"
+    else:
+        word = word.translate(str.maketrans("áâãàéêíóôõúç", "aaaaeeiooouc"))
+    words[i] = word
+    return " ".join(words)
+
+
+def generate_variants(count, seed=0):
+    """Pares (descrição, nível esperado) com uma frase do catálogo alterada em cada descrição."""
+    rng = random.Random(seed)
+    catalog = [(level_name, phrase) for level_name, keywords_list in ALL_KEYWORDS_MAPPING.items() for phrase in keywords_list]
+    cases = []
+    for i in range(count):
+        level_name, phrase = rng.choice(catalog)
+        cases.append((f"{rng.choice(FILLER)}, {rng.choice(SUBJECTS)} fez {perturb(phrase, rng)} (caso {i}).", level_name))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do classificador semântico.")
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    classifier = get_semantic_classifier()
+    build_seconds = time.perf_counter() - start
+
+    cases = generate_variants(args.cases, args.seed)
+    descriptions = [description for description, _ in cases]
+
+    start = time.perf_counter()
+    batch_results = classifier.classify_batch(descriptions)
+    batch_seconds = time.perf_counter() - start
+
+    single_count = min(500, len(descriptions))
+    start = time.perf_counter()
+    for description in descriptions[:single_count]:
+        classifier.classify(description)
+    single_seconds = (time.perf_counter() - start) / single_count * len(descriptions)
+
+    semantic_hits = keyword_hits = keyword_confident = 0
+    for (description, expected), (result, _) in zip(cases, batch_results):
+        semantic_hits += result["nivel_sugerido"] == expected
+        local_result, confidence = classify_locally(description)
+        keyword_hits += local_result["nivel_sugerido"] == expected
+        keyword_confident += confidence >= LOCAL_CONFIDENCE_THRESHOLD
+
+    report = {
+        "meta": run_metadata(),
+        "config": {"cases": args.cases, "seed": args.seed, "min_score": classifier.min_score,
+                   "vocabulary": len(classifier.vocabulary), "keywords": len(classifier.phrases)},
+        "build_ms": build_seconds * 1000,
+        "batch": {"seconds": batch_seconds, "per_s": len(descriptions) / batch_seconds},
+        "single_estimated": {"seconds": single_seconds, "per_s": len(descriptions) / single_seconds},
+        "level_accuracy": {
+            "semantic": semantic_hits / len(cases),
+            "keyword_matcher": keyword_hits / len(cases),
+            "keyword_matcher_confident_share": keyword_confident / len(cases),
+        },
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    print(f"lote: {report['batch']['per_s']:.0f} descrições/s; acerto semântico "
+          f"{report['level_accuracy']['semantic']:.1%} vs palavras-chave {report['level_accuracy']['keyword_matcher']:.1%}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
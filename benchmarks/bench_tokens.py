@@ -0,0 +1,113 @@
+"""
+Relatório de tokens por avaliação: protocolo com frases completas ("full") versus o protocolo
+compacto de identificadores (keyword_ids.py), para o prompt e para a resposta.
+
+Os tokens são contados com model.count_tokens do Gemini (requer GEMINI_API_KEY), com o modelo
+configurado como em GeminiKeywordClient: a contagem do prompt inclui o response_schema de cada
+protocolo, também enviado a cada requisição. Sem acesso à API,
+--estimate usa uma estimativa grosseira (cerca de 4 caracteres por token, com o esquema
+serializado somado ao prompt), útil apenas para comparações locais.
+
+Uso:
+    python -m benchmarks.bench_tokens [--cases 200] [--estimate] [--output rel.json]
+"""
+import argparse
+import json
+import math
+import sys
+
+from benchmarks.corpus import generate_descriptions
+from benchmarks.stats import run_metadata
+from gemini_client import GEMINI_MODEL_NAME, RESPONSE_SCHEMA, build_prompt_prefix
+from keyword_ids import COMPACT_RESPONSE_SCHEMA, KEYWORD_INDEX, build_compact_prompt_prefix, compact_response
+from keyword_matcher import classify_locally
+
+CHARS_PER_TOKEN = 4
+
+PROTOCOLS = {
+    "full": (build_prompt_prefix, RESPONSE_SCHEMA, lambda result: result),
+    "compact": (build_compact_prompt_prefix, COMPACT_RESPONSE_SCHEMA, compact_response),
+}
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_counters(schema):
+    """(contagem do prompt com o esquema, contagem de texto avulso) pela estimativa de caracteres."""
+    schema_tokens = estimate_tokens(json.dumps(schema, ensure_ascii=False))
+    return (lambda text: estimate_tokens(text) + schema_tokens), estimate_tokens
+
+
+def api_counters(protocol):
+    """(contagem do prompt com o esquema, contagem de texto avulso) pelo count_tokens do modelo."""
+    import google.generativeai as genai
+    from gemini_client import GeminiKeywordClient
+
+    # O modelo do cliente traz o generation_config do protocolo; count_tokens o inclui na requisição.
+    client = GeminiKeywordClient(model_name=GEMINI_MODEL_NAME, protocol=protocol)
+    bare = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return (lambda text: client._model.count_tokens(text).total_tokens), (lambda text: bare.count_tokens(text).total_tokens)
+
+
+def measure(descriptions, prefix, encode, count_request, count_text):
+    """Médias de tokens do prompt (com o esquema) e da resposta (serializada como o modelo a devolveria)."""
+    prompt_tokens = response_tokens = 0
+    for description in descriptions:
+        prompt_tokens += count_request(f'{prefix}Descrição de conduta: "{description}"')
+        result, _ = classify_locally(description)
+        response_tokens += count_text(json.dumps(encode(result), ensure_ascii=False, separators=(",", ":")))
+    n = len(descriptions)
+    prefix_tokens = count_request(prefix)
+    return {
+        "prefix_tokens": prefix_tokens,
+        "schema_tokens": prefix_tokens - count_text(prefix),
+        "prompt_tokens_mean": prompt_tokens / n,
+        "response_tokens_mean": response_tokens / n,
+        "total_tokens_mean": (prompt_tokens + response_tokens) / n,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contagem de tokens dos protocolos de prompt do Gemini.")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--estimate", action="store_true", help="Estima por caracteres, sem chamar count_tokens.")
+    parser.add_argument("--output", help="Arquivo para o relatório JSON (padrão: saída padrão).")
+    args = parser.parse_args(argv)
+
+    from gemini_client import GEMINI_API_KEY
+
+    if not args.estimate and not GEMINI_API_KEY:
+        sys.exit("GEMINI_API_KEY não definida: a contagem usa model.count_tokens (ou use --estimate).")
+    descriptions = generate_descriptions(args.cases, args.seed)
+    results = {}
+    for protocol, (build_prefix, schema, encode) in PROTOCOLS.items():
+        counters = estimate_counters(schema) if args.estimate else api_counters(protocol)
+        results[protocol] = measure(descriptions, build_prefix(), encode, *counters)
+    full, compact = results["full"], results["compact"]
+
+    report = {
+        "meta": run_metadata(),
+        "config": {"cases": args.cases, "seed": args.seed, "model": GEMINI_MODEL_NAME,
+                   "counter": "estimate" if args.estimate else "count_tokens", "keywords": len(KEYWORD_INDEX)},
+        "full": full,
+        "compact": compact,
+        "reduction": {
+            key: 1 - compact[key] / full[key] if full[key] else 0.0
+            for key in ("prefix_tokens", "schema_tokens", "prompt_tokens_mean", "response_tokens_mean", "total_tokens_mean")
+        },
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    print(f"tokens por avaliação: {full['total_tokens_mean']:.0f} -> {compact['total_tokens_mean']:.0f} "
+          f"({report['reduction']['total_tokens_mean']:.0%} a menos)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
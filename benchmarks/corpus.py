@@ -0,0 +1,47 @@
+"""Geração determinística de descrições e combinações de fatores para os benchmarks."""
+import random
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+from factor_options import FACTOR_OPTIONS
+
+FILLER = [
+    "Durante o expediente", "Em uma reunião da equipe", "No corredor do bloco administrativo",
+    "Em um grupo de mensagens do setor", "Após a aula", "Na presença de outros servidores",
+]
+SUBJECTS = ["meu chefe", "um colega", "o coordenador", "uma servidora", "um professor"]
+NEUTRAL = [
+    "comentou algo sobre o projeto", "pediu para refazer o relatório", "saiu mais cedo",
+    "falou alto ao telefone", "não respondeu aos e-mails",
+]
+
+
+def generate_descriptions(count, seed=0, unique=True):
+    """Descrições que misturam frases do catálogo, variações e textos neutros."""
+    rng = random.Random(seed)
+    phrases = [phrase for keywords_list in ALL_KEYWORDS_MAPPING.values() for phrase in keywords_list]
+    descriptions = []
+    for i in range(count):
+        parts = [rng.choice(FILLER) + ",", rng.choice(SUBJECTS)]
+        kind = rng.random()
+        if kind < 0.6:
+            parts.append("fez " + rng.choice(phrases))
+        elif kind < 0.8:
+            parts.append("fez " + rng.choice(phrases) + " e " + rng.choice(phrases))
+        else:
+            parts.append(rng.choice(NEUTRAL))
+        if unique:
+            parts.append(f"(caso {i})")
+        descriptions.append(" ".join(parts) + ".")
+    return descriptions
+
+
+def generate_factors(count, seed=0):
+    """Combinações de fatores sorteadas entre as opções da interface, na ordem de FACTOR_OPTIONS."""
+    rng = random.Random(seed)
+    values = [list(options) for options in FACTOR_OPTIONS.values()]
+    return [tuple(rng.choice(v) for v in values) for _ in range(count)]
+
+
+def generate_cases(count, seed=0, unique=True):
+    """Pares (descrição, fatores) prontos para run_expert_system."""
+    return list(zip(generate_descriptions(count, seed, unique), generate_factors(count, seed)))
@@ -0,0 +1,71 @@
+"""
+Substituto local do google.generativeai para benchmarks.
+
+Responde com o mesmo JSON estruturado do modelo real (no protocolo configurado), usando o classificador local de
+palavras-chave, após uma latência configurável com jitter e uma taxa de erros simulada.
+"""
+import json
+import random
+import threading
+import time
+
+import google.generativeai as genai
+
+import gemini_client
+from keyword_ids import COMPACT_RESPONSE_SCHEMA, compact_response
+from keyword_matcher import classify_locally
+
+
+class FakeGeminiError(RuntimeError):
+    """Erro simulado da API (passageiro, como um 503 do serviço)."""
+    code = 503
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Imita genai.GenerativeModel.generate_content com latência, jitter e falhas controladas."""
+    latency = 0.8
+    jitter = 0.2
+    error_rate = 0.0
+    _random = random.Random(0)
+    _lock = threading.Lock()
+    calls = 0
+
+    def __init__(self, model_name, generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def generate_content(self, prompt, request_options=None, **kwargs):
+        cls = type(self)
+        with cls._lock:
+            cls.calls += 1
+            delay = max(0.0, cls.latency + cls._random.uniform(-cls.jitter, cls.jitter))
+            fail = cls._random.random() < cls.error_rate
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Tempo limite de {timeout}s excedido (simulado).")
+        time.sleep(delay)
+        if fail:
+            raise FakeGeminiError("Falha simulada da API do Gemini.")
+        description = prompt.rsplit('Descrição de conduta: "', 1)[-1].rstrip('"')
+        result, _ = classify_locally(description)
+        if getattr(self.generation_config, "response_schema", None) is COMPACT_RESPONSE_SCHEMA:
+            result = compact_response(result)
+        return FakeResponse(json.dumps(result, ensure_ascii=False))
+
+
+def install_fake_gemini(latency=0.8, jitter=0.2, error_rate=0.0, seed=0):
+    """Substitui o modelo do genai pelo falso e descarta o cliente já construído."""
+    FakeGenerativeModel.latency = latency
+    FakeGenerativeModel.jitter = jitter
+    FakeGenerativeModel.error_rate = error_rate
+    FakeGenerativeModel._random = random.Random(seed)
+    FakeGenerativeModel.calls = 0
+    genai.GenerativeModel = FakeGenerativeModel
+    gemini_client._client = None
+    return FakeGenerativeModel
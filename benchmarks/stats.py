@@ -0,0 +1,35 @@
+"""Funções auxiliares de estatística e metadados compartilhadas pelos benchmarks."""
+import platform
+import subprocess
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por interpolação linear sobre uma lista já ordenada."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples_seconds):
+    """Resumo em milissegundos de uma lista de durações em segundos."""
+    values = sorted(s * 1000 for s in samples_seconds)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else None,
+        "p50_ms": percentile(values, 0.50),
+        "p95_ms": percentile(values, 0.95),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": values[-1] if values else None,
+    }
+
+
+def run_metadata():
+    """Identificação do ambiente e do commit, para comparar relatórios entre versões."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "machine": platform.machine()}
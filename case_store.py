@@ -0,0 +1,287 @@
+"""
+Memória de casos: avaliações anteriores persistidas em SQLite, com índice de similaridade.
+
+Cada caso guarda a descrição, os fatores, a análise usada, o diagnóstico (ConductSeverity,
+explicações, recomendações e fatos registrados) e um vetor da descrição: n-gramas de caracteres
+projetados por hashing em um espaço de dimensão fixa e normalizados (similaridade do cosseno).
+O índice é atualizado a cada novo caso; a busca é exata (produto matricial sobre todos os
+vetores) até CASE_INDEX_EXACT_LIMIT casos e aproximada (LSH por hiperplanos aleatórios, com
+reordenação exata dos candidatos) a partir daí.
+
+Uso:
+    python case_store.py search "descrição" [-k 5]
+    python case_store.py stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from gemini_client import GEMINI_MODEL_NAME
+from keyword_matcher import normalize_text
+from response_cache import KEYWORDS_FINGERPRINT
+from semantic_classifier import word_ngrams
+
+# --- Configuração da Memória de Casos ---
+CASE_STORE_PATH = os.getenv("CASE_STORE_PATH", "case_store.sqlite3")
+CASE_VECTOR_DIMENSIONS = 512
+CASE_INDEX_EXACT_LIMIT = int(os.getenv("CASE_INDEX_EXACT_LIMIT", "50000"))
+# Similaridade a partir da qual um caso é considerado quase idêntico; a sua análise só é usada
+# depois de confirmada pela classificação local da nova descrição.
+CASE_REUSE_SIMILARITY = float(os.getenv("CASE_REUSE_SIMILARITY", "0.97"))
+LSH_TABLES = 16
+LSH_BITS = 12
+
+# Caminhos de análise reaproveitáveis: apenas respostas do Gemini (a classificação local é refeita
+# a cada avaliação, e análises já reaproveitadas não voltam a ser fonte de reaproveitamento).
+REUSABLE_PATHS = {"gemini", "gemini_hedge", "cache", None}
+
+
+def description_vector(description: str) -> np.ndarray:
+    """Vetor normalizado de n-gramas de caracteres com hashing de sinal (estável entre processos)."""
+    vector = np.zeros(CASE_VECTOR_DIMENSIONS, dtype=np.float32)
+    grams = set()
+    for word in normalize_text(description).split():
+        grams |= word_ngrams(word)
+    for gram in grams:
+        digest = zlib.crc32(gram.encode("utf-8"))
+        vector[digest % CASE_VECTOR_DIMENSIONS] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def analysis_version(model_name=GEMINI_MODEL_NAME) -> str:
+    """
+    Versão das análises reaproveitáveis: as mesmas partes de make_cache_key além da descrição
+    (catálogo de palavras-chave e modelo); editar KeyWords.py ou trocar o modelo invalida os casos.
+    """
+    return hashlib.sha256(f"{KEYWORDS_FINGERPRINT}\x1f{model_name}".encode("utf-8")).hexdigest()
+
+
+ANALYSIS_VERSION = analysis_version()
+
+
+def case_key(description, factors, version=None) -> str:
+    """Identifica uma avaliação pela descrição normalizada, pelos fatores e pela versão da análise (a atual por padrão)."""
+    raw = "\x1f".join([" ".join(normalize_text(description).split())] + list(factors) + [version or ANALYSIS_VERSION])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SimilarityIndex:
+    """Índice de vetores normalizados com inserção incremental e busca dos k mais similares."""
+    def __init__(self, dimensions=CASE_VECTOR_DIMENSIONS, exact_limit=CASE_INDEX_EXACT_LIMIT, seed=0):
+        self.exact_limit = exact_limit
+        self._vectors = np.zeros((1024, dimensions), dtype=np.float32)
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self.size = 0
+        self._planes = np.random.default_rng(seed).standard_normal((LSH_TABLES * LSH_BITS, dimensions)).astype(np.float32)
+        self._bit_weights = 1 << np.arange(LSH_BITS, dtype=np.int64)
+        self._buckets = None
+
+    def _signatures(self, vectors):
+        bits = (vectors @ self._planes.T > 0).reshape(len(vectors), LSH_TABLES, LSH_BITS)
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _bucket(self, rows):
+        for row, signature in zip(rows, self._signatures(self._vectors[rows])):
+            for table, value in enumerate(signature):
+                self._buckets[table].setdefault(int(value), []).append(row)
+
+    def add(self, case_id, vector):
+        self.add_many([case_id], vector[np.newaxis, :])
+
+    def add_many(self, case_ids, vectors):
+        needed = self.size + len(case_ids)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            self._vectors = np.resize(self._vectors, (capacity, self._vectors.shape[1]))
+            self._ids = np.resize(self._ids, capacity)
+        rows = np.arange(self.size, needed)
+        self._vectors[rows] = vectors
+        self._ids[rows] = case_ids
+        self.size = needed
+        if self._buckets is not None:
+            self._bucket(rows)
+        elif self.size > self.exact_limit:
+            # Passou do limite da busca exata: constrói as tabelas LSH uma única vez e as mantém a cada inserção.
+            self._buckets = [{} for _ in range(LSH_TABLES)]
+            self._bucket(np.arange(self.size))
+
+    @property
+    def approximate(self):
+        return self._buckets is not None
+
+    def search(self, vector, k=5):
+        """Lista de (id do caso, similaridade) em ordem decrescente."""
+        if self.size == 0:
+            return []
+        if self._buckets is None:
+            rows = None
+            scores = self._vectors[:self.size] @ vector
+        else:
+            candidates = set()
+            for table, value in enumerate(self._signatures(vector[np.newaxis, :])[0]):
+                candidates.update(self._buckets[table].get(int(value), ()))
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            if len(rows) == 0:
+                return []
+            scores = self._vectors[rows] @ vector
+        top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        ids = self._ids[top] if rows is None else self._ids[rows[top]]
+        return [(int(case_id), float(scores[i])) for case_id, i in zip(ids, top)]
+
+
+class CaseStore:
+    """Casos avaliados em SQLite, com o índice de similaridade carregado em memória."""
+    def __init__(self, path=CASE_STORE_PATH, exact_limit=CASE_INDEX_EXACT_LIMIT):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cases ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, case_key TEXT UNIQUE NOT NULL, created_at REAL NOT NULL, "
+            "description TEXT NOT NULL, factors TEXT NOT NULL, analysis TEXT NOT NULL, reusable INTEGER NOT NULL, "
+            "engine_fingerprint TEXT NOT NULL, severity_level INTEGER, severity_description TEXT, "
+            "result TEXT NOT NULL, vector BLOB NOT NULL, analysis_version TEXT NOT NULL DEFAULT '')"
+        )
+        # Bases criadas antes da coluna: os casos antigos ficam sem versão e não são reaproveitados.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cases)")}
+        if "analysis_version" not in columns:
+            self._conn.execute("ALTER TABLE cases ADD COLUMN analysis_version TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+        self.index = SimilarityIndex(exact_limit=exact_limit)
+        ids, vectors = [], []
+        for case_id, blob in self._conn.execute("SELECT id, vector FROM cases ORDER BY id"):
+            ids.append(case_id)
+            vectors.append(np.frombuffer(blob, dtype=np.float32))
+        if ids:
+            self.index.add_many(ids, np.vstack(vectors))
+
+    def record(self, description, factors, analysis, evaluation_result, engine_fingerprint, reusable=True):
+        """Persiste uma avaliação e a inclui no índice; avaliações repetidas (mesma case_key) são ignoradas."""
+        final_severity, ia_explanation, additional_explanations, recommendations, log_facts = evaluation_result
+        severity = final_severity.as_dict() if final_severity else None
+        result = {
+            "ia_explanation": ia_explanation,
+            "additional_explanations": additional_explanations,
+            "recommendations": recommendations,
+            "log_facts": [[name, values] for name, values in log_facts],
+        }
+        vector = description_vector(description)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cases (case_key, created_at, description, factors, analysis, reusable, "
+                "engine_fingerprint, severity_level, severity_description, result, vector, analysis_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    case_key(description, factors), time.time(), description, json.dumps(list(factors), ensure_ascii=False),
+                    json.dumps(analysis, ensure_ascii=False), int(reusable), engine_fingerprint,
+                    severity["level"] if severity else None, severity["description"] if severity else None,
+                    json.dumps(result, ensure_ascii=False), vector.tobytes(), ANALYSIS_VERSION,
+                ),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                self.index.add(cursor.lastrowid, vector)
+                return cursor.lastrowid
+        return None
+
+    def _load(self, case_ids):
+        placeholders = ",".join("?" * len(case_ids))
+        rows = self._conn.execute(
+            f"SELECT id, created_at, description, factors, analysis, reusable, engine_fingerprint, "
+            f"severity_level, severity_description, result, analysis_version FROM cases WHERE id IN ({placeholders})",
+            list(case_ids),
+        ).fetchall()
+        cases = {}
+        for (case_id, created_at, description, factors, analysis, reusable, fingerprint,
+             severity_level, severity_description, result, version) in rows:
+            cases[case_id] = {
+                "id": case_id, "created_at": created_at, "description": description,
+                "factors": tuple(json.loads(factors)), "analysis": json.loads(analysis), "reusable": bool(reusable),
+                "engine_fingerprint": fingerprint, "severity_level": severity_level,
+                "severity_description": severity_description, "result": json.loads(result),
+                "analysis_version": version,
+            }
+        return cases
+
+    def similar(self, description, k=5):
+        """Os k casos mais similares, como dicionários com o campo "similarity"."""
+        vector = description_vector(description)
+        with self._lock:
+            hits = self.index.search(vector, k)
+            cases = self._load([case_id for case_id, _ in hits]) if hits else {}
+        return [dict(cases[case_id], similarity=score) for case_id, score in hits if case_id in cases]
+
+    def find_exact(self, description, factors):
+        """Caso reaproveitável com a mesma descrição normalizada, os mesmos fatores e a versão de análise atual, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM cases WHERE case_key = ? AND reusable = 1 AND analysis_version = ?",
+                (case_key(description, factors), ANALYSIS_VERSION),
+            ).fetchone()
+            cases = self._load([row[0]]) if row else {}
+        return next(iter(cases.values()), None)
+
+    def find_reusable(self, description, min_similarity=CASE_REUSE_SIMILARITY, k=5):
+        """
+        Caso reaproveitável quase idêntico (o mais similar), com a versão de análise atual, ou None;
+        serve apenas de semente para a análise.
+        """
+        for case in self.similar(description, k):
+            if case["similarity"] >= min_similarity and case["reusable"] and case["analysis_version"] == ANALYSIS_VERSION:
+                return case
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cases": self.index.size, "approximate_index": self.index.approximate}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_case_store():
+    """Instância única por processo; None quando a memória de casos está desativada (CASE_STORE_PATH vazio)."""
+    global _store
+    if not CASE_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CaseStore(CASE_STORE_PATH)
+    return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta à memória de casos avaliados.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    search = subparsers.add_parser("search", help="Casos mais similares a uma descrição.")
+    search.add_argument("description")
+    search.add_argument("-k", type=int, default=5)
+    subparsers.add_parser("stats", help="Tamanho da memória e tipo de índice em uso.")
+    parser.add_argument("--path", default=CASE_STORE_PATH)
+    args = parser.parse_args(argv)
+
+    store = CaseStore(args.path)
+    if args.command == "stats":
+        print(json.dumps(store.stats(), ensure_ascii=False))
+        return
+    start = time.perf_counter()
+    cases = store.similar(args.description, args.k)
+    elapsed = time.perf_counter() - start
+    for case in cases:
+        print(f"{case['similarity']:.3f}  nível {case['severity_level']}  #{case['id']}  {case['description'][:100]}")
+    print(f"{len(cases)} casos em {elapsed * 1000:.1f} ms ({store.index.size} na memória).")
+
+
+if __name__ == "__main__":
+    main()
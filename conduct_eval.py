@@ -0,0 +1,261 @@
+"""
+Avaliação em lote, sem interface, de descrições de condutas.
+
+Uso:
+    python -m conduct_eval batch entrada.jsonl saida.jsonl [--concurrency 8] [--rate 2.0]
+
+Cada linha de entrada é um objeto JSON com "description" e, opcionalmente, "id" e os
+fatores adicionais (context, history, frequency, impact, non_verbal, intention,
+hierarchical_relation); fatores ausentes valem "na". Os resultados são gravados à
+medida que ficam prontos, e uma nova execução sobre o mesmo arquivo de saída retoma
+a partir dos registros já concluídos. Linhas que não são objetos JSON válidos, registros com
+campos inválidos e falhas na avaliação geram um registro com "error" e não interrompem o lote.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import evaluation
+from factor_options import FACTOR_OPTIONS
+from gemini_client import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from keyword_matcher import classify_locally, LOCAL_CONFIDENCE_THRESHOLD
+from latency_budget import is_transient_error
+from response_cache import make_cache_key
+from tracing import TRACER, TRACING_ENABLED
+
+FACTOR_FIELDS = list(FACTOR_OPTIONS)
+
+
+class TokenBucket:
+    """Limitador de taxa por balde de fichas, compartilhado pelas tarefas assíncronas."""
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def call_with_retry(func, *args, retries=4, base_delay=1.0, max_delay=30.0, limiter=None):
+    """Executa `func` em uma thread, repetindo com espera exponencial e jitter apenas em erros passageiros."""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            return await asyncio.to_thread(func, *args)
+        except Exception as e:
+            if attempt >= retries or not is_transient_error(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def completed_indices(output_path) -> set:
+    """Índices de registros já gravados no arquivo de saída (para retomar a execução)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                done.add(json.loads(line)["index"])
+            except (ValueError, KeyError):
+                # Linha truncada por uma interrupção; o registro será reprocessado.
+                continue
+    return done
+
+
+def severity_to_dict(severity):
+    if severity is None:
+        return None
+    return {"level": severity["level"], "description": severity["description"]}
+
+
+def cached_gemini_analysis(description):
+    """Resposta do Gemini já presente no cache, sem consultar o modelo; None quando ausente."""
+    return evaluation.response_cache.get(make_cache_key(description, GEMINI_MODEL_NAME))
+
+
+def evaluate_analysis(index, description, analysis, source, factors, llm_seconds):
+    """Etapa do motor de regras, executada fora do laço de eventos (é limitada pela CPU)."""
+    with TRACER.trace(entrypoint="batch", index=index, analysis_source=source):
+        TRACER.record_span("llm", llm_seconds)
+        TRACER.record_count("analysis_path", "path", source)
+        return evaluation.evaluate_conduct(
+            description, dict(analysis, **{evaluation.ANALYSIS_PATH_KEY: source}), *factors
+        )
+
+
+def record_error(record):
+    """Motivo pelo qual o registro não pode ser avaliado, ou None se ele for válido."""
+    if not isinstance(record, dict):
+        return "O registro deve ser um objeto JSON."
+    if not isinstance(record.get("description", ""), str):
+        return '"description" deve ser um texto.'
+    for name in FACTOR_FIELDS:
+        value = record.get(name, "na")
+        if value not in FACTOR_OPTIONS[name]:
+            return f"Valor inválido para {name!r}: {value!r}."
+    return None
+
+
+def error_record(index, record, error):
+    """Registro de saída para uma entrada que não pôde ser avaliada."""
+    return {"index": index, "id": record.get("id") if isinstance(record, dict) else None, "error": error}
+
+
+async def evaluate_record(index, record, limiter, args):
+    error = record_error(record)
+    if error is not None:
+        return error_record(index, record, error)
+    description = record.get("description", "")
+    factors = [record.get(name, "na") for name in FACTOR_FIELDS]
+
+    llm_start = time.perf_counter()
+    analysis, confidence = await asyncio.to_thread(classify_locally, description)
+    source = "local"
+    if confidence < LOCAL_CONFIDENCE_THRESHOLD:
+        if GEMINI_API_KEY:
+            source = "gemini"
+            try:
+                analysis = await call_with_retry(
+                    evaluation.request_gemini_analysis, description,
+                    retries=args.retries, base_delay=args.backoff, limiter=limiter,
+                )
+            except Exception as e:
+                error = str(e)
+                analysis, source = await asyncio.to_thread(evaluation.local_fallback, description, analysis)
+        else:
+            # Sem chave da API o modelo não é consultado; resta o cache e, na falta dele, a contingência local.
+            cached = await asyncio.to_thread(cached_gemini_analysis, description)
+            if cached is not None:
+                analysis, source = cached, "cache"
+            else:
+                analysis, source = await asyncio.to_thread(evaluation.local_fallback, description, analysis)
+
+    llm_seconds = time.perf_counter() - llm_start
+
+    result = await asyncio.to_thread(evaluate_analysis, index, description, analysis, source, factors, llm_seconds)
+    return build_output_record(index, record, source, result, error)
+
+
+def build_output_record(index, record, source, evaluation_result, error=None):
+    """Registro de saída em JSON para um resultado de evaluate_conduct."""
+    final_severity, ia_explanation, additional_explanations, recommendations, log_facts = evaluation_result
+    result = {
+        "index": index,
+        "id": record.get("id"),
+        "analysis_source": source,
+        "severity": severity_to_dict(final_severity),
+        "ia_explanation": ia_explanation,
+        "explanations": additional_explanations,
+        "recommendations": recommendations,
+        "log_facts": [[name, values] for name, values in log_facts],
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+async def run_batch(args):
+    done = completed_indices(args.output)
+    limiter = TokenBucket(args.rate, args.burst) if args.rate > 0 else None
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    counters = {"written": 0, "skipped": len(done), "invalid": 0}
+
+    with open(args.output, "a+", encoding="utf-8") as output_file:
+        # Garante que um registro truncado por interrupção não seja emendado ao próximo.
+        if output_file.tell() > 0:
+            output_file.seek(output_file.tell() - 1)
+            if output_file.read(1) != "\n":
+                output_file.write("\n")
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, record = item
+                try:
+                    result = await evaluate_record(index, record, limiter, args)
+                except Exception as e:
+                    # Uma falha inesperada vira um registro de erro; o trabalhador segue com o lote.
+                    result = error_record(index, record, f"Falha na avaliação: {e!r}")
+                output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output_file.flush()
+                # Registros de erro não têm diagnóstico (uma falha do Gemini com contingência local tem).
+                counters["written" if "severity" in result else "invalid"] += 1
+                if args.progress and counters["written"] % args.progress == 0:
+                    print(f"{counters['written']} registros avaliados", file=sys.stderr)
+
+        workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+        with open(args.input, encoding="utf-8") as input_file:
+            for index, line in enumerate(input_file):
+                if index in done or not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    # Linha malformada: registra o erro e segue com o restante do lote.
+                    output_file.write(json.dumps(error_record(index, None, f"JSON inválido: {e}"), ensure_ascii=False) + "\n")
+                    output_file.flush()
+                    counters["invalid"] += 1
+                    continue
+                await queue.put((index, record))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    return counters
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="conduct_eval", description="Avaliação de condutas sem interface.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    batch = subparsers.add_parser("batch", help="Avalia um arquivo JSONL de descrições.")
+    batch.add_argument("input")
+    batch.add_argument("output")
+    batch.add_argument("--concurrency", type=int, default=8, help="Chamadas simultâneas ao Gemini.")
+    batch.add_argument("--rate", type=float, default=2.0, help="Requisições por segundo ao Gemini (0 desativa o limite).")
+    batch.add_argument("--burst", type=float, default=None, help="Capacidade do balde de fichas.")
+    batch.add_argument("--retries", type=int, default=4)
+    batch.add_argument("--backoff", type=float, default=1.0, help="Espera inicial entre tentativas, em segundos.")
+    batch.add_argument("--progress", type=int, default=100, help="Intervalo de registros entre mensagens de progresso.")
+    batch.add_argument("--metrics", help="Grava as métricas no formato texto do Prometheus ao final.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # O cliente do Gemini se configura com GEMINI_API_KEY no primeiro uso.
+    if not GEMINI_API_KEY:
+        print("Aviso: GEMINI_API_KEY não definida; apenas a classificação local e o cache estarão disponíveis.", file=sys.stderr)
+    counters = asyncio.run(run_batch(args))
+    if args.metrics:
+        if TRACING_ENABLED:
+            TRACER.write_prometheus(args.metrics)
+        else:
+            print("Aviso: instrumentação desativada (CONDUCT_TRACING=0); métricas não gravadas.", file=sys.stderr)
+    print(f"Concluído: {counters['written']} avaliados, {counters['skipped']} já existentes, "
+          f"{counters['invalid']} registros com erro.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
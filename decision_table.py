@@ -0,0 +1,253 @@
+"""
+Tabela de decisão pré-compilada para o ConductEvaluationEngine.
+
+Todas as entradas do motor, exceto a descrição, são finitas: o estado da análise do Gemini
+(falha, ou nível 0 a 6 com ou sem palavras-chave) e as opções de cada fator adicional. O
+compilador executa o motor uma vez para cada combinação e guarda os fatos derivados
+(ConductSeverity, Explanation, Recommendation), os ids dos fatos e as regras disparadas (para o
+registro de auditoria) em uma tabela indexada por posição, de modo que a avaliação passa a ser
+uma consulta O(1).
+
+Uso:
+    python decision_table.py build [--processes N]
+    python decision_table.py verify [--sample N]
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import pickle
+import random
+import sys
+from array import array
+from multiprocessing import Pool
+
+from engine import ANALYSIS_PATH_LABELS, ConductEvaluationEngine, build_input_facts
+from factor_options import FACTOR_OPTIONS
+from rule_catalog import get_rule_base
+
+TABLE_FORMAT_VERSION = 3
+DECISION_TABLE_PATH = os.getenv("DECISION_TABLE_PATH", "decision_table.pkl")
+
+# Palavra-chave substituta usada na compilação; trocada pelas palavras reais na consulta.
+KEYWORD_SENTINEL = "\x00KW\x00"
+# Idem para o caminho da análise, trocado pelo rótulo correspondente de ANALYSIS_PATH_LABELS.
+PATH_SENTINEL = "\x00PATH\x00"
+
+# Estados possíveis do fato GeminiAnalysis: None representa a análise sem sucesso.
+ANALYSIS_STATES = [(None, False)] + [(level, has_keywords) for level in range(0, 7) for has_keywords in (False, True)]
+_STATE_INDEX = {state: i for i, state in enumerate(ANALYSIS_STATES)}
+
+FACTOR_VALUES = [list(options) for options in FACTOR_OPTIONS.values()]
+_VALUE_INDEX = [{value: i for i, value in enumerate(values)} for values in FACTOR_VALUES]
+_FACTOR_COMBINATIONS = 1
+for _values in FACTOR_VALUES:
+    _FACTOR_COMBINATIONS *= len(_values)
+
+
+def table_fingerprint(rules_digest=None) -> str:
+    """
+    Hash do motor, do compilador e do catálogo de regras (o em uso, se `rules_digest` não for dado)
+    e das opções; uma tabela com outro hash é considerada obsoleta.
+    """
+    digest = hashlib.sha256(str(TABLE_FORMAT_VERSION).encode())
+    # O código das regras é gerado por rule_catalog.py: mudar o gerador muda o motor compilado.
+    for module in ("engine.py", "rule_catalog.py"):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module), "rb") as source_file:
+            digest.update(source_file.read())
+    digest.update((rules_digest or get_rule_base().digest).encode())
+    digest.update(repr(FACTOR_VALUES).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def analysis_for_state(state):
+    level, has_keywords = state
+    if level is None:
+        return {"analysis_successful": False}
+    return {"suggested_level": level, "detected_keywords": [KEYWORD_SENTINEL] if has_keywords else [],
+            "analysis_successful": True, "analysis_path": PATH_SENTINEL}
+
+
+def state_for_analysis(analysis):
+    """Estado da tabela correspondente aos campos de GeminiAnalysis, ou None se fora do domínio."""
+    if not analysis.get("analysis_successful"):
+        return _STATE_INDEX[(None, False)]
+    return _STATE_INDEX.get((analysis.get("suggested_level"), bool(analysis.get("detected_keywords"))))
+
+
+def factor_offset(factors):
+    """Posição da combinação de fatores (base mista, na ordem de FACTOR_OPTIONS); None fora do domínio."""
+    if len(factors) != len(FACTOR_VALUES):
+        return None
+    offset = 0
+    for value, index, values in zip(factors, _VALUE_INDEX, FACTOR_VALUES):
+        position = index.get(value)
+        if position is None:
+            return None
+        offset = offset * len(values) + position
+    return offset
+
+
+def run_engine(engine, analysis, factors):
+    """
+    Executa o motor (criado com audit=True) para uma entrada, no mesmo formato de
+    DecisionTable.lookup_with_firings: (fatos derivados, ids dos fatos, regras disparadas).
+    """
+    engine.reset()
+    engine.log_facts = []
+    input_facts = build_input_facts("", analysis, *factors)
+    for fact in input_facts:
+        engine.declare(fact)
+    engine.run()
+    return engine.log_facts[len(input_facts):], engine.log_fact_ids, engine.firings
+
+
+def compile_state(state_index):
+    """Executa o motor para todas as combinações de fatores de um estado da análise."""
+    analysis = analysis_for_state(ANALYSIS_STATES[state_index])
+    engine = ConductEvaluationEngine(audit=True)
+    outcomes = []
+    for factors in itertools.product(*FACTOR_VALUES):
+        derived, fact_ids, firings = run_engine(engine, analysis, factors)
+        outcomes.append((
+            tuple((name, tuple(values.items())) for name, values in derived),
+            tuple(fact_ids),
+            tuple((order, rule, tuple(inputs), tuple(outputs)) for order, rule, inputs, outputs in firings),
+        ))
+    return outcomes
+
+
+class DecisionTable:
+    """Resultados distintos do motor e um índice compacto combinação -> resultado."""
+    def __init__(self, fingerprint, outcomes, index):
+        self.fingerprint = fingerprint
+        self.outcomes = outcomes
+        self.index = index
+
+    def lookup(self, analysis, factors):
+        """
+        Fatos derivados, como pares (nome, dicionário), para a análise e os fatores dados.
+        Retorna None quando a combinação não está no domínio da tabela.
+        """
+        found = self.lookup_with_firings(analysis, factors)
+        return found[0] if found is not None else None
+
+    def lookup_with_firings(self, analysis, factors):
+        """
+        Como lookup, acrescentando os ids de todos os fatos registrados (entrada e derivados) e as
+        regras disparadas no mesmo formato de ConductEvaluationEngine.firings; None fora do domínio.
+        """
+        state = state_for_analysis(analysis)
+        offset = factor_offset(factors)
+        if state is None or offset is None:
+            return None
+        outcome, fact_ids, firings = self.outcomes[self.index[state * _FACTOR_COMBINATIONS + offset]]
+        keywords = ", ".join(analysis.get("detected_keywords") or [])
+        path = analysis.get("analysis_path") or "gemini"
+        path_label = ANALYSIS_PATH_LABELS.get(path, path)
+        derived = []
+        for name, items in outcome:
+            values = {}
+            for key, value in items:
+                if isinstance(value, str) and "\x00" in value:
+                    value = value.replace(KEYWORD_SENTINEL, keywords).replace(PATH_SENTINEL, path_label)
+                values[key] = value
+            derived.append((name, values))
+        return derived, list(fact_ids), [[order, rule, list(inputs), list(outputs)] for order, rule, inputs, outputs in firings]
+
+    def save(self, path=DECISION_TABLE_PATH):
+        with open(path, "wb") as table_file:
+            pickle.dump((self.fingerprint, self.outcomes, self.index.typecode, self.index.tobytes()), table_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path=DECISION_TABLE_PATH):
+        with open(path, "rb") as table_file:
+            fingerprint, outcomes, typecode, raw_index = pickle.load(table_file)
+        index = array(typecode)
+        index.frombytes(raw_index)
+        return cls(fingerprint, outcomes, index)
+
+
+def compile_table(processes=None, progress=None) -> DecisionTable:
+    """Enumera todas as combinações de entrada executando o motor real."""
+    rules_digest = get_rule_base().digest
+    outcome_ids = {}
+    outcomes = []
+    positions = []
+    state_indices = range(len(ANALYSIS_STATES))
+    with Pool(processes) as pool:
+        for state_index, state_outcomes in zip(state_indices, pool.imap(compile_state, state_indices)):
+            for outcome in state_outcomes:
+                outcome_id = outcome_ids.get(outcome)
+                if outcome_id is None:
+                    outcome_id = outcome_ids[outcome] = len(outcomes)
+                    outcomes.append(outcome)
+                positions.append(outcome_id)
+            if progress:
+                progress(state_index + 1, len(ANALYSIS_STATES))
+    index = array("H" if len(outcomes) <= 0xFFFF else "I", positions)
+    return DecisionTable(table_fingerprint(rules_digest), outcomes, index)
+
+
+def load_table(path=DECISION_TABLE_PATH):
+    """Carrega a tabela se existir e corresponder às regras atuais; caso contrário, None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        table = DecisionTable.load(path)
+    except Exception:
+        return None
+    if table.fingerprint != table_fingerprint():
+        return None
+    return table
+
+
+def verify_table(table, sample=None, keywords=("palavra-chave exemplo",)):
+    """
+    Compara a tabela com o motor em execução para cada combinação (ou uma amostra).
+    Retorna a lista de combinações divergentes.
+    """
+    combinations = [(state, factors) for state in range(len(ANALYSIS_STATES)) for factors in itertools.product(*FACTOR_VALUES)]
+    if sample:
+        combinations = random.sample(combinations, min(sample, len(combinations)))
+    mismatches = []
+    engine = ConductEvaluationEngine(audit=True)
+    for state, factors in combinations:
+        analysis = analysis_for_state(ANALYSIS_STATES[state])
+        if analysis.get("detected_keywords"):
+            analysis["detected_keywords"] = list(keywords)
+        if analysis.get("analysis_successful"):
+            analysis["analysis_path"] = random.choice(list(ANALYSIS_PATH_LABELS))
+        if table.lookup_with_firings(analysis, factors) != run_engine(engine, analysis, factors):
+            mismatches.append((ANALYSIS_STATES[state], factors))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compilação e verificação da tabela de decisão.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Compila a tabela executando o motor para cada combinação.")
+    build.add_argument("--processes", type=int, default=None)
+    build.add_argument("--output", default=DECISION_TABLE_PATH)
+    verify = subparsers.add_parser("verify", help="Confere a tabela contra o motor em execução.")
+    verify.add_argument("--sample", type=int, default=None, help="Número de combinações sorteadas (padrão: todas).")
+    verify.add_argument("--path", default=DECISION_TABLE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        table = compile_table(args.processes, progress=lambda done, total: print(f"{done}/{total} estados compilados", file=sys.stderr))
+        table.save(args.output)
+        print(f"{len(table.index)} combinações, {len(table.outcomes)} resultados distintos -> {args.output}")
+    else:
+        table = load_table(args.path)
+        if table is None:
+            sys.exit(f"Tabela ausente ou obsoleta em {args.path}; execute 'python decision_table.py build'.")
+        mismatches = verify_table(table, args.sample)
+        for state, factors in mismatches[:20]:
+            print(f"Divergência: análise={state} fatores={factors}")
+        print(f"{len(mismatches)} divergências encontradas.")
+        sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from experta import *
+import time
+
+from experta import AS, DefFacts, Fact, Field, KnowledgeEngine, Rule, W
 
 # --- Definição dos Fatos ---
 
@@ -53,6 +55,51 @@ class GeminiAnalysis(Fact):
     suggested_level = Field(int, mandatory=False)
     detected_keywords = Field(list, mandatory=False)
     analysis_successful = Field(bool, mandatory=True, default=False)
+    analysis_path = Field(str, mandatory=False)
+
+# Caminho que produziu a análise -> início da explicação do nível base.
+ANALYSIS_PATH_LABELS = {
+    "gemini": "A análise da IA (Gemini)",
+    "gemini_hedge": "A análise da IA (Gemini, por requisição paralela de contingência)",
+    "cache": "A análise da IA (Gemini, resposta armazenada em cache)",
+    "local": "A classificação local por palavras-chave",
+    "semantic": "A classificação semântica local",
+    "case_memory": "A análise reaproveitada de um caso anterior idêntico ou quase idêntico",
+    "fallback_keywords": "A classificação local por palavras-chave (Gemini com falha ou acima do orçamento de latência)",
+    "fallback_semantic": "A classificação semântica local (Gemini com falha ou acima do orçamento de latência)",
+}
+
+# --- Declaração dos Fatos de Entrada ---
+
+def build_input_facts(description, analysis, context, history, frequency, impact, non_verbal, intention, hierarchical_relation):
+    """Fatos de entrada na ordem em que são declarados no motor."""
+    facts = [GeminiAnalysis(**analysis), ConductDescription(text=description)]
+    if context != "na": facts.append(ContextFact(context=context))
+    if history != "na": facts.append(HistoryFact(history=history))
+    if frequency != "na": facts.append(FrequencyFact(frequency=frequency))
+    if impact != "na": facts.append(ImpactFact(impact=impact))
+    if non_verbal != "na": facts.append(NonVerbalFact(non_verbal=non_verbal))
+    if intention != "na": facts.append(IntentionFact(intention=intention))
+    if hierarchical_relation != "na": facts.append(HierarchicalRelationFact(relation=hierarchical_relation))
+    return facts
+
+# Tipos de fato do domínio (exclui os fatos internos do experta).
+FACT_CLASSES = {ConductDescription, ContextFact, HistoryFact, FrequencyFact, ImpactFact, NonVerbalFact,
+                IntentionFact, HierarchicalRelationFact, ConductSeverity, Explanation, Recommendation, GeminiAnalysis}
+
+# Fatores adicionais: nome do parâmetro -> (classe do fato, campo com o valor).
+FACTOR_FACTS = {
+    "context": (ContextFact, "context"),
+    "history": (HistoryFact, "history"),
+    "frequency": (FrequencyFact, "frequency"),
+    "impact": (ImpactFact, "impact"),
+    "non_verbal": (NonVerbalFact, "non_verbal"),
+    "intention": (IntentionFact, "intention"),
+    "hierarchical_relation": (HierarchicalRelationFact, "relation"),
+}
+
+# Tipos dos fatos de entrada, na ordem em que build_input_facts os declara.
+INPUT_FACT_CLASSES = [GeminiAnalysis, ConductDescription] + [fact_class for fact_class, _ in FACTOR_FACTS.values()]
 
 # --- Motor de Inferência ---
 
@@ -61,14 +108,194 @@ class ConductEvaluationEngine(KnowledgeEngine):
     Motor de inferência para avaliação da gravidade de condutas,
     utilizando as regras do Guia Matriz Avaliação Gravidade Condutas da UFAPE.
     """
-    def __init__(self, *args, **kwargs):
+    # Preenchidos pela subclasse compilada a partir do catálogo de regras.
+    rules_digest = None
+    catalog = None
+    catalog_rules = ()
+
+    def __new__(cls, *args, **kwargs):
+        """
+        ConductEvaluationEngine(...) cria um motor com as regras do catálogo em uso: a instância é da
+        subclasse compilada mais recente, e as regras de um motor não mudam depois de criado.
+        """
+        if cls is ConductEvaluationEngine:
+            from rule_catalog import get_rule_base
+
+            cls = get_rule_base().engine_class
+        return super().__new__(cls)
+
+    def __init__(self, *args, tracer=None, incremental=False, audit=False, **kwargs):
         super().__init__(*args, **kwargs)
         self.log_facts = []
+        self.tracer = tracer
+        self.incremental = incremental
+        # Auditoria: ids dos fatos de log_facts (None quando repetido) e [ordem, regra, ids de entrada, ids declarados].
+        self.audit = audit
+        self.log_fact_ids = []
+        self.firings = []
+        self._audit_firing = None
+        # Modo incremental: id do fato derivado -> ids dos fatos que dispararam a regra que o criou,
+        # e os disparos vigentes [regra, saliência, ids de entrada, fatos declarados] (ver ordered_trace).
+        self._supports = {}
+        self._firing = None
+        self._live_firings = []
+        self._live_firing = None
+
+    def reset(self, **kwargs):
+        super().reset(**kwargs)
+        self._supports = {}
+        self._live_firings = []
+        self.log_fact_ids = []
+        self.firings = []
 
     def declare(self, fact):
         """Sobrescreve o método declare para logar os fatos."""
-        super().declare(fact)
+        declared = super().declare(fact)
         self.log_facts.append((fact.__class__.__name__, fact.as_dict()))
+        if self.tracer is not None:
+            self.tracer.record_fact(fact.__class__.__name__)
+        if declared is not None and self._firing is not None:
+            self._supports[declared.__factid__] = self._firing
+        if self._live_firing is not None:
+            self._live_firing[3].append(fact)
+        if self.audit:
+            self.log_fact_ids.append(declared.__factid__ if declared is not None else None)
+            if declared is not None and self._audit_firing is not None:
+                self._audit_firing[3].append(declared.__factid__)
+        return declared
+
+    def run(self, steps=float('inf')):
+        """
+        Sem tracer, auditoria ou modo incremental, delega ao experta. Caso contrário, dispara uma
+        ativação por vez para medir cada regra e registrar de quais fatos cada conclusão depende.
+        """
+        if self.tracer is None and not self.incremental and not self.audit:
+            return super().run(steps)
+        while steps > 0:
+            added, removed = self.get_activations()
+            self.strategy.update_agenda(self.agenda, added, removed)
+            if not self.agenda.activations:
+                break
+            # A próxima ativação é a última da lista; super().run(1) dispara exatamente ela.
+            activation = self.agenda.activations[-1]
+            if self.incremental:
+                self._firing = frozenset(f.__factid__ for f in activation.facts)
+                self._live_firing = [activation.rule.__name__, activation.rule.salience, self._firing, []]
+                self._live_firings.append(self._live_firing)
+            if self.audit:
+                self._audit_firing = [len(self.firings) + 1, activation.rule.__name__, sorted(f.__factid__ for f in activation.facts), []]
+                self.firings.append(self._audit_firing)
+            if self.tracer is not None:
+                self.tracer.observe_agenda(len(self.agenda.activations))
+                start = time.perf_counter()
+            try:
+                super().run(1)
+            finally:
+                self._firing = None
+                self._live_firing = None
+                self._audit_firing = None
+            if self.tracer is not None:
+                self.tracer.record_rule(activation.rule.__name__, time.perf_counter() - start)
+            steps -= 1
+
+    # --- Reavaliação Incremental ---
+    def retract_dependents(self, fact):
+        """Retrata, em cascata, as conclusões derivadas de um fato (que permanece declarado)."""
+        origin = fact.__factid__
+        pending, removed = [origin], set()
+        while pending:
+            idx = pending.pop()
+            for derived, support in self._supports.items():
+                if idx in support and derived not in removed:
+                    removed.add(derived)
+                    pending.append(derived)
+        for idx in sorted(removed, reverse=True):
+            if idx in self.facts:
+                self.retract(idx)
+            self._supports.pop(idx, None)
+
+    def find_fact(self, fact_class):
+        for fact in self.facts.values():
+            if isinstance(fact, fact_class):
+                return fact
+        return None
+
+    def update_factors(self, **factors):
+        """
+        Aplica apenas as mudanças nos fatores adicionais (chaves de FACTOR_FACTS; "na" remove o fato),
+        retratando as conclusões que dependiam dos valores antigos, e dispara somente as regras afetadas.
+        Requer um motor criado com incremental=True.
+        """
+        changed = False
+        for name, value in factors.items():
+            fact_class, field = FACTOR_FACTS[name]
+            current = self.find_fact(fact_class)
+            if (current[field] if current is not None else "na") == value:
+                continue
+            changed = True
+            if current is None:
+                self.declare(fact_class(**{field: value}))
+                continue
+            self.retract_dependents(current)
+            if value == "na":
+                self.retract(current)
+            else:
+                self.modify(current, **{field: value})
+        if changed:
+            # Disparos cujos fatos de entrada foram retratados ou modificados deixam de valer.
+            self._live_firings = [firing for firing in self._live_firings if all(idx in self.facts for idx in firing[2])]
+            self.run()
+        return changed
+
+    def current_facts(self):
+        """Fatos atualmente na memória de trabalho, no formato de log_facts."""
+        return [(fact.__class__.__name__, fact.as_dict()) for fact in self.facts.values()
+                if fact.__class__ in FACT_CLASSES]
+
+    def ordered_trace(self):
+        """
+        (log_facts, log_fact_ids, firings) que uma avaliação completa dos fatos vigentes produziria:
+        entradas na ordem de build_input_facts, conclusões e disparos na ordem em que o motor os
+        dispararia do zero. Os disparos vigentes são reordenados como na DepthStrategy do experta
+        (maior saliência e, depois, fatos mais recentes primeiro), com os ids de uma execução nova.
+        Requer um motor criado com incremental=True.
+        """
+        def key(fact):
+            return fact.__class__.__name__, repr(fact.as_dict())
+
+        live_ids = {key(fact): idx for idx, fact in self.facts.items()}
+        log_facts, log_fact_ids, firings = [], [], []
+        # Ids de uma execução nova: 0 e 1 são o InitialFact e o fato de _initial_facts.
+        id_map, declared = {}, {}
+
+        def replay_declare(fact):
+            fact_key = key(fact)
+            log_facts.append((fact.__class__.__name__, fact.as_dict()))
+            if fact_key in declared:
+                log_fact_ids.append(None)
+                return None
+            new_id = declared[fact_key] = len(declared) + 2
+            if fact_key in live_ids:
+                id_map[live_ids[fact_key]] = new_id
+            log_fact_ids.append(new_id)
+            return new_id
+
+        for fact_class in INPUT_FACT_CLASSES:
+            fact = self.find_fact(fact_class)
+            if fact is not None:
+                replay_declare(fact)
+
+        pending = [firing for firing in self._live_firings if all(idx in self.facts for idx in firing[2])]
+        while pending:
+            ready = [(salience, sorted((id_map[idx] for idx in support), reverse=True), position)
+                     for position, (_, salience, support, _) in enumerate(pending) if all(idx in id_map for idx in support)]
+            if not ready:
+                break
+            *_, position = max(ready)
+            rule, _, support, facts = pending.pop(position)
+            outputs = [new_id for new_id in map(replay_declare, facts) if new_id is not None]
+            firings.append([len(firings) + 1, rule, sorted(id_map[idx] for idx in support), outputs])
+        return log_facts, log_fact_ids, firings
 
     @DefFacts()
     def _initial_facts(self):
@@ -76,103 +303,34 @@ class ConductEvaluationEngine(KnowledgeEngine):
         yield Fact(system_initialized=True)
 
     # --- Regras de Diagnóstico da Gravidade ---
+    # Os textos vêm do catálogo (conduct_rules.json); as regras de explicação e de recomendação são
+    # geradas a partir dele em uma subclasse (rule_catalog.py).
     @Rule(AS.gemini_data << GeminiAnalysis(analysis_successful=True, suggested_level=W()), ~ConductSeverity(), salience=20)
     def set_base_severity_from_gemini(self, gemini_data):
         """Define o nível de gravidade base com base na análise bem-sucedida do Gemini."""
+        texts = self.catalog["base_severity"]
         level = gemini_data['suggested_level']
         description = self._get_severity_description(level)
         self.declare(ConductSeverity(level=level, description=description))
-        
-        keywords_text = f"Palavras-chave detectadas: {', '.join(gemini_data['detected_keywords'])}." if gemini_data.get('detected_keywords') else "Nenhuma palavra-chave específica foi detectada, mas a análise contextual sugeriu este nível."
+
+        if gemini_data.get('detected_keywords'):
+            keywords_text = texts["keywords_text"].format(keywords=', '.join(gemini_data['detected_keywords']))
+        else:
+            keywords_text = texts["no_keywords_text"]
+        # Caminhos sem rótulo aparecem literalmente (a tabela de decisão usa um marcador substituído na consulta).
+        path = gemini_data.get('analysis_path') or "gemini"
         self.declare(Explanation(
-            text=f"A análise da IA (Gemini) sugere um **Nível Base {level} ({description})** para a conduta descrita. {keywords_text}",
-            source="Análise IA"
+            text=texts["text"].format(path_label=ANALYSIS_PATH_LABELS.get(path, path), level=level, description=description, keywords_text=keywords_text),
+            source=texts["source"]
         ))
 
     @Rule(GeminiAnalysis(analysis_successful=False), ~ConductSeverity(), salience=5)
     def fallback_no_gemini_suggestion(self):
         """Se o Gemini falhar, define um nível padrão e informa o usuário."""
-        self.declare(ConductSeverity(level=0, description="Indeterminado pela IA"))
-        self.declare(Explanation(
-            text="A IA não conseguiu determinar um nível de gravidade claro a partir da descrição. A avaliação se baseará apenas nos fatores adicionais selecionados.",
-            source="Sistema"
-        ))
-
-    # --- Regras de Explicação para Fatores Adicionais ---
-    @Rule(ContextFact(context="Local Isolado com Conotação Sexual"))
-    def explain_context_sexual(self):
-        self.declare(Explanation(text="**Fator Agravante (Contexto):** A conduta ocorreu em um local isolado com conotação sexual, o que aumenta a sensação de vulnerabilidade da vítima.", source="Fator Adicional"))
-    
-    @Rule(ContextFact(context="Formal/Público"))
-    def explain_context_formal_public(self):
-        self.declare(Explanation(text="**Fator Contextual:** A conduta ocorreu em um ambiente formal e público. Dependendo do ato, isso pode ampliar o impacto e o constrangimento, representando um exemplo negativo.", source="Fator Adicional"))
-        
-    @Rule(HistoryFact(history=P(lambda x: x in ["Reincidente", "Frequente"])))
-    def explain_history(self):
-        self.declare(Explanation(text="**Fator Agravante (Histórico):** O agressor possui um histórico de condutas inapropriadas, o que sugere um padrão de comportamento e aumenta a gravidade da situação atual.", source="Fator Adicional"))
-
-    @Rule(FrequencyFact(frequency="Repetitivo e/ou Insistente"))
-    def explain_frequency_repetitive(self):
-        self.declare(Explanation(text="**Fator Agravante (Frequência):** A conduta é repetitiva e/ou insistente, o que pode criar um ambiente de trabalho hostil continuado e é tratado com mais seriedade.", source="Fator Adicional"))
-
-    @Rule(FrequencyFact(frequency="Ocasional"))
-    def explain_frequency_occasional(self):
-        self.declare(Explanation(text="**Fator de Atenção (Frequência):** A conduta ocorreu esporadicamente (mais de uma vez), indicando que não foi um evento totalmente isolado.", source="Fator Adicional"))
-
-    @Rule(ImpactFact(impact="Negativo intenso"))
-    def explain_impact_intense(self):
-        self.declare(Explanation(text="**Fator Agravante (Impacto):** A conduta teve um impacto negativo intenso na vítima, causando sofrimento de médio/longo prazo, o que é um forte indicador de gravidade.", source="Fator Adicional"))
-
-    @Rule(ImpactFact(impact="Negativo considerável"))
-    def explain_impact_considerable(self):
-        self.declare(Explanation(text="**Fator de Atenção (Impacto):** A conduta gerou consequências de curto prazo e não muito graves à vítima, mas ainda assim teve um impacto negativo considerável.", source="Fator Adicional"))
-
-    @Rule(NonVerbalFact(non_verbal="Agravado"))
-    def explain_non_verbal(self):
-        self.declare(Explanation(text="**Fator Agravante (Sinais Não-Verbais):** A conduta foi acompanhada por sinais não-verbais (linguagem corporal, expressões) que intensificaram sua negatividade, sugerindo ameaça ou desprezo.", source="Fator Adicional"))
-
-    @Rule(IntentionFact(intention="Intencional"))
-    def explain_intention_intentional(self):
-        self.declare(Explanation(text="**Fator Agravante (Intenção):** A conduta foi percebida como intencional, com o objetivo claro de causar dano ou desconforto, o que a torna mais grave do que um mal-entendido.", source="Fator Adicional"))
-        
-    @Rule(IntentionFact(intention="Negligente"))
-    def explain_intention_negligent(self):
-        self.declare(Explanation(text="**Fator de Atenção (Intenção):** A conduta foi percebida como negligente, indicando uma falta de consideração pelas consequências que o ato poderia causar na vítima.", source="Fator Adicional"))
-
-    @Rule(HierarchicalRelationFact(relation=P(lambda x: "Superior" in x)))
-    def explain_hierarchy(self):
-        self.declare(Explanation(text="**Fator Agravante (Hierarquia):** Existe uma relação hierárquica de superioridade do agressor sobre a vítima. Essa dinâmica de poder intensifica o impacto da conduta e a dificuldade da vítima em se defender.", source="Fator Adicional"))
-
-    # --- Regras para Recomendações ---
-    @Rule(ConductSeverity(level=P(lambda x: x in [1, 2])), salience=1)
-    def recommend_level_1_2(self):
-        self.declare(Recommendation(text="**Ação Educativa:** Recomenda-se uma conversa orientativa com o ofensor para esclarecer o impacto de suas ações, mesmo que não intencionais."))
-        self.declare(Recommendation(text="**Mediação:** Se apropriado, uma mediação entre as partes pode ser considerada para resolver mal-entendidos."))
-        self.declare(Recommendation(text="**Monitoramento:** Acompanhar o comportamento para garantir que a conduta não se repita ou escale."))
-
-    @Rule(ConductSeverity(level=P(lambda x: x in [3, 4])), salience=1)
-    def recommend_level_3_4(self):
-        self.declare(Recommendation(text="**Encaminhamento Formal:** Registrar a ocorrência na Ouvidoria e/ou Comissão de Ética para análise formal."))
-        self.declare(Recommendation(text="**Capacitação Obrigatória:** O ofensor deve ser direcionado para cursos e treinamentos obrigatórios sobre assédio, discriminação e respeito no ambiente de trabalho."))
-        self.declare(Recommendation(text="**Advertência Formal:** Considerar a aplicação de uma advertência formal, conforme o regime disciplinar vigente."))
-        self.declare(Recommendation(text="**Apoio à Vítima:** Oferecer suporte psicológico e orientação à vítima sobre seus direitos e os procedimentos institucionais."))
-
-    @Rule(ConductSeverity(level=P(lambda x: x in [5, 6])), salience=1)
-    def recommend_level_5_6(self):
-        self.declare(Recommendation(text="**Ação Imediata:** Garantir a segurança da vítima, o que pode incluir o afastamento temporário do agressor de suas atividades ou do contato com a vítima."))
-        self.declare(Recommendation(text="**Abertura de Processo Disciplinar:** Encaminhar imediatamente a denúncia para a instauração de um Processo Administrativo Disciplinar (PAD) ou similar."))
-        self.declare(Recommendation(text="**Suporte Integral à Vítima:** Oferecer de forma proativa todo o suporte necessário à vítima, incluindo apoio psicológico, jurídico e de segurança."))
-        if self.facts.get(Fact(level=6)):
-             self.declare(Recommendation(text="**Autoridades Externas:** Orientar a vítima a registrar um Boletim de Ocorrência e a buscar as autoridades policiais, dado o caráter criminal da conduta."))
+        texts = self.catalog["no_suggestion"]
+        self.declare(ConductSeverity(level=texts["level"], description=texts["description"]))
+        self.declare(Explanation(text=texts["text"], source=texts["source"]))
 
     def _get_severity_description(self, level):
         """Auxiliar para obter a descrição do nível de gravidade."""
-        descriptions = {
-            1: "Em geral, não ofensivo",
-            2: "Constrangedor e levemente ofensivo",
-            3: "Ofensivo",
-            4: "Bastante ofensivo",
-            5: "Agressivo e não fisicamente violento",
-            6: "Agressivo e fisicamente violento"
-        }
-        return descriptions.get(level, "Nível desconhecido")
\ No newline at end of file
+        return self.catalog["severity_levels"].get(str(level), self.catalog["unknown_severity"])
@@ -0,0 +1,368 @@
+import os
+import sqlite3
+import threading
+
+from engine import ConductEvaluationEngine, ConductSeverity, Explanation, Recommendation, FACTOR_FACTS, ANALYSIS_PATH_LABELS, build_input_facts
+from gemini_client import get_client, GEMINI_TIMEOUT_SECONDS
+from response_cache import ResponseCache, make_cache_key
+from keyword_matcher import classify_locally, LOCAL_CONFIDENCE_THRESHOLD
+from decision_table import load_table, table_fingerprint
+from tracing import TRACER, TRACING_ENABLED
+from single_flight import SingleFlight
+from latency_budget import HedgedCaller, LatencyBudgetExceeded
+from audit_log import build_audit_record, get_audit_log
+from rule_catalog import get_rule_base
+
+NO_SUGGESTION = {"nivel_sugerido": "Nenhum Nível Sugerido", "palavras_chave_encontradas": []}
+# Chave acrescentada ao resultado da análise com o caminho que o produziu (ver ANALYSIS_PATH_LABELS).
+ANALYSIS_PATH_KEY = "origem_analise"
+
+response_cache = ResponseCache()
+gemini_flights = SingleFlight()
+gemini_hedging = HedgedCaller()
+COALESCE_WAIT_SECONDS = float(os.getenv("GEMINI_COALESCE_WAIT_SECONDS", str(GEMINI_TIMEOUT_SECONDS + 5)))
+# Tabela pré-compilada (python decision_table.py build); sem ela, o motor é executado a cada avaliação.
+decision_table = load_table()
+# Identifica a versão das regras; diagnósticos da memória de casos só são reaproveitados na mesma versão.
+ENGINE_FINGERPRINT = table_fingerprint()
+_rules_digest = get_rule_base().digest
+_rules_lock = threading.Lock()
+
+
+def refresh_rules():
+    """
+    Acompanha a recarga do catálogo de regras: quando as regras em uso mudam, a tabela de decisão
+    é recarregada (e descartada se não corresponder às novas regras) e a versão é atualizada.
+    """
+    global decision_table, ENGINE_FINGERPRINT, _rules_digest
+    digest = get_rule_base().digest
+    if digest != _rules_digest:
+        with _rules_lock:
+            if digest != _rules_digest:
+                decision_table = load_table()
+                ENGINE_FINGERPRINT = table_fingerprint(digest)
+                _rules_digest = digest
+    return digest
+
+
+def _notify_nothing(kind, message):
+    pass
+
+
+# --- Função de chamada do Gemini ---
+def request_gemini_analysis(user_description: str, timeout=None) -> dict:
+    """
+    Consulta o Gemini (ou o cache) e devolve o JSON da resposta; propaga exceções da API.
+    `timeout` limita a requisição (padrão: o do cliente).
+    """
+    client = get_client()
+    cache_key = make_cache_key(user_description, client.model_name)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    def fetch():
+        result = client.extract_keywords(user_description, timeout=timeout)
+        response_cache.set(cache_key, result)
+        return result
+
+    # Sessões que pedem a mesma análise ao mesmo tempo compartilham uma única chamada.
+    return gemini_flights.do(cache_key, fetch, timeout=COALESCE_WAIT_SECONDS)
+
+
+def budgeted_gemini_analysis(user_description: str):
+    """
+    Consulta o Gemini dentro do orçamento de latência, com requisição de contingência.
+    Retorna (resposta, caminho); propaga LatencyBudgetExceeded e as exceções da API.
+    """
+    client = get_client()
+    cache_key = make_cache_key(user_description, client.model_name)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached, "cache"
+
+    def primary(timeout):
+        return request_gemini_analysis(user_description, timeout=timeout)
+
+    def hedge(timeout):
+        # A contingência não passa pelo agrupamento: esperaria pela mesma chamada lenta.
+        result = client.extract_keywords(user_description, timeout=timeout)
+        response_cache.set(cache_key, result)
+        return result
+
+    result, winner = gemini_hedging.call(primary, hedge)
+    return result, ("gemini", "gemini_hedge")[winner]
+
+
+def semantic_fallback(user_description: str):
+    """Análise pelo classificador semântico local; None quando ele não sugere nenhum nível."""
+    # Importação tardia: o NumPy só é carregado quando o Gemini falha.
+    from semantic_classifier import classify_semantically
+
+    result, confidence = classify_semantically(user_description)
+    return (result, confidence) if result["nivel_sugerido"] != NO_SUGGESTION["nivel_sugerido"] else None
+
+
+def local_fallback(user_description: str, local_result=None):
+    """
+    Classificação local quando o Gemini falha ou esgota o orçamento: palavras-chave e, depois, a
+    semântica. `local_result` reaproveita a classificação por palavras-chave já calculada.
+    """
+    result = local_result if local_result is not None else classify_locally(user_description)[0]
+    if result["nivel_sugerido"] != NO_SUGGESTION["nivel_sugerido"]:
+        return result, "fallback_keywords"
+    semantic = semantic_fallback(user_description)
+    if semantic is not None:
+        return semantic[0], "fallback_semantic"
+    return dict(NO_SUGGESTION), "none"
+
+
+def extract_keywords_with_gemini(user_description: str, notify=_notify_nothing, local_result=None) -> dict:
+    try:
+        result, path = budgeted_gemini_analysis(user_description)
+    except LatencyBudgetExceeded as e:
+        notify("warning", f"{e} A classificação local será usada.")
+        result, path = local_fallback(user_description, local_result)
+    except Exception as e:
+        notify("error", f"Erro ao chamar a API do Gemini: {e}")
+        result, path = local_fallback(user_description, local_result)
+    if path in ("fallback_keywords", "fallback_semantic"):
+        notify("warning", f"Nível sugerido por: {ANALYSIS_PATH_LABELS[path]}.")
+    TRACER.record_count("analysis_path", "path", path)
+    return dict(result, **{ANALYSIS_PATH_KEY: path})
+
+
+def analyze_description(description, notify=_notify_nothing) -> dict:
+    """Usa o classificador local quando ele é confiável; caso contrário, consulta o Gemini."""
+    local_result, local_confidence = classify_locally(description)
+    if local_confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+        notify("info", f"Classificação local por palavras-chave (confiança {local_confidence:.0%}); consulta ao Gemini dispensada.")
+        TRACER.record_count("analysis_path", "path", "local")
+        return dict(local_result, **{ANALYSIS_PATH_KEY: "local"})
+    seeded = similar_case_analysis(description, local_result, notify)
+    if seeded is not None:
+        return seeded
+    notify("info", "Realizando análise de texto com IA (Gemini)...")
+    return extract_keywords_with_gemini(description, notify, local_result)
+
+
+# --- Avaliação pelo Sistema Especialista ---
+def parse_analysis(gemini_result, notify=_notify_nothing) -> dict:
+    """Converte a resposta do Gemini nos campos do fato GeminiAnalysis."""
+    suggested_level = gemini_result.get("nivel_sugerido")
+    detected_keywords = gemini_result.get("palavras_chave_encontradas", [])
+
+    if suggested_level and suggested_level.startswith("Nível "):
+        try:
+            level_num = int(suggested_level.split(" ")[1])
+            notify("success", f"Análise do Gemini concluída. Nível base sugerido: {suggested_level}.")
+            analysis = {"suggested_level": level_num, "detected_keywords": detected_keywords, "analysis_successful": True}
+            if gemini_result.get(ANALYSIS_PATH_KEY):
+                analysis["analysis_path"] = gemini_result[ANALYSIS_PATH_KEY]
+            return analysis
+        except (ValueError, IndexError):
+            pass
+    return {"analysis_successful": False}
+
+
+def summarize_log_facts(log_facts):
+    """Extrai gravidade final, explicações e recomendações dos fatos registrados pelo motor."""
+    final_severity, ia_explanation, additional_explanations, recommendations = None, None, [], []
+    all_severity_facts = []
+
+    for fact_name, fact_dict in log_facts:
+        if fact_name == 'ConductSeverity':
+            all_severity_facts.append(ConductSeverity(**fact_dict))
+        elif fact_name == 'Explanation':
+            exp = Explanation(**fact_dict)
+            if exp['source'] == "Análise IA" or exp['source'] == "Sistema":
+                ia_explanation = exp['text']
+            elif exp['source'] == "Fator Adicional":
+                additional_explanations.append(exp['text'])
+        elif fact_name == 'Recommendation':
+            rec = Recommendation(**fact_dict)
+            recommendations.append(rec['text'])
+
+    if all_severity_facts:
+        final_severity = all_severity_facts[-1]
+
+    return final_severity, ia_explanation, additional_explanations, recommendations
+
+
+def audit_evaluation(log_facts, fact_ids, firings):
+    """Envia o registro de auditoria da avaliação, se ativado; a gravação ocorre em segundo plano."""
+    sink = get_audit_log()
+    if sink is None:
+        return
+    trace = TRACER.current
+    entrypoint = trace["attributes"].get("entrypoint") if trace else None
+    sink.submit(build_audit_record(entrypoint, log_facts, fact_ids, firings, trace["trace_id"] if trace else None))
+
+
+def evaluate_conduct(description, gemini_result, context, history, frequency, impact, non_verbal, intention, hierarchical_relation, notify=_notify_nothing, engine=None):
+    """
+    Declara os fatos no motor a partir de uma análise já obtida e extrai o diagnóstico.
+    Um `engine` existente pode ser passado para ser reaproveitado (é reiniciado antes do uso).
+    """
+    analysis = parse_analysis(gemini_result, notify)
+    input_facts = build_input_facts(description, analysis, context, history, frequency, impact, non_verbal, intention, hierarchical_relation)
+    audit = get_audit_log() is not None
+    refresh_rules()
+    table = decision_table
+
+    if table is not None:
+        with TRACER.span("decision_table_lookup"):
+            found = table.lookup_with_firings(analysis, (context, history, frequency, impact, non_verbal, intention, hierarchical_relation))
+        if found is not None:
+            derived, fact_ids, firings = found
+            log_facts = [(fact.__class__.__name__, fact.as_dict()) for fact in input_facts] + derived
+            if audit:
+                audit_evaluation(log_facts, fact_ids, firings)
+            with TRACER.span("result_extraction"):
+                return summarize_log_facts(log_facts) + (log_facts,)
+
+    if engine is None:
+        engine = ConductEvaluationEngine(tracer=TRACER if TRACING_ENABLED else None, audit=audit)
+    else:
+        engine.audit = audit
+    with TRACER.span("engine_reset"):
+        engine.reset()
+        engine.log_facts = []
+    with TRACER.span("engine_declare"):
+        for fact in input_facts:
+            engine.declare(fact)
+    with TRACER.span("engine_run"):
+        engine.run()
+
+    if audit:
+        audit_evaluation(engine.log_facts, engine.log_fact_ids, engine.firings)
+    with TRACER.span("result_extraction"):
+        return summarize_log_facts(engine.log_facts) + (engine.log_facts,)
+
+
+class IncrementalEvaluation:
+    """
+    Motor mantido vivo para uma descrição já analisada. Quando apenas os fatores adicionais
+    mudam, o fato GeminiAnalysis é reaproveitado e só as regras afetadas são disparadas.
+    """
+    def __init__(self, description, analysis, context, history, frequency, impact, non_verbal, intention, hierarchical_relation):
+        self.description = description
+        self.analysis = analysis
+        self.engine = ConductEvaluationEngine(tracer=TRACER if TRACING_ENABLED else None, incremental=True,
+                                              audit=get_audit_log() is not None)
+        self.engine.reset()
+        for fact in build_input_facts(description, analysis, context, history, frequency, impact, non_verbal, intention, hierarchical_relation):
+            self.engine.declare(fact)
+        self.engine.run()
+
+    @property
+    def rules_digest(self):
+        """Versão do catálogo com que o motor da sessão foi criado."""
+        return self.engine.rules_digest
+
+    @classmethod
+    def from_log_facts(cls, description, log_facts, *factors):
+        """Reconstrói a sessão a partir do GeminiAnalysis registrado em uma avaliação anterior."""
+        for fact_name, fact_dict in log_facts:
+            if fact_name == 'GeminiAnalysis':
+                return cls(description, dict(fact_dict), *factors)
+        return None
+
+    def update(self, context, history, frequency, impact, non_verbal, intention, hierarchical_relation):
+        """Aplica os novos fatores e devolve o resultado no mesmo formato de evaluate_conduct."""
+        factors = dict(zip(FACTOR_FACTS, (context, history, frequency, impact, non_verbal, intention, hierarchical_relation)))
+        with TRACER.trace(entrypoint="incremental_update"):
+            with TRACER.span("engine_update"):
+                self.engine.update_factors(**factors)
+            with TRACER.span("result_extraction"):
+                log_facts, fact_ids, firings = self.engine.ordered_trace()
+            if self.engine.audit:
+                # O registro é o mesmo de uma avaliação completa com os novos fatores.
+                audit_evaluation(log_facts, fact_ids, firings)
+            return summarize_log_facts(log_facts) + (log_facts,)
+
+    def result(self):
+        """Resultado vigente, na mesma ordem de uma avaliação completa (evaluate_conduct)."""
+        log_facts, _, _ = self.engine.ordered_trace()
+        return summarize_log_facts(log_facts) + (log_facts,)
+
+
+def _case_store():
+    # Importação tardia: a memória de casos carrega o NumPy e o índice de vetores.
+    from case_store import get_case_store
+
+    return get_case_store()
+
+
+def recall_case(description, factors, notify=_notify_nothing):
+    """
+    Análise de um caso já avaliado com a mesma descrição normalizada e os mesmos fatores (mesma
+    case_key), ou None. O diagnóstico é refeito a partir dela por evaluate_conduct, com a descrição
+    atual e as regras em uso, e registrado na auditoria como qualquer outra avaliação.
+    """
+    store = _case_store()
+    if store is None:
+        return None
+    with TRACER.span("case_lookup"):
+        case = store.find_exact(description, factors)
+    if case is None:
+        return None
+    TRACER.record_count("analysis_path", "path", "case_memory")
+    notify("info", "Caso idêntico já avaliado; análise reaproveitada sem consulta ao Gemini.")
+    return dict(case["analysis"], **{ANALYSIS_PATH_KEY: "case_memory"})
+
+
+def similar_case_analysis(description, local_result, notify=_notify_nothing):
+    """
+    Análise de um caso quase idêntico, aceita apenas quando a classificação local da nova descrição
+    sugere o mesmo nível; as palavras-chave são as encontradas na nova descrição. None caso contrário.
+    """
+    store = _case_store()
+    if store is None:
+        return None
+    with TRACER.span("case_lookup"):
+        case = store.find_reusable(description)
+    if case is None or case["analysis"].get("nivel_sugerido") != local_result["nivel_sugerido"]:
+        return None
+    TRACER.record_count("analysis_path", "path", "case_memory")
+    notify("info", f"Caso quase idêntico já avaliado (similaridade {case['similarity']:.0%}), com o mesmo nível "
+                   "da classificação local; análise reaproveitada sem consulta ao Gemini.")
+    return dict(local_result, **{ANALYSIS_PATH_KEY: "case_memory"})
+
+
+def remember_case(description, factors, gemini_result, evaluation_result):
+    """Registra a avaliação na memória de casos, se ativada."""
+    from case_store import REUSABLE_PATHS
+
+    store = _case_store()
+    if store is None:
+        return
+    try:
+        store.record(description, factors, gemini_result, evaluation_result, ENGINE_FINGERPRINT,
+                     reusable=gemini_result.get(ANALYSIS_PATH_KEY) in REUSABLE_PATHS)
+    except sqlite3.Error:
+        # A memória de casos é auxiliar: uma falha ao gravar não invalida a avaliação.
+        pass
+
+
+def similar_cases(description, k=5):
+    """Casos já avaliados mais parecidos com a descrição (lista vazia se a memória estiver desativada)."""
+    store = _case_store()
+    return store.similar(description, k) if store is not None else []
+
+
+def run_expert_system(description, context, history, frequency, impact, non_verbal, intention, hierarchical_relation, notify=_notify_nothing):
+    """
+    Fluxo completo de avaliação sem dependência de interface.
+    `notify(tipo, mensagem)` recebe as mensagens de progresso ("info", "success", "warning", "error").
+    """
+    factors = (context, history, frequency, impact, non_verbal, intention, hierarchical_relation)
+    with TRACER.trace(entrypoint="run_expert_system"):
+        refresh_rules()
+        gemini_result = recall_case(description, factors, notify)
+        if gemini_result is None:
+            with TRACER.span("llm"):
+                gemini_result = analyze_description(description, notify)
+        result = evaluate_conduct(description, gemini_result, *factors, notify)
+        remember_case(description, factors, gemini_result, result)
+        return result
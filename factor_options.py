@@ -0,0 +1,63 @@
+# Opções dos fatores adicionais apresentadas na interface.
+# As chaves são os valores declarados no motor de inferência; "na" significa que o fato não é declarado.
+
+CONTEXT_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Formal/Público": "Formal (reunião, apresentação) e Público (afetando mais pessoas)",
+    "Formal/Privado": "Formal (reunião, apresentação) e Privado (apenas indivíduos específicos)",
+    "Informal/Público": "Informal (evento social, conversa casual) e Público (afetando mais pessoas)",
+    "Informal/Privado": "Informal (evento social, conversa casual) e Privado (apenas indivíduos específicos)",
+    "Local Isolado com Conotação Sexual": "Local fechado ou isolado, com conotação sexual (aumenta vulnerabilidade)"
+}
+
+HISTORY_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Primário": "Sem histórico anterior de condutas inapropriadas",
+    "Reincidente": "Histórico de condutas similares ou relacionadas",
+    "Frequente": "Múltiplas reincidências que indicam um padrão comportamental"
+}
+
+FREQUENCY_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Isolado": "Incidente único sem repetições conhecidas",
+    "Ocasional": "Ocorre esporadicamente, mas mais de uma vez",
+    "Repetitivo e/ou Insistente": "Acontece frequentemente"
+}
+
+IMPACT_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Não-significativo": "Não teve maiores repercussões para a vítima",
+    "Negativo considerável": "Gerou consequências de curto prazo e não muito graves à vítima",
+    "Negativo intenso": "Gerou consequências de médio e longo prazo, causando sofrimento"
+}
+
+NON_VERBAL_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Neutro": "Sem sinais não-verbais significativos",
+    "Agravado": "Sinais não-verbais que intensificam a negatividade (ameaça, desprezo)"
+}
+
+INTENTION_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Acidental": "Sem intenção clara de causar dano",
+    "Negligente": "Falta de consideração pelas consequências",
+    "Intencional": "Evidente objetivo de causar dano ou desconforto"
+}
+
+HIERARCHICAL_RELATION_OPTIONS = {
+    "na": "Não se aplica / Não informado",
+    "Mesmo nível hierárquico ou não relevante": "Colegas ou sem relação de subordinação direta",
+    "Superior subordinado direto": "O agressor é superior direto da vítima",
+    "Superior subordinado indireto": "O agressor tem posição superior, mas não direta"
+}
+
+# Ordem fixa dos fatores, na mesma sequência dos parâmetros de run_expert_system.
+FACTOR_OPTIONS = {
+    "context": CONTEXT_OPTIONS,
+    "history": HISTORY_OPTIONS,
+    "frequency": FREQUENCY_OPTIONS,
+    "impact": IMPACT_OPTIONS,
+    "non_verbal": NON_VERBAL_OPTIONS,
+    "intention": INTENTION_OPTIONS,
+    "hierarchical_relation": HIERARCHICAL_RELATION_OPTIONS,
+}
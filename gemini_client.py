@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+from keyword_ids import COMPACT_RESPONSE_SCHEMA, build_compact_prompt_prefix, expand_compact_response
+
+# --- Configuração do Modelo ---
+# Permitem trocar o modelo da extração de palavras-chave sem alterar o código.
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro")
+GEMINI_TEMPERATURE = float(os.getenv("GEMINI_TEMPERATURE", "0"))
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "256"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# "full": frases completas; "compact" (opcional): tabela de identificadores no prompt e resposta só com identificadores.
+GEMINI_PROMPT_PROTOCOL = os.getenv("GEMINI_PROMPT_PROTOCOL", "full")
+
+NO_LEVEL = "Nenhum Nível Sugerido"
+
+# Esquema da resposta estruturada; o modelo devolve diretamente este JSON.
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "nivel_sugerido": {"type": "string", "enum": list(ALL_KEYWORDS_MAPPING) + [NO_LEVEL]},
+        "palavras_chave_encontradas": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["nivel_sugerido", "palavras_chave_encontradas"],
+}
+
+
+def build_prompt_prefix(mapping=ALL_KEYWORDS_MAPPING) -> str:
+    """Parte estática do prompt (catálogo de palavras-chave), montada uma única vez."""
+    keywords_string = "\n".join(f"{level_name}: {', '.join(keywords_list)}" for level_name, keywords_list in mapping.items())
+    return (
+        "Com base nas palavras-chave fornecidas abaixo, identifique o nível de gravidade mais "
+        "apropriado para a descrição de conduta informada ao final.\n"
+        f"Palavras-chave:\n{keywords_string}\n"
+        f'Responda com o nível no formato "Nível X" ou "{NO_LEVEL}" e a lista das palavras-chave encontradas.\n'
+    )
+
+
+class GeminiKeywordClient:
+    """Cliente reutilizável para a extração de palavras-chave: modelo e prompt são criados uma vez."""
+    def __init__(self, model_name=GEMINI_MODEL_NAME, temperature=GEMINI_TEMPERATURE,
+                 max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS, timeout=GEMINI_TIMEOUT_SECONDS, api_key=GEMINI_API_KEY,
+                 protocol=GEMINI_PROMPT_PROTOCOL):
+        # Importação tardia: o SDK leva cerca de um segundo para carregar e só é necessário ao consultar o modelo.
+        import google.generativeai as genai
+
+        if api_key:
+            genai.configure(api_key=api_key)
+        if protocol not in ("compact", "full"):
+            raise ValueError(f"Protocolo de prompt desconhecido: {protocol!r}")
+        self.model_name = model_name
+        self.timeout = timeout
+        self.compact = protocol == "compact"
+        self.generation_config = genai.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_mime_type="application/json",
+            response_schema=COMPACT_RESPONSE_SCHEMA if self.compact else RESPONSE_SCHEMA,
+        )
+        self.prompt_prefix = build_compact_prompt_prefix() if self.compact else build_prompt_prefix()
+        self._model = genai.GenerativeModel(model_name, generation_config=self.generation_config)
+
+    def build_prompt(self, user_description: str) -> str:
+        return f'{self.prompt_prefix}Descrição de conduta: "{user_description}"'
+
+    def extract_keywords(self, user_description: str, timeout=None) -> dict:
+        """Executa a chamada com tempo limite e devolve o JSON estruturado; propaga exceções da API."""
+        response = self._model.generate_content(
+            self.build_prompt(user_description),
+            request_options={"timeout": timeout or self.timeout},
+        )
+        result = json.loads(response.text)
+        return expand_compact_response(result) if self.compact else result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GeminiKeywordClient:
+    """Instância única do cliente por processo, criada (e configurada) na primeira consulta ao modelo."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiKeywordClient()
+    return _client
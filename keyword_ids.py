@@ -0,0 +1,143 @@
+"""
+Protocolo compacto de palavras-chave para o Gemini.
+
+Cada palavra-chave de ALL_KEYWORDS_MAPPING recebe um identificador curto e estável,
+formado pelo número do nível e por um sufixo derivado do hash da frase normalizada (incluir
+ou remover outras palavras-chave não altera os identificadores existentes). O prompt envia a
+tabela agrupada por nível, com os inícios comuns fatorados, e o modelo responde apenas com o
+nível e os identificadores, que são validados e expandidos localmente para o formato usual.
+"""
+import hashlib
+import re
+import string
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+from keyword_matcher import NO_LEVEL, normalize_text
+
+_SUFFIX_ALPHABET = string.digits + string.ascii_lowercase
+_SUFFIX_LENGTH = 2
+
+
+def level_number(level_name: str) -> int:
+    """Número do nível a partir do nome ("Nível 3" -> 3)."""
+    return int(re.search(r"\d+", level_name).group())
+
+
+def _hash_suffix(phrase: str, length: int) -> str:
+    value = int.from_bytes(hashlib.sha1(normalize_text(phrase).encode("utf-8")).digest()[:8], "big")
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, len(_SUFFIX_ALPHABET))
+        chars.append(_SUFFIX_ALPHABET[remainder])
+    return "".join(chars)
+
+
+def build_keyword_index(mapping=ALL_KEYWORDS_MAPPING) -> dict:
+    """Índice identificador -> (nome do nível, frase), na ordem do catálogo."""
+    index = {}
+    for level_name, keywords_list in mapping.items():
+        number = level_number(level_name)
+        for phrase in keywords_list:
+            # Em caso de colisão dentro do nível, o sufixo é estendido até ficar único.
+            length = _SUFFIX_LENGTH
+            keyword_id = f"{number}{_hash_suffix(phrase, length)}"
+            while keyword_id in index and index[keyword_id][1] != phrase:
+                length += 1
+                keyword_id = f"{number}{_hash_suffix(phrase, length)}"
+            index[keyword_id] = (level_name, phrase)
+    return index
+
+
+KEYWORD_INDEX = build_keyword_index()
+PHRASE_TO_ID = {phrase: keyword_id for keyword_id, (_, phrase) in KEYWORD_INDEX.items()}
+LEVEL_NAMES = {level_number(level_name): level_name for level_name in ALL_KEYWORDS_MAPPING}
+
+# Esquema da resposta compacta: "n" é o número do nível (0 quando nenhum se aplica) e "k" os identificadores.
+# Sem enum em "k": a lista de identificadores enviada a cada requisição custaria mais tokens do que a
+# resposta compacta economiza, e expand_compact_response já descarta identificadores desconhecidos.
+COMPACT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "n": {"type": "integer"},
+        "k": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["n", "k"],
+}
+
+
+def _common_prefix_words(a, b):
+    words = []
+    for word_a, word_b in zip(a.split(), b.split()):
+        if word_a != word_b:
+            break
+        words.append(word_a)
+    return words
+
+
+def _compress_entries(entries):
+    """
+    Agrupa frases consecutivas que começam pelas mesmas palavras (ao menos duas):
+    "ações persistentes baseadas em(5v=gênero;12=raça)" em vez de repetir o início.
+    """
+    groups = []
+    for suffix, phrase in entries:
+        if groups:
+            prefix, members = groups[-1]
+            shared = _common_prefix_words(prefix if len(members) > 1 else members[0][1], phrase)
+            if len(shared) >= 2 and (len(members) == 1 or len(shared) == len(prefix.split())):
+                groups[-1] = (" ".join(shared), members + [(suffix, phrase)])
+                continue
+        groups.append((phrase, [(suffix, phrase)]))
+    parts = []
+    for prefix, members in groups:
+        if len(members) == 1:
+            parts.append(f"{members[0][0]}={members[0][1]}")
+        else:
+            cut = len(prefix) + 1
+            parts.append(f"{prefix}({';'.join(f'{suffix}={phrase[cut:]}' for suffix, phrase in members)})")
+    return parts
+
+
+def build_compact_prompt_prefix(index=KEYWORD_INDEX) -> str:
+    """Parte estática do prompt compacto: a tabela de identificadores agrupada por nível."""
+    by_level = {}
+    for keyword_id, (level_name, phrase) in index.items():
+        number = level_number(level_name)
+        by_level.setdefault(number, []).append((keyword_id[len(str(number)):], phrase))
+    table = "\n".join(f"{number}|{'|'.join(_compress_entries(entries))}" for number, entries in by_level.items())
+    return (
+        "Classifique a gravidade da conduta ao final. Tabela nível|sufixo=palavra-chave, com "
+        "início comum fatorado como início(sufixo=resto;...); id = nível+sufixo, ex.: 3ab:\n"
+        f"{table}\n"
+        "Responda n=nível mais apropriado (0 se nenhum) e k=ids encontrados.\n"
+    )
+
+
+def expand_compact_response(response: dict) -> dict:
+    """Valida a resposta compacta e a converte para {"nivel_sugerido", "palavras_chave_encontradas"}."""
+    if not isinstance(response, dict):
+        raise ValueError(f"Resposta compacta inválida: {response!r}")
+    try:
+        number = int(response.get("n", 0))
+    except (TypeError, ValueError):
+        number = 0
+    keyword_ids = response.get("k") or []
+    if not isinstance(keyword_ids, list):
+        keyword_ids = []
+    phrases = []
+    for keyword_id in keyword_ids:
+        entry = KEYWORD_INDEX.get(str(keyword_id).strip())
+        # Identificadores desconhecidos são descartados em vez de repassados ao motor.
+        if entry is not None and entry[1] not in phrases:
+            phrases.append(entry[1])
+    return {"nivel_sugerido": LEVEL_NAMES.get(number, NO_LEVEL), "palavras_chave_encontradas": phrases}
+
+
+def compact_response(result: dict) -> dict:
+    """Operação inversa: codifica uma análise no formato compacto (usado pelo modelo falso dos benchmarks)."""
+    level_name = result.get("nivel_sugerido")
+    number = level_number(level_name) if level_name in ALL_KEYWORDS_MAPPING else 0
+    return {
+        "n": number,
+        "k": [PHRASE_TO_ID[phrase] for phrase in result.get("palavras_chave_encontradas", []) if phrase in PHRASE_TO_ID],
+    }
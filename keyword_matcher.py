@@ -0,0 +1,212 @@
+import os
+import re
+import unicodedata
+from collections import deque
+from difflib import SequenceMatcher
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+
+# --- Configuração do Classificador Local ---
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+FUZZY_MIN_RATIO = float(os.getenv("LOCAL_CLASSIFIER_FUZZY_RATIO", "0.88"))
+# Quantidade de palavras casadas a partir da qual a evidência é considerada plena.
+FULL_EVIDENCE_TOKENS = 3
+# Fração mínima dos trigramas de uma frase presentes no texto para que ela seja comparada por aproximação.
+FUZZY_TRIGRAM_SHARE = 0.5
+
+NO_LEVEL = "Nenhum Nível Sugerido"
+
+
+def word_trigrams(word: str):
+    """Trigramas de caracteres de uma palavra, com as bordas marcadas."""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def normalize_text(text: str) -> str:
+    """Remove acentos, ignora caixa e reduz pontuação a espaços simples."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^\w]+", " ", stripped.casefold()).split())
+
+
+class AhoCorasick:
+    """Autômato de Aho-Corasick para localizar vários padrões em uma única passada."""
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for index, pattern in enumerate(patterns):
+            self._add(pattern, index)
+        self._build()
+
+    def _add(self, pattern, index):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((index, len(pattern)))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """Gera tuplas (início, fim, índice do padrão) para cada ocorrência."""
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for index, length in self._output[state]:
+                yield position + 1 - length, position + 1, index
+
+
+class KeywordMatcher:
+    """
+    Pré-classificador local sobre o ALL_KEYWORDS_MAPPING.
+    Combina casamento exato (Aho-Corasick) com casamento aproximado por janelas de palavras; o
+    aproximado só é tentado quando o exato não basta para a confiança mínima, e só para as frases
+    (e janelas) que compartilham trigramas suficientes com o texto.
+    """
+    def __init__(self, mapping=ALL_KEYWORDS_MAPPING, fuzzy_min_ratio=FUZZY_MIN_RATIO, confident_threshold=LOCAL_CONFIDENCE_THRESHOLD):
+        self.fuzzy_min_ratio = fuzzy_min_ratio
+        self.confident_threshold = confident_threshold
+        self._levels = []
+        self._phrases = []
+        self._normalized = []
+        for level_name, keywords_list in mapping.items():
+            for phrase in keywords_list:
+                self._levels.append(level_name)
+                self._phrases.append(phrase)
+                self._normalized.append(normalize_text(phrase))
+        # Os espaços nas bordas garantem que apenas palavras inteiras sejam casadas.
+        self._automaton = AhoCorasick([f" {p} " for p in self._normalized])
+
+        # Índice trigrama -> frases, para escolher os candidatos ao casamento aproximado.
+        self._phrase_trigrams = []
+        self._min_shared = []
+        self._trigram_index = {}
+        for index, phrase in enumerate(self._normalized):
+            trigrams = set()
+            if phrase.count(" ") > 0 or len(phrase) >= 5:
+                for word in phrase.split():
+                    trigrams |= word_trigrams(word)
+            self._phrase_trigrams.append(trigrams)
+            self._min_shared.append(max(1, int(FUZZY_TRIGRAM_SHARE * len(trigrams))))
+            for trigram in trigrams:
+                self._trigram_index.setdefault(trigram, []).append(index)
+
+    def _exact_matches(self, padded):
+        matches = []
+        for start, end, index in self._automaton.iter_matches(padded):
+            # Descarta os espaços de borda para que frases adjacentes não se sobreponham.
+            matches.append((start + 1, end - 1, index, 1.0))
+        return matches
+
+    def _fuzzy_matches(self, padded, already_matched):
+        tokens = [(m.start(), m.end()) for m in re.finditer(r"\S+", padded)]
+        words = [padded[s:e] for s, e in tokens]
+        word_grams = [word_trigrams(word) for word in words]
+
+        # Candidatas: frases com uma fração mínima dos seus trigramas em alguma parte do texto.
+        shared = {}
+        for trigram in set().union(*word_grams) if word_grams else ():
+            for index in self._trigram_index.get(trigram, ()):
+                shared[index] = shared.get(index, 0) + 1
+
+        matches = []
+        for index, count in shared.items():
+            if index in already_matched or count < self._min_shared[index]:
+                continue
+            phrase = self._normalized[index]
+            phrase_grams = self._phrase_trigrams[index]
+            size = phrase.count(" ") + 1
+            per_word = [len(grams & phrase_grams) for grams in word_grams]
+            window_shared = sum(per_word[:size])
+            best = None
+            for i in range(len(words) - size + 1):
+                if i:
+                    window_shared += per_word[i + size - 1] - per_word[i - 1]
+                # Só as janelas com trigramas suficientes em comum chegam ao SequenceMatcher.
+                if window_shared < self._min_shared[index]:
+                    continue
+                window = " ".join(words[i:i + size])
+                matcher = SequenceMatcher(None, window, phrase, autojunk=False)
+                if matcher.real_quick_ratio() < self.fuzzy_min_ratio or matcher.quick_ratio() < self.fuzzy_min_ratio:
+                    continue
+                ratio = matcher.ratio()
+                if ratio >= self.fuzzy_min_ratio and (best is None or ratio > best[3]):
+                    best = (tokens[i][0], tokens[i + size - 1][1], index, ratio)
+            if best is not None:
+                matches.append(best)
+        return matches
+
+    @staticmethod
+    def _drop_contained(matches):
+        """Mantém apenas as ocorrências mais longas quando uma frase está contida em outra."""
+        kept = []
+        for match in sorted(matches, key=lambda m: (m[0], -(m[1] - m[0]))):
+            if any(k[0] <= match[0] and match[1] <= k[1] for k in kept):
+                continue
+            kept.append(match)
+        return kept
+
+    def classify(self, description: str):
+        """
+        Classifica a descrição localmente.
+        Retorna o mesmo dicionário produzido pelo Gemini e uma confiança entre 0 e 1.
+        """
+        padded = f" {normalize_text(description)} "
+        exact = self._exact_matches(padded)
+        if exact:
+            result, confidence = self._score(self._drop_contained(exact))
+            if confidence >= self.confident_threshold:
+                return result, confidence
+        fuzzy = self._fuzzy_matches(padded, {m[2] for m in exact})
+        return self._score(self._drop_contained(exact + fuzzy))
+
+    def _score(self, matches):
+        if not matches:
+            return {"nivel_sugerido": NO_LEVEL, "palavras_chave_encontradas": []}, 0.0
+
+        scores, keywords, quality = {}, {}, {}
+        for _, _, index, ratio in matches:
+            level_name = self._levels[index]
+            weight = ratio * (self._normalized[index].count(" ") + 1)
+            scores[level_name] = scores.get(level_name, 0.0) + weight
+            quality[level_name] = min(quality.get(level_name, 1.0), ratio)
+            phrase = self._phrases[index]
+            if phrase not in keywords.setdefault(level_name, []):
+                keywords[level_name].append(phrase)
+
+        # Em empate, prevalece o nível mais grave.
+        best_level = max(scores, key=lambda name: (scores[name], name))
+        share = scores[best_level] / sum(scores.values())
+        strength = min(1.0, scores[best_level] / FULL_EVIDENCE_TOKENS)
+        confidence = share * strength * quality[best_level]
+        result = {"nivel_sugerido": best_level, "palavras_chave_encontradas": keywords[best_level]}
+        return result, round(confidence, 4)
+
+
+# Construído uma única vez na importação do módulo.
+KEYWORD_MATCHER = KeywordMatcher()
+
+
+def classify_locally(description: str):
+    """Atalho para o classificador construído na importação."""
+    return KEYWORD_MATCHER.classify(description)
@@ -0,0 +1,159 @@
+"""
+Orçamento de latência para as chamadas ao Gemini, com requisição de contingência (hedge).
+
+A chamada principal é disparada em uma thread; se não terminar até o limiar de contingência
+(um percentil das latências recentes, ou um valor fixo enquanto não há amostras suficientes),
+uma segunda requisição idêntica é enviada e vale a primeira resposta bem-sucedida; com todas as
+threads do pool ocupadas a contingência não é enviada, pois só entraria na fila. Uma falha
+passageira da principal antecipa a contingência; as demais (autenticação, requisição inválida)
+são propagadas de imediato, pois a contingência falharia do mesmo modo. Cada chamada recebe o
+restante do orçamento como tempo limite. Esgotado o orçamento, LatencyBudgetExceeded é lançada
+e quem chama recorre à classificação local; as requisições em curso terminam pelo próprio tempo
+limite em segundo plano (e ainda alimentam o cache de respostas).
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# --- Configuração do Orçamento ---
+GEMINI_LATENCY_BUDGET_SECONDS = float(os.getenv("GEMINI_LATENCY_BUDGET_SECONDS", "10"))
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+# Limiar usado enquanto não há latências suficientes para estimar o percentil (padrão: metade do orçamento).
+GEMINI_HEDGE_AFTER_SECONDS = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS", str(GEMINI_LATENCY_BUDGET_SECONDS / 2)))
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+GEMINI_HEDGE_WORKERS = int(os.getenv("GEMINI_HEDGE_WORKERS", "16"))
+# Códigos HTTP que indicam falha passageira da API: excesso de requisições e erros do servidor.
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Indica se vale repetir a chamada: tempo esgotado, falha de conexão, 429 ou 5xx."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # As exceções do google.api_core trazem o código HTTP em `code`; evita importar o SDK aqui.
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+class LatencyBudgetExceeded(TimeoutError):
+    """Nenhuma resposta bem-sucedida dentro do orçamento de latência."""
+
+
+class LatencyHistory:
+    """Janela deslizante das latências das chamadas bem-sucedidas."""
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=GEMINI_HEDGE_MIN_SAMPLES):
+        """Percentil das amostras recentes, ou None se houver menos de `min_samples`."""
+        with self._lock:
+            values = sorted(self._samples)
+        if not values or len(values) < min_samples:
+            return None
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class HedgedCaller:
+    """Executa uma chamada com orçamento de latência e, se ela demorar, uma segunda de contingência."""
+    def __init__(self, budget=GEMINI_LATENCY_BUDGET_SECONDS, hedge_percentile=GEMINI_HEDGE_PERCENTILE,
+                 hedge_after=GEMINI_HEDGE_AFTER_SECONDS, max_workers=GEMINI_HEDGE_WORKERS):
+        self.budget = budget
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after
+        self.max_workers = max_workers
+        self.history = LatencyHistory()
+        self._executor = None
+        self._lock = threading.Lock()
+        # Chamadas submetidas e ainda não concluídas (em execução ou na fila do pool).
+        self.in_flight = 0
+        self.hedges_sent = 0
+        self.hedges_skipped = 0
+
+    def _submit(self, func, timeout):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="gemini-hedge")
+        with self._lock:
+            self.in_flight += 1
+
+        def timed():
+            # A latência é medida a partir do início da execução, sem o tempo de espera na fila.
+            start = time.perf_counter()
+            try:
+                result = func(timeout=timeout)
+                self.history.add(time.perf_counter() - start)
+                return result
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        return self._executor.submit(timed)
+
+    def saturated(self):
+        """Indica se todas as threads do pool estão ocupadas (uma nova chamada ficaria na fila)."""
+        with self._lock:
+            return self.in_flight >= self.max_workers
+
+    def hedge_delay(self):
+        """Tempo até enviar a requisição de contingência, limitado ao orçamento."""
+        threshold = self.history.percentile(self.hedge_percentile)
+        return min(self.budget, self.hedge_after if threshold is None else threshold)
+
+    def call(self, primary, hedge=None):
+        """
+        Retorna (resultado, índice da chamada vencedora: 0 principal, 1 contingência).
+        `primary` e `hedge` recebem `timeout`, o restante do orçamento em segundos no envio.
+        Uma falha passageira antecipa a contingência; uma não passageira é propagada de imediato;
+        se todas falharem, a última exceção é propagada. Com orçamento zero ou negativo, a
+        chamada principal é executada diretamente, com o tempo limite padrão do cliente.
+        """
+        if self.budget <= 0:
+            return primary(timeout=None), 0
+        now = time.monotonic()
+        deadline = now + self.budget
+        hedge_at = now + self.hedge_delay()
+        hedged = hedge is None
+        pending = {self._submit(primary, self.budget): 0}
+        last_error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake_at = deadline if hedged else min(hedge_at, deadline)
+            done, _ = wait(list(pending), timeout=wake_at - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    return future.result(), index
+                except Exception as e:
+                    if not is_transient_error(e):
+                        raise
+                    last_error = e
+            now = time.monotonic()
+            if not hedged and now < deadline and (not pending or now >= hedge_at):
+                hedged = True
+                if pending and self.saturated():
+                    with self._lock:
+                        self.hedges_skipped += 1
+                    continue
+                with self._lock:
+                    self.hedges_sent += 1
+                pending[self._submit(hedge, deadline - now)] = 1
+        if last_error is not None and not pending:
+            raise last_error
+        raise LatencyBudgetExceeded(f"Nenhuma resposta do Gemini dentro do orçamento de {self.budget:g}s.")
+
+    def stats(self) -> dict:
+        """Orçamento, limiar de contingência atual, chamadas em curso e requisições de contingência."""
+        with self._lock:
+            counters = {"workers": self.max_workers, "in_flight": self.in_flight,
+                        "hedges_sent": self.hedges_sent, "hedges_skipped": self.hedges_skipped}
+        return {"budget_s": self.budget, "hedge_delay_s": self.hedge_delay(), **counters}
@@ -0,0 +1,200 @@
+"""
+Pontuação paralela, em vários processos, de grandes arquivos de casos históricos.
+
+O arquivo de entrada (mesmo formato do `conduct_eval batch`) é dividido em faixas de bytes
+contíguas; cada processo trabalhador avalia a sua faixa com um único motor de longa duração,
+reiniciado entre os registros, e grava um arquivo de saída próprio. Ao final, os arquivos das
+faixas são concatenados na ordem da entrada.
+
+A análise da descrição não faz chamadas de rede: usa o campo "analysis" do registro (resposta
+do Gemini já obtida), depois o cache de respostas e, por fim, os classificadores locais (por
+palavras-chave e, quando este não é confiável, o semântico). Linhas inválidas e falhas na
+avaliação geram um registro com "error", como no `conduct_eval batch`.
+
+Uso:
+    python parallel_scoring.py entrada.jsonl saida.jsonl [--workers N]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from multiprocessing import Pool, Value
+
+import audit_log
+import evaluation
+from conduct_eval import FACTOR_FIELDS, build_output_record, error_record, record_error
+from engine import ConductEvaluationEngine
+from gemini_client import GEMINI_MODEL_NAME
+from keyword_matcher import classify_locally, LOCAL_CONFIDENCE_THRESHOLD
+from response_cache import ResponseCache, make_cache_key
+from semantic_classifier import classify_semantically
+
+_progress = None
+
+
+def split_shards(path, shards):
+    """Divide o arquivo em até `shards` faixas de bytes alinhadas ao início de linhas."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    boundaries = [0]
+    with open(path, "rb") as input_file:
+        for i in range(1, shards):
+            input_file.seek(size * i // shards)
+            input_file.readline()
+            position = min(input_file.tell(), size)
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def count_lines(path, start, end):
+    """Número de quebras de linha na faixa [start, end) do arquivo."""
+    count = 0
+    with open(path, "rb") as input_file:
+        input_file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = input_file.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            remaining -= len(chunk)
+    return count
+
+
+def offline_analysis(description, record):
+    """Análise sem rede: resposta já presente no registro, cache de respostas ou classificadores locais."""
+    if isinstance(record.get("analysis"), dict):
+        return record["analysis"], "record"
+    cached = evaluation.response_cache.get(make_cache_key(description, GEMINI_MODEL_NAME))
+    if cached is not None:
+        return cached, "cache"
+    local_result, local_confidence = classify_locally(description)
+    if local_confidence < LOCAL_CONFIDENCE_THRESHOLD:
+        semantic_result, semantic_confidence = classify_semantically(description)
+        if semantic_confidence > local_confidence:
+            return semantic_result, "semantic"
+    return local_result, "local"
+
+
+def _init_worker(progress):
+    global _progress
+    _progress = progress
+    # Os processos não gravam no registro de auditoria: o arquivo de saída já traz cada resultado.
+    audit_log.AUDIT_LOG_PATH = ""
+    # A conexão SQLite herdada do processo pai não pode ser usada depois do fork: cada processo
+    # abre o seu próprio cache sobre o mesmo arquivo.
+    parent_cache = evaluation.response_cache
+    evaluation.response_cache = ResponseCache(path=parent_cache.path, ttl_seconds=parent_cache.ttl_seconds,
+                                              memory_size=parent_cache.memory_size, disk_size=parent_cache.disk_size)
+
+
+def score_line(index, line, engine):
+    """Registro de saída de uma linha; linhas inválidas e falhas geram um registro com "error"."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return error_record(index, None, f"JSON inválido: {e}")
+    error = record_error(record)
+    if error is not None:
+        return error_record(index, record, error)
+    try:
+        description = record.get("description", "")
+        factors = [record.get(name, "na") for name in FACTOR_FIELDS]
+        analysis, source = offline_analysis(description, record)
+        # Respostas presentes no registro vieram do Gemini; as demais origens são caminhos de mesmo nome.
+        path = "gemini" if source == "record" else source
+        result = evaluation.evaluate_conduct(description, dict(analysis, **{evaluation.ANALYSIS_PATH_KEY: path}), *factors, engine=engine)
+    except Exception as e:
+        return error_record(index, record, f"Falha na avaliação: {e!r}")
+    return build_output_record(index, record, source, result)
+
+
+def score_shard(task):
+    """Avalia uma faixa do arquivo de entrada e grava o resultado em um arquivo próprio."""
+    input_path, shard_path, start, end, first_index, progress_every = task
+    engine = ConductEvaluationEngine()
+    written = pending = 0
+    with open(input_path, "rb") as input_file, open(shard_path, "w", encoding="utf-8") as output_file:
+        input_file.seek(start)
+        index = first_index
+        while input_file.tell() < end:
+            line = input_file.readline()
+            if not line:
+                break
+            if line.strip():
+                output_file.write(json.dumps(score_line(index, line, engine), ensure_ascii=False) + "\n")
+                written += 1
+                pending += 1
+                if _progress is not None and pending >= progress_every:
+                    with _progress.get_lock():
+                        _progress.value += pending
+                    pending = 0
+            index += 1
+    if _progress is not None and pending:
+        with _progress.get_lock():
+            _progress.value += pending
+    return shard_path, written
+
+
+def score_file(input_path, output_path, workers=None, shards=None, progress_every=200, report=None):
+    """Executa a pontuação paralela e devolve o total de registros avaliados."""
+    workers = workers or os.cpu_count() or 1
+    ranges = split_shards(input_path, shards or workers * 4)
+    tasks = []
+    first_index = 0
+    for number, (start, end) in enumerate(ranges):
+        shard_path = f"{output_path}.shard-{number:04d}"
+        tasks.append((input_path, shard_path, start, end, first_index, progress_every))
+        # Índices globais dos registros: as faixas são contíguas e terminam em fim de linha.
+        first_index += count_lines(input_path, start, end)
+
+    progress = Value("q", 0)
+    total = 0
+    try:
+        with Pool(workers, initializer=_init_worker, initargs=(progress,)) as pool:
+            pending = pool.map_async(score_shard, tasks)
+            while not pending.ready():
+                pending.wait(1.0)
+                if report:
+                    report(progress.value)
+            results = pending.get()
+
+        with open(output_path, "w", encoding="utf-8") as output_file:
+            for shard_path, written in results:
+                total += written
+                with open(shard_path, encoding="utf-8") as shard_file:
+                    shutil.copyfileobj(shard_file, output_file)
+    finally:
+        # Os arquivos das faixas são removidos mesmo quando a execução é interrompida por um erro.
+        for task in tasks:
+            try:
+                os.remove(task[1])
+            except OSError:
+                pass
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pontuação paralela de arquivos de casos.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--workers", type=int, default=None, help="Processos trabalhadores (padrão: número de núcleos).")
+    parser.add_argument("--shards", type=int, default=None, help="Número de faixas (padrão: 4 por trabalhador).")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    total = score_file(
+        args.input, args.output, args.workers, args.shards,
+        report=lambda done: print(f"{done} registros avaliados ({done / (time.perf_counter() - start):.0f}/s)", file=sys.stderr),
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Concluído: {total} registros em {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f}/s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+
+# --- Configuração do Cache ---
+CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", "gemini_cache.sqlite3")
+CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MEMORY_SIZE = int(os.getenv("GEMINI_CACHE_MEMORY_SIZE", "256"))
+CACHE_DISK_SIZE = int(os.getenv("GEMINI_CACHE_DISK_SIZE", "10000"))
+
+
+def keywords_fingerprint(mapping=ALL_KEYWORDS_MAPPING) -> str:
+    """Hash estável do mapeamento de palavras-chave; muda sempre que KeyWords.py for editado."""
+    payload = json.dumps(mapping, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Calculado uma única vez: o catálogo só muda com a edição de KeyWords.py (e um novo processo).
+KEYWORDS_FINGERPRINT = keywords_fingerprint()
+
+
+def normalize_description(description: str) -> str:
+    """Normaliza a descrição para que variações de espaço e caixa usem a mesma entrada."""
+    return " ".join(description.split()).casefold()
+
+
+def make_cache_key(description: str, model_name: str) -> str:
+    """Chave composta pela descrição normalizada, versão das palavras-chave e modelo."""
+    raw = "\x1f".join([normalize_description(description), KEYWORDS_FINGERPRINT, model_name])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache em dois níveis para as respostas do Gemini:
+    um LRU em memória na frente de um armazenamento SQLite em disco.
+    """
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                 memory_size=CACHE_MEMORY_SIZE, disk_size=CACHE_DISK_SIZE):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        """Conexão com o SQLite, aberta no primeiro uso (chamada com o lock); None sem armazenamento em disco."""
+        if self._conn is None and self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON responses(created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Retorna o valor armazenado para a chave, ou None se ausente ou expirado."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = json.loads(row[0]), row[1]
+                    if not self._expired(created_at, now):
+                        self._remember(key, value, created_at)
+                        self.hits += 1
+                        return value
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Armazena o valor nos dois níveis e aplica a política de despejo."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            conn = self._db()
+            if conn is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now),
+                )
+                self._evict_disk(now)
+                conn.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        if self.ttl_seconds > 0:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_size,),
+        )
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM responses")
+                conn.commit()
+
+    def stats(self) -> dict:
+        """Contadores de acertos e falhas do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits - self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,358 @@
+"""
+Catálogo declarativo das regras e textos do motor (conduct_rules.json), compilado em regras do experta.
+
+O catálogo traz as descrições dos níveis de gravidade, os textos das regras de nível base e as
+regras de explicação e de recomendação (condição sobre um fator ou sobre o nível, saliência e
+fatos declarados). O compilador valida o catálogo, gera o código de uma subclasse de
+ConductEvaluationEngine com uma regra por entrada e guarda o código compilado em __pycache__,
+em um único arquivo por catálogo marcado com o hash do conteúdo: uma nova inicialização com o
+mesmo catálogo só valida o JSON e carrega o código, e um catálogo alterado o substitui.
+
+get_rule_base() verifica periodicamente se o arquivo mudou e, se o conteúdo for outro, compila
+o novo catálogo e o troca atomicamente pelo anterior. Motores já criados seguem com as regras
+com que foram criados, de modo que avaliações em andamento não são afetadas; um catálogo
+inválido é rejeitado e as regras em uso são mantidas (uma gravação ainda incompleta é tentada de
+novo quando o arquivo voltar a mudar; prefira substituir o arquivo, como faz os.replace).
+Variáveis de ambiente:
+    CONDUCT_RULES_PATH=arq          catálogo (padrão: conduct_rules.json ao lado deste módulo)
+    CONDUCT_RULES_RELOAD_SECONDS=n  intervalo mínimo entre verificações do arquivo (0 desativa a recarga)
+
+Uso:
+    python rule_catalog.py check [--path arq]
+    python rule_catalog.py show [--path arq]
+"""
+import argparse
+import glob
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+
+from experta import P, Rule
+
+from engine import ConductEvaluationEngine, ConductSeverity, Explanation, FACTOR_FACTS, Recommendation
+
+# --- Configuração do Catálogo ---
+RULES_PATH = os.getenv("CONDUCT_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "conduct_rules.json"))
+RULES_RELOAD_SECONDS = float(os.getenv("CONDUCT_RULES_RELOAD_SECONDS", "2"))
+# Alterações no gerador de código invalidam os catálogos compilados em cache.
+COMPILER_VERSION = 1
+
+# Fatos que podem ser condição de uma regra do catálogo: fatores adicionais e o nível de gravidade.
+CONDITION_FACTS = dict(FACTOR_FACTS, severity=(ConductSeverity, "level"))
+CONDITION_OPERATORS = ("equals", "in", "contains")
+_RULE_KEYS = {"name", "when", "salience", "enabled", "note", "explanations", "recommendations"}
+
+
+class RuleCatalogError(ValueError):
+    """Catálogo de regras inválido."""
+
+
+class RuleBase:
+    """Conjunto de regras compilado a partir de uma versão do catálogo."""
+    def __init__(self, path, digest, engine_class, stat, compile_seconds, from_cache):
+        self.path = path
+        self.digest = digest
+        self.engine_class = engine_class
+        self.stat = stat
+        self.compile_seconds = compile_seconds
+        self.from_cache = from_cache
+        self.loaded_at = time.time()
+        self.next_check = time.monotonic() + RULES_RELOAD_SECONDS
+
+    def stats(self) -> dict:
+        return {"path": self.path, "digest": self.digest[:12], "rules": len(self.engine_class.catalog_rules),
+                "compile_ms": self.compile_seconds * 1000, "from_cache": self.from_cache, "loaded_at": self.loaded_at}
+
+
+# --- Validação ---
+def _fail(where, message):
+    raise RuleCatalogError(f"{where}: {message}")
+
+
+def _require_text(value, where):
+    if not isinstance(value, str) or not value:
+        _fail(where, "texto não vazio esperado")
+    return value
+
+
+def validate_catalog(catalog):
+    """Confere a estrutura do catálogo e retorna as regras ativas; lança RuleCatalogError no primeiro problema."""
+    if not isinstance(catalog, dict):
+        _fail("catálogo", "objeto JSON esperado")
+    levels = catalog.get("severity_levels")
+    if not isinstance(levels, dict) or not levels:
+        _fail("severity_levels", "objeto nível -> descrição esperado")
+    for level, description in levels.items():
+        if not level.isdigit():
+            _fail("severity_levels", f"nível inválido {level!r}")
+        _require_text(description, f"severity_levels.{level}")
+    _require_text(catalog.get("unknown_severity"), "unknown_severity")
+    base = catalog.get("base_severity")
+    if not isinstance(base, dict):
+        _fail("base_severity", "objeto esperado")
+    for key in ("text", "keywords_text", "no_keywords_text", "source"):
+        _require_text(base.get(key), f"base_severity.{key}")
+    try:
+        base["text"].format(path_label="", level=0, description="", keywords_text="")
+        base["keywords_text"].format(keywords="")
+    except (KeyError, IndexError, ValueError) as e:
+        _fail("base_severity", f"marcador inválido no texto ({e!r})")
+    no_suggestion = catalog.get("no_suggestion")
+    if not isinstance(no_suggestion, dict) or not isinstance(no_suggestion.get("level"), int):
+        _fail("no_suggestion", "objeto com o nível inteiro esperado")
+    for key in ("description", "text", "source"):
+        _require_text(no_suggestion.get(key), f"no_suggestion.{key}")
+
+    rules = catalog.get("rules")
+    if not isinstance(rules, list):
+        _fail("rules", "lista esperada")
+    names = set()
+    active = []
+    for position, rule in enumerate(rules):
+        where = f"rules[{position}]"
+        if not isinstance(rule, dict):
+            _fail(where, "objeto esperado")
+        unknown = set(rule) - _RULE_KEYS
+        if unknown:
+            _fail(where, f"campos desconhecidos {sorted(unknown)}")
+        name = rule.get("name")
+        if not isinstance(name, str) or not name.isidentifier() or name.startswith("_"):
+            _fail(where, f"nome de regra inválido {name!r}")
+        where = f"rules[{position}] ({name})"
+        if name in names or hasattr(ConductEvaluationEngine, name):
+            _fail(where, "nome repetido ou reservado")
+        names.add(name)
+
+        when = rule.get("when")
+        if not isinstance(when, dict) or when.get("fact") not in CONDITION_FACTS:
+            _fail(where, f"'when.fact' deve ser um de {sorted(CONDITION_FACTS)}")
+        operators = [op for op in CONDITION_OPERATORS if op in when]
+        if len(operators) != 1 or len(when) != 2:
+            _fail(where, f"'when' deve ter exatamente um operador entre {list(CONDITION_OPERATORS)}")
+        value = when[operators[0]]
+        value_type = int if when["fact"] == "severity" else str
+        values = value if operators[0] == "in" else [value]
+        if not isinstance(values, list) or not values or not all(type(v) is value_type for v in values):
+            _fail(where, f"valor da condição deve ser {'uma lista de ' if operators[0] == 'in' else ''}{value_type.__name__}")
+        if operators[0] == "contains" and value_type is not str:
+            _fail(where, "'contains' só se aplica a fatores textuais")
+        if not isinstance(rule.get("salience", 0), int) or not isinstance(rule.get("enabled", True), bool):
+            _fail(where, "'salience' deve ser inteiro e 'enabled', booleano")
+
+        explanations = rule.get("explanations", [])
+        recommendations = rule.get("recommendations", [])
+        if not isinstance(explanations, list) or not isinstance(recommendations, list):
+            _fail(where, "'explanations' e 'recommendations' devem ser listas")
+        for i, explanation in enumerate(explanations):
+            if not isinstance(explanation, dict) or set(explanation) - {"text", "source"}:
+                _fail(f"{where}.explanations[{i}]", "objeto com 'text' e 'source' esperado")
+            _require_text(explanation.get("text"), f"{where}.explanations[{i}].text")
+            _require_text(explanation.get("source", "Base"), f"{where}.explanations[{i}].source")
+        for i, text in enumerate(recommendations):
+            _require_text(text, f"{where}.recommendations[{i}]")
+        if not explanations and not recommendations:
+            _fail(where, "a regra não declara nenhum fato")
+        if rule.get("enabled", True):
+            active.append(rule)
+    return active
+
+
+# --- Compilação ---
+def _condition_source(when):
+    fact_class, field = CONDITION_FACTS[when["fact"]]
+    if "equals" in when:
+        test = repr(when["equals"])
+    elif "in" in when:
+        test = f"P(lambda x: x in {tuple(when['in'])!r})"
+    else:
+        test = f"P(lambda x: {when['contains']!r} in x)"
+    return f"{fact_class.__name__}({field}={test})"
+
+
+def generate_source(catalog, digest):
+    """Código Python da subclasse do motor com uma regra por entrada ativa do catálogo."""
+    active = validate_catalog(catalog)
+    texts = {key: value for key, value in catalog.items() if key != "rules"}
+    lines = [
+        f"# Gerado a partir do catálogo {digest[:12]}; não editar.",
+        "class CompiledConductEngine(ConductEvaluationEngine):",
+        f"    rules_digest = {digest!r}",
+        f"    catalog = {texts!r}",
+        f"    catalog_rules = {tuple(rule['name'] for rule in active)!r}",
+    ]
+    for rule in active:
+        salience = f", salience={rule['salience']}" if rule.get("salience") else ""
+        lines += ["", f"    @Rule({_condition_source(rule['when'])}{salience})", f"    def {rule['name']}(self):"]
+        for explanation in rule.get("explanations", []):
+            lines.append(f"        self.declare(Explanation(text={explanation['text']!r}, source={explanation.get('source', 'Base')!r}))")
+        for text in rule.get("recommendations", []):
+            lines.append(f"        self.declare(Recommendation(text={text!r}))")
+    return "\n".join(lines) + "\n"
+
+
+def _namespace():
+    namespace = {"ConductEvaluationEngine": ConductEvaluationEngine, "Rule": Rule, "P": P,
+                 "Explanation": Explanation, "Recommendation": Recommendation}
+    namespace.update({fact_class.__name__: fact_class for fact_class, _ in CONDITION_FACTS.values()})
+    return namespace
+
+
+def _cache_path(path):
+    """Arquivo de cache do catálogo: um por caminho; o hash do conteúdo fica no cabeçalho."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), "__pycache__")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory, f"{stem}.{sys.implementation.cache_tag}.rules")
+
+
+def _prune_legacy_caches(cache_path):
+    """Remove os caches antigos, que tinham um arquivo por versão do catálogo ({stem}.{hash}.{tag}.rules)."""
+    tag = f".{sys.implementation.cache_tag}.rules"
+    prefix = glob.escape(cache_path[:-len(tag)])
+    for legacy in glob.glob(f"{prefix}.{'[0-9a-f]' * 16}{glob.escape(tag)}"):
+        try:
+            os.remove(legacy)
+        except OSError:
+            pass
+
+
+def _cache_header(digest):
+    return importlib.util.MAGIC_NUMBER + bytes([COMPILER_VERSION]) + bytes.fromhex(digest)
+
+
+def _load_cached(cache_path, digest):
+    try:
+        with open(cache_path, "rb") as cache_file:
+            data = cache_file.read()
+    except OSError:
+        return None
+    header = _cache_header(digest)
+    if not data.startswith(header):
+        return None
+    try:
+        return marshal.loads(data[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def _store_cached(cache_path, digest, code):
+    """Grava o código compilado (via arquivo temporário, para não expor um cache parcial); falhas são ignoradas."""
+    temporary = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temporary, "wb") as cache_file:
+            cache_file.write(_cache_header(digest) + marshal.dumps(code))
+        os.replace(temporary, cache_path)
+        _prune_legacy_caches(cache_path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def compile_catalog(path=RULES_PATH, use_cache=True):
+    """Compila o catálogo em um RuleBase, reaproveitando o código em cache para o mesmo conteúdo."""
+    start = time.perf_counter()
+    stat = os.stat(path)
+    with open(path, "rb") as catalog_file:
+        raw = catalog_file.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    # O catálogo é sempre validado, mesmo quando o código compilado está em cache.
+    try:
+        catalog = json.loads(raw)
+    except ValueError as e:
+        raise RuleCatalogError(f"{path}: JSON inválido ({e})") from e
+    validate_catalog(catalog)
+    cache_path = _cache_path(path)
+    code = _load_cached(cache_path, digest) if use_cache else None
+    from_cache = code is not None
+    if code is None:
+        code = compile(generate_source(catalog, digest), f"<{os.path.basename(path)}>", "exec")
+        if use_cache:
+            _store_cached(cache_path, digest, code)
+    namespace = _namespace()
+    exec(code, namespace)
+    return RuleBase(path, digest, namespace["CompiledConductEngine"], (stat.st_mtime_ns, stat.st_size),
+                    time.perf_counter() - start, from_cache)
+
+
+# --- Regras em Uso ---
+_rule_base = None
+_rule_base_lock = threading.Lock()
+reload_count = 0
+
+
+def _refresh(force=False):
+    global _rule_base, reload_count
+    with _rule_base_lock:
+        current = _rule_base
+        if current is not None and not force and time.monotonic() < current.next_check:
+            return current
+        if current is None:
+            _rule_base = compile_catalog(RULES_PATH)
+            return _rule_base
+        current.next_check = time.monotonic() + RULES_RELOAD_SECONDS
+        stat = None
+        try:
+            stat = os.stat(RULES_PATH)
+            if not force and (stat.st_mtime_ns, stat.st_size) == current.stat:
+                return current
+            candidate = compile_catalog(RULES_PATH)
+        except (OSError, RuleCatalogError) as e:
+            print(f"Catálogo de regras não recarregado; as regras em uso foram mantidas: {e}", file=sys.stderr)
+            if stat is not None:
+                # Só tenta de novo quando o arquivo mudar outra vez.
+                current.stat = (stat.st_mtime_ns, stat.st_size)
+            return current
+        current.stat = candidate.stat
+        if candidate.digest == current.digest:
+            return current
+        # A troca é uma única atribuição: quem já obteve o RuleBase anterior continua com ele.
+        _rule_base = candidate
+        reload_count += 1
+        return candidate
+
+
+def get_rule_base() -> RuleBase:
+    """Regras em uso, compiladas na primeira chamada e recarregadas quando o catálogo muda."""
+    current = _rule_base
+    if current is None or (RULES_RELOAD_SECONDS > 0 and time.monotonic() >= current.next_check):
+        return _refresh()
+    return current
+
+
+def reload_rules() -> RuleBase:
+    """Verifica o catálogo imediatamente, sem aguardar o intervalo de recarga."""
+    if _rule_base is None:
+        return _refresh()
+    return _refresh(force=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validação do catálogo de regras do motor.")
+    parser.add_argument("--path", default=RULES_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="Valida e compila o catálogo.")
+    subparsers.add_parser("show", help="Imprime o código gerado a partir do catálogo.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "show":
+            with open(args.path, "rb") as catalog_file:
+                raw = catalog_file.read()
+            print(generate_source(json.loads(raw), hashlib.sha256(raw).hexdigest()), end="")
+            return
+        rule_base = compile_catalog(args.path, use_cache=False)
+    except (OSError, ValueError) as e:
+        print(f"Catálogo inválido: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(rule_base.stats(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
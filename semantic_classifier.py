@@ -0,0 +1,172 @@
+"""
+Classificador semântico local sobre o catálogo de palavras-chave, sem acesso à rede.
+
+Cada palavra-chave vira um vetor de n-gramas de caracteres (3 a 5, por palavra) ponderados
+por TF-IDF, calculado sobre o próprio catálogo. Uma descrição é representada pelos n-gramas
+que contém, e a pontuação de cada palavra-chave é a fração do seu peso TF-IDF presente na
+descrição: tolera flexões, erros de digitação e reordenações que o casamento exato não cobre.
+Um lote de descrições é pontuado com uma única multiplicação de matrizes.
+"""
+import os
+import threading
+
+import numpy as np
+
+from KeyWords import ALL_KEYWORDS_MAPPING
+from keyword_matcher import FULL_EVIDENCE_TOKENS, NO_LEVEL, normalize_text
+
+# --- Configuração do Classificador Semântico ---
+# Fração mínima do peso de uma palavra-chave encontrada na descrição para considerá-la presente.
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.45"))
+NGRAM_SIZES = (3, 4, 5)
+# Folga na comparação de pontuações entre palavras-chave contidas umas nas outras (arredondamento em float32).
+SCORE_TOLERANCE = 1e-4
+# Linhas por multiplicação: limita a memória da matriz densa das descrições.
+BATCH_ROWS = 1024
+
+
+# Limite do cache de colunas por palavra (o vocabulário das descrições se repete muito entre casos).
+WORD_CACHE_SIZE = 100_000
+
+
+def word_ngrams(word: str):
+    """N-gramas de caracteres de uma palavra já normalizada, com as bordas marcadas."""
+    padded = f" {word} "
+    return {padded[i:i + size] for size in NGRAM_SIZES for i in range(len(padded) - size + 1)}
+
+
+def char_ngrams(text: str):
+    """Conjunto de n-gramas de caracteres de cada palavra do texto."""
+    grams = set()
+    for word in normalize_text(text).split():
+        grams |= word_ngrams(word)
+    return grams
+
+
+class SemanticClassifier:
+    """Pontuação vetorizada de descrições contra todas as palavras-chave do catálogo."""
+    def __init__(self, mapping=ALL_KEYWORDS_MAPPING, min_score=SEMANTIC_MIN_SCORE):
+        self.min_score = min_score
+        self._word_columns = {}
+        self.levels = []
+        self.phrases = []
+        keyword_grams = []
+        for level_name, keywords_list in mapping.items():
+            for phrase in keywords_list:
+                self.levels.append(level_name)
+                self.phrases.append(phrase)
+                keyword_grams.append(char_ngrams(phrase))
+
+        vocabulary = sorted(set().union(*keyword_grams))
+        self.vocabulary = {gram: column for column, gram in enumerate(vocabulary)}
+        document_frequency = np.zeros(len(vocabulary), dtype=np.float32)
+        for grams in keyword_grams:
+            document_frequency[[self.vocabulary[g] for g in grams]] += 1
+        idf = np.log((1 + len(keyword_grams)) / (1 + document_frequency)) + 1
+
+        # Matriz (n-gramas x palavras-chave) com os pesos de cada palavra-chave normalizados para somar 1.
+        weights = np.zeros((len(vocabulary), len(keyword_grams)), dtype=np.float32)
+        for row, grams in enumerate(keyword_grams):
+            columns = [self.vocabulary[g] for g in grams]
+            weights[columns, row] = idf[columns]
+            weights[:, row] /= weights[:, row].sum()
+        self.weights = weights
+
+        self.word_counts = np.array([normalize_text(p).count(" ") + 1 for p in self.phrases], dtype=np.float32)
+        # Palavras-chave contidas em outras ("ofensivo" em "não ofensivo"): ver _rank_row.
+        normalized = [f" {normalize_text(p)} " for p in self.phrases]
+        self.contained_in = [
+            [j for j, other in enumerate(normalized) if j != i and phrase in other]
+            for i, phrase in enumerate(normalized)
+        ]
+        self.contains = [[j for j, others in enumerate(self.contained_in) if i in others] for i in range(len(self.phrases))]
+
+    def _columns(self, word):
+        columns = self._word_columns.get(word)
+        if columns is None:
+            if len(self._word_columns) >= WORD_CACHE_SIZE:
+                self._word_columns.clear()
+            columns = self._word_columns[word] = [self.vocabulary[g] for g in word_ngrams(word) if g in self.vocabulary]
+        return columns
+
+    def _vectorize(self, descriptions):
+        rows, columns = [], []
+        for row, description in enumerate(descriptions):
+            found = set()
+            for word in normalize_text(description).split():
+                found.update(self._columns(word))
+            rows.extend([row] * len(found))
+            columns.extend(found)
+        matrix = np.zeros((len(descriptions), len(self.vocabulary)), dtype=np.float32)
+        matrix[rows, columns] = 1.0
+        return matrix
+
+    def score_batch(self, descriptions):
+        """Matriz (descrições x palavras-chave) com a fração do peso de cada palavra-chave encontrada."""
+        scores = np.empty((len(descriptions), len(self.phrases)), dtype=np.float32)
+        for start in range(0, len(descriptions), BATCH_ROWS):
+            chunk = descriptions[start:start + BATCH_ROWS]
+            scores[start:start + len(chunk)] = self._vectorize(chunk) @ self.weights
+        return scores
+
+    def _rank_row(self, row):
+        matched = {i for i in np.flatnonzero(row >= self.min_score)}
+        # Entre uma palavra-chave e outra mais longa que a contém, fica a encontrada mais completamente
+        # (a mais longa, em empate): "ofensivo" inteiro não cede a "não ofensivo" encontrada em parte,
+        # cuja pontuação vem justamente das palavras de "ofensivo".
+        matched = {
+            i for i in matched
+            if not any(j in matched and row[j] >= row[i] - SCORE_TOLERANCE for j in self.contained_in[i])
+            and not any(j in matched and row[j] > row[i] + SCORE_TOLERANCE for j in self.contains[i])
+        }
+        ranking = {}
+        for i in sorted(matched, key=lambda i: -row[i]):
+            entry = ranking.setdefault(self.levels[i], {"level": self.levels[i], "score": 0.0, "quality": 1.0, "keywords": []})
+            entry["score"] += float(row[i] * self.word_counts[i])
+            entry["quality"] = min(entry["quality"], float(row[i]))
+            entry["keywords"].append(self.phrases[i])
+        # Em empate, prevalece o nível mais grave (mesmo critério do classificador por palavras-chave).
+        return sorted(ranking.values(), key=lambda e: (e["score"], e["level"]), reverse=True)
+
+    def rank_batch(self, descriptions):
+        """Para cada descrição, os níveis em ordem decrescente de pontuação, com as palavras-chave encontradas."""
+        return [self._rank_row(row) for row in self.score_batch(descriptions)]
+
+    def classify_batch(self, descriptions):
+        """Mesmo formato de KeywordMatcher.classify: (dicionário da análise, confiança entre 0 e 1) por descrição."""
+        results = []
+        for ranking in self.rank_batch(descriptions):
+            if not ranking:
+                results.append(({"nivel_sugerido": NO_LEVEL, "palavras_chave_encontradas": []}, 0.0))
+                continue
+            best = ranking[0]
+            share = best["score"] / sum(entry["score"] for entry in ranking)
+            strength = min(1.0, best["score"] / FULL_EVIDENCE_TOKENS)
+            confidence = share * strength * best["quality"]
+            results.append((
+                {"nivel_sugerido": best["level"], "palavras_chave_encontradas": best["keywords"]},
+                round(confidence, 4),
+            ))
+        return results
+
+    def classify(self, description: str):
+        return self.classify_batch([description])[0]
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_semantic_classifier() -> SemanticClassifier:
+    """Instância única por processo, construída no primeiro uso."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = SemanticClassifier()
+    return _classifier
+
+
+def classify_semantically(description: str):
+    """Atalho para a instância compartilhada."""
+    return get_semantic_classifier().classify(description)
@@ -0,0 +1,101 @@
+import copy
+import threading
+import time
+
+
+class SingleFlightTimeout(TimeoutError):
+    """O tempo máximo de espera pelo resultado de uma chamada em andamento foi excedido."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "cancelled", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas idênticas simultâneas: a primeira executa a função e as demais,
+    com a mesma chave, aguardam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.cancellations = 0
+        self.failures = 0
+
+    def do(self, key, func, timeout=None):
+        """
+        Executa `func()` uma única vez por chave entre as chamadas concorrentes.
+        Quem aguarda desiste após `timeout` segundos com SingleFlightTimeout, sem afetar a chamada em curso.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                else:
+                    call.waiters += 1
+                    self.coalesced += 1
+
+            if leader:
+                return self._lead(key, call, func)
+
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.done.wait(remaining):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f"Tempo de espera de {timeout}s excedido aguardando chamada em andamento.")
+            if call.cancelled:
+                # A chamada líder foi interrompida (ex.: sessão encerrada); tenta assumir a liderança.
+                with self._lock:
+                    self.coalesced -= 1
+                continue
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+    def _lead(self, key, call, func):
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.failures += 1
+            raise
+        except BaseException:
+            # Interrupções (KeyboardInterrupt, parada do script do Streamlit) não são repassadas a quem aguarda.
+            call.cancelled = True
+            with self._lock:
+                self.cancellations += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        """Contadores de chamadas executadas, agrupadas e abandonadas."""
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+                "timeouts": self.timeouts,
+                "cancellations": self.cancellations,
+                "failures": self.failures,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Os testes não gravam auditoria, casos nem cache em disco e não usam a tabela compilada do diretório.
+os.environ.setdefault("CONDUCT_AUDIT_LOG", "")
+os.environ.setdefault("CASE_STORE_PATH", "")
+os.environ.setdefault("GEMINI_CACHE_PATH", "")
+os.environ.setdefault("DECISION_TABLE_PATH", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+import case_store
+from case_store import CaseStore, analysis_version
+
+DESCRIPTION = "Ele gritou com a equipe durante a reunião."
+FACTORS = ("na",) * 7
+EVALUATION_RESULT = (None, "", [], [], [])
+
+
+def make_store(tmp_path):
+    store = CaseStore(str(tmp_path / "cases.sqlite3"))
+    store.record(DESCRIPTION, FACTORS, {"analysis_path": "gemini"}, EVALUATION_RESULT, "motor")
+    return store
+
+
+def test_cases_are_reused_with_the_same_analysis_version(tmp_path):
+    store = make_store(tmp_path)
+    assert store.find_exact(DESCRIPTION.upper(), FACTORS)["description"] == DESCRIPTION
+    assert store.find_reusable(DESCRIPTION)["description"] == DESCRIPTION
+
+
+def test_model_or_keyword_change_invalidates_cases(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    assert analysis_version("outro-modelo") != case_store.ANALYSIS_VERSION
+    monkeypatch.setattr(case_store, "ANALYSIS_VERSION", analysis_version("outro-modelo"))
+    assert store.find_exact(DESCRIPTION, FACTORS) is None
+    assert store.find_reusable(DESCRIPTION) is None
+
+
+def test_store_path_is_read_at_runtime(tmp_path, monkeypatch):
+    path = str(tmp_path / "runtime.sqlite3")
+    monkeypatch.setattr(case_store, "_store", None)
+    monkeypatch.setattr(case_store, "CASE_STORE_PATH", path)
+    store = case_store.get_case_store()
+    assert store is not None and (tmp_path / "runtime.sqlite3").exists()
+    store._conn.close()
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+
+import conduct_eval
+
+
+def run_batch(tmp_path, lines, concurrency):
+    input_path, output_path = tmp_path / "entrada.jsonl", tmp_path / "saida.jsonl"
+    input_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    args = conduct_eval.build_parser().parse_args(
+        ["batch", str(input_path), str(output_path), "--concurrency", str(concurrency), "--rate", "0", "--progress", "0"]
+    )
+    counters = asyncio.run(asyncio.wait_for(conduct_eval.run_batch(args), timeout=60))
+    with open(output_path, encoding="utf-8") as output_file:
+        return counters, {record["index"]: record for record in map(json.loads, output_file)}
+
+
+@pytest.fixture(autouse=True)
+def without_gemini(monkeypatch):
+    monkeypatch.setattr(conduct_eval, "GEMINI_API_KEY", None)
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_invalid_records_produce_errors_and_batch_continues(tmp_path, concurrency):
+    lines = [
+        json.dumps({"id": "a", "description": "Ele gritou com a equipe e foi agressivo."}),
+        json.dumps({"id": "b", "description": None}),
+        json.dumps({"id": "c", "description": "Comentário ofensivo na reunião.", "context": "Inexistente"}),
+        "{malformado",
+        json.dumps([1, 2]),
+        json.dumps({"id": "d", "description": "Comentário ofensivo na reunião.", "impact": "Negativo intenso"}),
+    ]
+    counters, records = run_batch(tmp_path, lines, concurrency)
+    assert sorted(records) == list(range(len(lines)))
+    assert counters["written"] == 2 and counters["invalid"] == 4
+    assert "severity" in records[0] and "severity" in records[5]
+    for index in (1, 2, 3, 4):
+        assert "error" in records[index] and "severity" not in records[index]
+    assert records[1]["id"] == "b" and "description" in records[1]["error"]
+    assert records[2]["id"] == "c" and "context" in records[2]["error"]
+
+
+def test_unexpected_failure_becomes_error_record(tmp_path, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("falha simulada")
+
+    monkeypatch.setattr(conduct_eval, "evaluate_analysis", broken)
+    counters, records = run_batch(tmp_path, [json.dumps({"id": "x", "description": "texto"})], 1)
+    assert counters["invalid"] == 1
+    assert records[0]["id"] == "x" and "falha simulada" in records[0]["error"]
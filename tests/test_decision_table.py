@@ -0,0 +1,132 @@
+import itertools
+import os
+import shutil
+
+import pytest
+
+import decision_table
+from decision_table import (ANALYSIS_STATES, KEYWORD_SENTINEL, PATH_SENTINEL, analysis_for_state, compile_table,
+                            load_table, run_engine, table_fingerprint, verify_table)
+from engine import ANALYSIS_PATH_LABELS, ConductEvaluationEngine
+from factor_options import FACTOR_OPTIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FULL_VALUES = [list(options) for options in FACTOR_OPTIONS.values()]
+
+
+def restrict_domain(monkeypatch, values):
+    """Reduz o domínio de fatores da tabela (a enumeração completa leva minutos por estado)."""
+    monkeypatch.setattr(decision_table, "FACTOR_VALUES", values)
+    monkeypatch.setattr(decision_table, "_VALUE_INDEX", [{value: i for i, value in enumerate(v)} for v in values])
+    combinations = 1
+    for v in values:
+        combinations *= len(v)
+    monkeypatch.setattr(decision_table, "_FACTOR_COMBINATIONS", combinations)
+
+
+def engine_result(analysis, factors):
+    return run_engine(ConductEvaluationEngine(audit=True), analysis, factors)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return ConductEvaluationEngine(audit=True)
+
+
+def assert_table_matches_engine(table, engine, values):
+    for state in ANALYSIS_STATES:
+        for factors in itertools.product(*values):
+            analysis = analysis_for_state(state)
+            if analysis.get("detected_keywords"):
+                analysis["detected_keywords"] = ["grito", "ameaça"]
+            if analysis.get("analysis_successful"):
+                analysis["analysis_path"] = "cache"
+            assert table.lookup_with_firings(analysis, factors) == run_engine(engine, analysis, factors), (state, factors)
+
+
+def test_table_matches_engine_over_extreme_options(monkeypatch, engine):
+    # "na" e a opção mais grave de cada fator, em todas as combinações e estados da análise.
+    values = [[v[0], v[-1]] for v in FULL_VALUES]
+    restrict_domain(monkeypatch, values)
+    assert_table_matches_engine(compile_table(processes=1), engine, values)
+
+
+@pytest.mark.parametrize("factor", range(len(FULL_VALUES)))
+def test_table_matches_engine_over_each_factor(monkeypatch, engine, factor):
+    # Todas as opções de um fator, com os demais ausentes.
+    values = [v if i == factor else ["na"] for i, v in enumerate(FULL_VALUES)]
+    restrict_domain(monkeypatch, values)
+    assert_table_matches_engine(compile_table(processes=1), engine, values)
+
+
+@pytest.fixture(scope="module")
+def small_table():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        values = [[v[0], v[-1]] for v in FULL_VALUES]
+        restrict_domain(monkeypatch, values)
+        yield compile_table(processes=1), [v[-1] for v in FULL_VALUES]
+
+
+@pytest.mark.parametrize("path", sorted(ANALYSIS_PATH_LABELS) + ["desconhecido", None])
+def test_sentinels_are_replaced(small_table, path):
+    table, factors = small_table
+    keywords = ["palavra com \\ barra", "outra, com vírgula"]
+    analysis = {"suggested_level": 4, "detected_keywords": keywords, "analysis_successful": True, "analysis_path": path}
+    derived, _, firings = table.lookup_with_firings(analysis, factors)
+    expected = dict(analysis, analysis_path=path or "gemini")
+    assert derived == engine_result(expected, factors)[0]
+    text = repr((derived, firings))
+    assert KEYWORD_SENTINEL not in text and PATH_SENTINEL not in text
+
+
+def test_sentinels_with_failed_analysis(small_table):
+    table, factors = small_table
+    analysis = {"analysis_successful": False}
+    assert table.lookup_with_firings(analysis, factors) == engine_result(analysis, factors)
+
+
+@pytest.mark.parametrize("analysis, factors", [
+    ({"suggested_level": 9, "detected_keywords": [], "analysis_successful": True}, ["na"] * 7),
+    ({"suggested_level": 3, "detected_keywords": [], "analysis_successful": True}, ["na"] * 6 + ["Opção inexistente"]),
+    ({"suggested_level": 3, "detected_keywords": [], "analysis_successful": True}, ["na"] * 6),
+])
+def test_lookup_outside_domain_returns_none(small_table, analysis, factors):
+    table, _ = small_table
+    assert table.lookup(analysis, factors) is None
+    assert table.lookup_with_firings(analysis, factors) is None
+
+
+def test_evaluate_conduct_falls_back_to_engine_for_missing_key(monkeypatch, small_table):
+    import evaluation
+
+    table, _ = small_table
+    monkeypatch.setattr(evaluation, "refresh_rules", lambda: None)
+    factors = ["na"] * 6 + ["Opção inexistente"]
+    gemini_result = {"nivel_sugerido": "Nível 3", "palavras_chave_encontradas": ["grito"]}
+    monkeypatch.setattr(evaluation, "decision_table", table)
+    with_table = evaluation.evaluate_conduct("descrição", dict(gemini_result), *factors)
+    monkeypatch.setattr(evaluation, "decision_table", None)
+    assert with_table == evaluation.evaluate_conduct("descrição", dict(gemini_result), *factors)
+
+
+def test_fingerprint_covers_rule_compiler(monkeypatch, tmp_path):
+    digest = "0" * 64
+    for name in ("engine.py", "rule_catalog.py"):
+        shutil.copyfile(os.path.join(ROOT, name), tmp_path / name)
+    monkeypatch.setattr(decision_table, "__file__", str(tmp_path / "decision_table.py"))
+    before = table_fingerprint(digest)
+    with open(tmp_path / "rule_catalog.py", "a", encoding="utf-8") as source_file:
+        source_file.write("\n# alterado\n")
+    assert table_fingerprint(digest) != before
+
+
+def test_fingerprint_covers_rules_digest():
+    assert table_fingerprint("0" * 64) != table_fingerprint("1" * 64)
+
+
+def test_built_table_matches_engine():
+    # A tabela completa leva minutos para compilar; só é conferida (por amostra) quando já existe.
+    table = load_table(os.path.join(ROOT, "decision_table.pkl"))
+    if table is None:
+        pytest.skip("decision_table.pkl ausente ou obsoleta")
+    assert verify_table(table, sample=2000) == []
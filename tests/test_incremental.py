@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import evaluation
+from decision_table import ANALYSIS_STATES, analysis_for_state, run_engine
+from engine import ConductEvaluationEngine
+from factor_options import FACTOR_OPTIONS
+
+FACTOR_VALUES = [list(options) for options in FACTOR_OPTIONS.values()]
+
+
+@pytest.fixture(autouse=True)
+def engine_only(monkeypatch):
+    # Compara com o motor em execução, não com a tabela de decisão.
+    monkeypatch.setattr(evaluation, "decision_table", None)
+
+
+def random_factors(rng):
+    return [rng.choice(values) for values in FACTOR_VALUES]
+
+
+@pytest.mark.parametrize("state", ANALYSIS_STATES)
+def test_incremental_matches_full_evaluation(state):
+    rng = random.Random(repr(state))
+    analysis = analysis_for_state(state)
+    if analysis.get("detected_keywords"):
+        analysis["detected_keywords"] = ["grito", "ameaça"]
+    if analysis.get("analysis_successful"):
+        analysis["analysis_path"] = "gemini"
+    factors = random_factors(rng)
+    session = evaluation.IncrementalEvaluation("", analysis, *factors)
+    full_engine = ConductEvaluationEngine(audit=True)
+    for _ in range(60):
+        if rng.random() < 0.5:
+            factors = random_factors(rng)
+        else:
+            # Metade das transições muda um único fator.
+            position = rng.randrange(len(FACTOR_VALUES))
+            factors = factors[:position] + [rng.choice(FACTOR_VALUES[position])] + factors[position + 1:]
+        result = session.update(*factors)
+        _, fact_ids, firings = run_engine(full_engine, analysis, factors)
+        assert result[4] == full_engine.log_facts
+        assert session.engine.ordered_trace() == (full_engine.log_facts, fact_ids, firings)
+        assert result == evaluation.summarize_log_facts(full_engine.log_facts) + (full_engine.log_facts,)
+
+
+def test_single_factor_changes_match_full_evaluation():
+    analysis = {"suggested_level": 4, "detected_keywords": ["grito"], "analysis_successful": True, "analysis_path": "gemini"}
+    factors = ["na"] * len(FACTOR_VALUES)
+    session = evaluation.IncrementalEvaluation("", analysis, *factors)
+    full_engine = ConductEvaluationEngine(audit=True)
+    for position, values in enumerate(FACTOR_VALUES):
+        for value in values[1:] + values[:1]:
+            factors[position] = value
+            result = session.update(*factors)
+            _, fact_ids, firings = run_engine(full_engine, analysis, factors)
+            assert session.engine.ordered_trace() == (full_engine.log_facts, fact_ids, firings)
+            assert result[4] == full_engine.log_facts
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from latency_budget import HedgedCaller, is_transient_error
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_calls_receive_the_remaining_budget():
+    timeouts, release = [], threading.Event()
+
+    def primary(timeout):
+        timeouts.append(timeout)
+        release.wait(timeout)
+        return "principal"
+
+    def hedge(timeout):
+        timeouts.append(timeout)
+        return "contingência"
+
+    caller = HedgedCaller(budget=2.0, hedge_after=0.2)
+    assert caller.call(primary, hedge) == ("contingência", 1)
+    release.set()
+    assert timeouts[0] == 2.0
+    assert 1.5 < timeouts[1] < 1.85
+
+
+@pytest.mark.parametrize("error", [ApiError(400), ApiError(403), ValueError("esquema inválido")])
+def test_non_transient_failure_is_raised_without_hedge(error):
+    hedges = []
+
+    def primary(timeout):
+        raise error
+
+    caller = HedgedCaller(budget=2.0, hedge_after=1.0)
+    with pytest.raises(type(error)):
+        caller.call(primary, lambda timeout: hedges.append(timeout))
+    assert hedges == [] and caller.hedges_sent == 0
+
+
+@pytest.mark.parametrize("error", [ApiError(503), ApiError(429), TimeoutError()])
+def test_transient_failure_sends_the_hedge_at_once(error):
+    def primary(timeout):
+        raise error
+
+    caller = HedgedCaller(budget=2.0, hedge_after=1.5)
+    assert caller.call(primary, lambda timeout: "contingência") == ("contingência", 1)
+    assert caller.hedges_sent == 1
+
+
+def test_transient_errors():
+    assert is_transient_error(ConnectionError()) and is_transient_error(ApiError(502))
+    assert not is_transient_error(ApiError(401)) and not is_transient_error(RuntimeError())
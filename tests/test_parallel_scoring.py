@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+import parallel_scoring
+
+
+def write_lines(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_invalid_lines_produce_error_records(tmp_path):
+    input_path, output_path = tmp_path / "entrada.jsonl", tmp_path / "saida.jsonl"
+    lines = [
+        json.dumps({"id": "a", "description": "Ele gritou com a equipe e foi agressivo."}),
+        "{malformado",
+        json.dumps("texto solto"),
+        json.dumps({"id": "b", "description": None}),
+        json.dumps({"id": "c", "description": "Comentário ofensivo.", "history": "Inexistente"}),
+        json.dumps({"id": "d", "description": "Comentário ofensivo na reunião."}),
+    ]
+    write_lines(input_path, lines)
+    assert parallel_scoring.score_file(str(input_path), str(output_path), workers=2, shards=3) == len(lines)
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [record["index"] for record in records] == list(range(len(lines)))
+    assert [("error" in record) for record in records] == [False, True, True, True, True, False]
+    assert records[3]["id"] == "b" and records[4]["id"] == "c"
+    assert not [name for name in os.listdir(tmp_path) if ".shard-" in name]
+
+
+def test_shards_are_removed_when_scoring_fails(tmp_path, monkeypatch):
+    input_path, output_path = tmp_path / "entrada.jsonl", tmp_path / "saida.jsonl"
+    write_lines(input_path, [json.dumps({"description": f"caso {i}"}) for i in range(20)])
+
+    def broken(index, line, engine):
+        raise RuntimeError("falha simulada")
+
+    # Os processos são criados por fork e herdam a substituição.
+    monkeypatch.setattr(parallel_scoring, "score_line", broken)
+    with pytest.raises(RuntimeError):
+        parallel_scoring.score_file(str(input_path), str(output_path), workers=2, shards=4)
+    assert not [name for name in os.listdir(tmp_path) if ".shard-" in name]
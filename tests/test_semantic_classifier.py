@@ -0,0 +1,23 @@
+import pytest
+
+import parallel_scoring
+from semantic_classifier import classify_semantically
+
+OFFENSIVE = "O comentário do chefe foi ofensivo na frente de todos."
+
+
+@pytest.mark.parametrize("description, level, keyword", [
+    # "ofensivo" encontrada inteira não cede a "não ofensivo", que contém a frase mas só foi encontrada em parte.
+    (OFFENSIVE, "Nível 3", "ofensivo"),
+    ("O comentário foi não ofensivo, apenas uma brincadeira.", "Nível 1", "não ofensivo"),
+    ("Foi um comentário levemente ofensivo.", "Nível 2", "levemente ofensivo"),
+])
+def test_contained_keywords(description, level, keyword):
+    result, _ = classify_semantically(description)
+    assert result["nivel_sugerido"] == level
+    assert result["palavras_chave_encontradas"] == [keyword]
+
+
+def test_offline_analysis_keeps_the_correct_level():
+    result, _ = parallel_scoring.offline_analysis(OFFENSIVE, {})
+    assert result["nivel_sugerido"] == "Nível 3"
@@ -0,0 +1,278 @@
+"""
+Instrumentação do fluxo de avaliação: duração por etapa, disparos e duração por regra,
+tamanho da agenda e fatos declarados.
+
+As métricas agregadas podem ser exportadas no formato texto do Prometheus e cada avaliação
+gera um registro de rastreamento exportável em JSON lines. Variáveis de ambiente:
+    CONDUCT_TRACING=0          desativa a instrumentação
+    CONDUCT_TRACE_JSONL=arq    acrescenta cada rastreamento concluído ao arquivo
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("CONDUCT_TRACING", "1") != "0"
+TRACE_JSONL_PATH = os.getenv("CONDUCT_TRACE_JSONL")
+METRIC_PREFIX = "conduct_eval"
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {"count": self.count, "total_s": self.total, "max_s": self.max}
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Tracer:
+    """Coletor de métricas e rastreamentos, seguro para uso por várias threads."""
+    def __init__(self, max_traces=1000, jsonl_path=TRACE_JSONL_PATH):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._traces = deque(maxlen=max_traces)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.rules = {}
+            self.facts_declared = {}
+            self.counters = {}
+            self.agenda_max = 0
+            self.agenda_samples = 0
+            self.agenda_total = 0
+            self.evaluations = 0
+            self._traces.clear()
+
+    # --- Rastreamento por avaliação ---
+    @property
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def trace(self, **attributes):
+        """Delimita uma avaliação; etapas, regras e fatos registrados dentro dela compõem o rastreamento."""
+        if self.current is not None:
+            yield self.current
+            return
+        record = {
+            "trace_id": uuid.uuid4().hex,
+            "started_at": time.time(),
+            "attributes": attributes,
+            "spans": [],
+            "rules": [],
+            "facts_declared": 0,
+            "agenda_max": 0,
+            "labels": {},
+        }
+        self._local.trace = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["duration_s"] = time.perf_counter() - start
+            self._local.trace = None
+            with self._lock:
+                self.evaluations += 1
+                self._traces.append(record)
+            if self.jsonl_path:
+                self._append_jsonl(record)
+
+    @contextmanager
+    def span(self, name):
+        """Cronometra uma etapa e a acumula nas métricas e no rastreamento corrente."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start)
+
+    def record_span(self, name, seconds):
+        """Registra uma etapa medida externamente (ex.: uma espera assíncrona)."""
+        with self._lock:
+            self.stages.setdefault(name, _Stat()).add(seconds)
+        record = self.current
+        if record is not None:
+            record["spans"].append({"name": name, "duration_s": seconds})
+
+    def record_rule(self, rule_name, seconds):
+        with self._lock:
+            self.rules.setdefault(rule_name, _Stat()).add(seconds)
+        record = self.current
+        if record is not None:
+            record["rules"].append({"rule": rule_name, "order": len(record["rules"]) + 1, "duration_s": seconds})
+
+    def record_fact(self, fact_name):
+        with self._lock:
+            self.facts_declared[fact_name] = self.facts_declared.get(fact_name, 0) + 1
+        record = self.current
+        if record is not None:
+            record["facts_declared"] += 1
+
+    def record_count(self, name, label, value):
+        """Conta uma ocorrência de `value` no contador `name` (ex.: caminho da análise) e a anota no rastreamento."""
+        with self._lock:
+            counts = self.counters.setdefault((name, label), {})
+            counts[value] = counts.get(value, 0) + 1
+        record = self.current
+        if record is not None:
+            record["labels"][name] = value
+
+    def observe_agenda(self, size):
+        with self._lock:
+            self.agenda_samples += 1
+            self.agenda_total += size
+            if size > self.agenda_max:
+                self.agenda_max = size
+        record = self.current
+        if record is not None and size > record["agenda_max"]:
+            record["agenda_max"] = size
+
+    # --- Exportação ---
+    def recent_traces(self, limit=None):
+        with self._lock:
+            traces = list(self._traces)
+        return traces[-limit:] if limit else traces
+
+    def to_jsonl(self, limit=None) -> str:
+        return "".join(json.dumps(t, ensure_ascii=False) + "\n" for t in self.recent_traces(limit))
+
+    def export_jsonl(self, path, limit=None):
+        with open(path, "a", encoding="utf-8") as output_file:
+            output_file.write(self.to_jsonl(limit))
+
+    def _append_jsonl(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.jsonl_path, "a", encoding="utf-8") as output_file:
+                output_file.write(line)
+
+    def snapshot(self) -> dict:
+        """Métricas agregadas como dicionário."""
+        with self._lock:
+            return {
+                "evaluations": self.evaluations,
+                "stages": {name: stat.as_dict() for name, stat in self.stages.items()},
+                "rules": {name: stat.as_dict() for name, stat in self.rules.items()},
+                "facts_declared": dict(self.facts_declared),
+                "counters": {name: dict(counts) for (name, _), counts in self.counters.items()},
+                "agenda": {
+                    "max": self.agenda_max,
+                    "mean": self.agenda_total / self.agenda_samples if self.agenda_samples else 0.0,
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Métricas agregadas no formato de exposição em texto do Prometheus."""
+        data = self.snapshot()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_evaluations_total Avaliações concluídas.",
+            f"# TYPE {METRIC_PREFIX}_evaluations_total counter",
+            f"{METRIC_PREFIX}_evaluations_total {data['evaluations']}",
+        ]
+        for metric, label, stats, help_text in (
+            ("stage_seconds", "stage", data["stages"], "Duração das etapas da avaliação."),
+            ("rule_seconds", "rule", data["rules"], "Duração da execução de cada regra disparada."),
+        ):
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for key, stat in sorted(stats.items()):
+                lines.append(f'{name}_count{{{label}="{_escape_label(key)}"}} {stat["count"]}')
+                lines.append(f'{name}_sum{{{label}="{_escape_label(key)}"}} {stat["total_s"]:.9f}')
+            lines += [f"# HELP {name}_max Maior duração observada.", f"# TYPE {name}_max gauge"]
+            for key, stat in sorted(stats.items()):
+                lines.append(f'{name}_max{{{label}="{_escape_label(key)}"}} {stat["max_s"]:.9f}')
+        name = f"{METRIC_PREFIX}_facts_declared_total"
+        lines += [f"# HELP {name} Fatos declarados no motor, por tipo.", f"# TYPE {name} counter"]
+        for fact_name, count in sorted(data["facts_declared"].items()):
+            lines.append(f'{name}{{fact="{_escape_label(fact_name)}"}} {count}')
+        with self._lock:
+            counters = {key: dict(counts) for key, counts in self.counters.items()}
+        for (counter, label), counts in sorted(counters.items()):
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            lines += [f"# HELP {name} Ocorrências por {label}.", f"# TYPE {name} counter"]
+            for value, count in sorted(counts.items()):
+                lines.append(f'{name}{{{label}="{_escape_label(value)}"}} {count}')
+        name = f"{METRIC_PREFIX}_agenda_size"
+        lines += [f"# HELP {name} Tamanho da agenda antes de cada disparo.", f"# TYPE {name} gauge"]
+        lines.append(f'{name}{{stat="max"}} {data["agenda"]["max"]}')
+        lines.append(f'{name}{{stat="mean"}} {data["agenda"]["mean"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Grava as métricas para o coletor textfile do node_exporter (escrita atômica)."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as output_file:
+            output_file.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+class _NullTracer:
+    """Substituto sem custo quando a instrumentação está desativada."""
+    current = None
+
+    @contextmanager
+    def trace(self, **attributes):
+        yield None
+
+    @contextmanager
+    def span(self, name):
+        yield
+
+    def record_span(self, name, seconds):
+        pass
+
+    def record_rule(self, rule_name, seconds):
+        pass
+
+    def record_fact(self, fact_name):
+        pass
+
+    def record_count(self, name, label, value):
+        pass
+
+    def observe_agenda(self, size):
+        pass
+
+    def recent_traces(self, limit=None):
+        return []
+
+    def snapshot(self):
+        return {}
+
+    def to_prometheus(self):
+        return ""
+
+    def write_prometheus(self, path):
+        pass
+
+    def to_jsonl(self, limit=None):
+        return ""
+
+    def export_jsonl(self, path, limit=None):
+        pass
+
+    def reset(self):
+        pass
+
+
+TRACER = Tracer() if TRACING_ENABLED else _NullTracer()